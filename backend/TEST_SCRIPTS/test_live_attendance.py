@@ -0,0 +1,111 @@
+"""
+Live attendance without an identify feed viewer.
+Run from backend/: python -m pytest TEST_SCRIPTS/test_live_attendance.py
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from app.services.attendance_engine import AttendanceEngine
+
+
+class FakePool:
+    placeholder = "%s"
+
+    @contextmanager
+    def connection(self):
+        class Cursor:
+            def execute(self, sql, params=None):
+                pass
+
+            def fetchall(self):
+                return []  # Nobody marked yet
+
+            def close(self):
+                pass
+
+        class Connection:
+            def cursor(self):
+                return Cursor()
+
+        yield Connection()
+
+
+class FakeWriter:
+    def __init__(self):
+        self.marks = []
+
+    def enqueue(self, session_id, student_id, recognized_at, confidence, key=None):
+        self.marks.append((session_id, student_id))
+        return True
+
+
+class FakeRecognizer:
+    """Publishes a fresh identification of student 7 every few milliseconds while started."""
+
+    def __init__(self, engine, camera_id):
+        self.engine = engine
+        self.camera_id = camera_id
+        self.ref_count = 0
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self.ref_count += 1
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        self.ref_count -= 1
+        self._stop_event.set()
+
+    def _loop(self):
+        while not self._stop_event.wait(0.01):
+            now = time.time()
+            self.engine.observe({
+                "camera_id": self.camera_id,
+                "last_update": now,
+                "faces": [{"track_id": 1, "identity": "7", "matched": True, "confidence": 0.9, "identified_at": now}]
+            })
+
+
+def test_session_marks_students_without_viewer():
+    writer = FakeWriter()
+    recognizers = {}
+
+    def feed(camera_id):
+        recognizer = recognizers[camera_id] = FakeRecognizer(engine, camera_id)
+        recognizer.start()
+        return recognizer.stop
+
+    engine = AttendanceEngine(
+        pool_factory=FakePool,
+        roster_lookup=lambda session_id: {"7"},
+        writer=writer,
+        feed=feed
+    )
+
+    # No /video_feed?mode=identify client: the session alone starts recognition
+    engine.start_session(12, camera_id="0")
+    assert recognizers["0"].ref_count == 1
+
+    deadline = time.time() + 2
+    while not writer.marks and time.time() < deadline:
+        time.sleep(0.01)
+    assert writer.marks == [(12, 7)]
+    assert "7" in engine.get_session(12)["marked"]
+
+    engine.end_session(12)
+    assert recognizers["0"].ref_count == 0
+
+
+def test_eviction_releases_recognition():
+    released = []
+    engine = AttendanceEngine(
+        pool_factory=FakePool,
+        roster_lookup=lambda session_id: set(),
+        writer=FakeWriter(),
+        feed=lambda camera_id: lambda: released.append(camera_id)
+    )
+    engine.start_session(12, camera_id="0")
+    engine._evict(time.time() + 24 * 3600)
+    assert released == ["0"]
@@ -6,6 +6,7 @@ from pydantic import BaseModel
 import tempfile
 
 from app.services.face_embedding import FaceEmbedder
+from app.services.frame_sources import open_capture
 from app.core.pinecone_client import index
 
 router = APIRouter()
@@ -120,9 +121,9 @@ def enroll_student_webcam(student_id: str):
     Enroll a student using webcam capture.
     Uses InsightFace (ArcFace) for face detection and embedding.
     """
-    cap = cv2.VideoCapture(0)
+    cap = open_capture(label="Webcam")  # CAMERA_SOURCE: webcam, stream or replayed file
     
-    if not cap.isOpened():
+    if cap is None:
         raise HTTPException(status_code=500, detail="Could not open webcam")
     
     embeddings = []
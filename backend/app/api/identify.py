@@ -9,6 +9,9 @@ import logging
 
 from app.core.startup import get_embedder
 from app.services.embedding_cache import embedding_cache
+from app.services.student_directory import student_directory
+from app.services.face_quality import QualityGate
+from app.services.frame_sources import open_capture
 from app.core.pinecone_client import index
 
 logger = logging.getLogger(__name__)
@@ -23,6 +26,9 @@ webcam_lock = threading.Lock()
 
 MATCH_THRESHOLD = 0.55
 
+# Faces that are too small, blurred or turned away are not embedded or queried
+quality_gate = QualityGate()
+
 
 def query_face_with_cache(embedding):
     """
@@ -91,41 +97,20 @@ def query_face_with_cache(embedding):
         }
 
 
-@router.post("/")
-async def identify_student(
-    file: UploadFile = File(...),
-    session_id: Optional[int] = Form(None)
-):
+def identify_faces(embedder, frame) -> dict:
     """
-    Identify student(s) from an uploaded image.
-    Supports multiple face detection.
-    Uses InsightFace (ArcFace) for face detection and embedding.
-    Queries local cache first, then Pinecone as fallback.
+    Detect, quality-check, embed and identify all faces in an image.
+    Embeddings are only computed for faces that pass the quality gate.
     
     Args:
-        file: Image file to process
-        session_id: Optional session ID for attendance tracking
+        embedder: FaceEmbedder instance
+        frame: BGR image
         
     Returns:
-        JSON with detected faces, bounding boxes, and identifications
+        Response dict with per-face results and quality gate statistics
     """
-    # Get embedder instance
-    embedder = get_embedder()
-    
-    # Validate file type
-    if not file.filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-        raise HTTPException(status_code=400, detail="Please provide a JPEG or PNG image")
-    
-    # Read image from upload
-    contents = await file.read()
-    nparr = np.frombuffer(contents, np.uint8)
-    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    if frame is None:
-        raise HTTPException(status_code=400, detail="Could not read image")
-    
-    # Detect faces using InsightFace
-    faces = embedder.app.get(frame)
+    # Detect faces using InsightFace (embeddings computed below, per accepted face)
+    faces = embedder.detect(frame)
     
     if len(faces) == 0:
         return {
@@ -147,22 +132,32 @@ async def identify_student(
         x1, y1 = max(0, x1), max(0, y1)
         x2, y2 = min(w, x2), min(h, y2)
         
-        # Get normalized embedding
-        embedding = face_data.embedding / np.linalg.norm(face_data.embedding)
-        
-        # Query with cache
-        match_result = query_face_with_cache(embedding)
-        
         # Build response
         face_result = {
             "bbox": [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],  # [x, y, width, height]
             "detection_score": float(round(face_data.det_score, 3))
         }
         
+        accepted, quality = quality_gate.check(frame, face_data)
+        face_result["quality"] = quality
+        if not accepted:
+            face_result["rejected"] = quality["reason"]
+            results.append(face_result)
+            continue
+        
+        # Get normalized embedding
+        embedding = embedder.embed_face(frame, face_data)
+        
+        # Query with cache
+        match_result = query_face_with_cache(embedding)
+        
         if match_result['student_id']:
             face_result["student_id"] = match_result['student_id']
             face_result["confidence"] = float(round(match_result['score'], 3))
-            face_result["name"] = match_result['metadata'].get('name', 'Student')
+            face_result["name"] = (
+                student_directory.get_name(match_result['student_id'])
+                or match_result['metadata'].get('name', 'Student')
+            )
             face_result["source"] = match_result['source']
         
         results.append(face_result)
@@ -170,10 +165,47 @@ async def identify_student(
     return {
         "status": "success",
         "faces": results,
+        "quality_stats": quality_gate.get_stats(),
         "timestamp": time.time()
     }
 
 
+@router.post("/")
+async def identify_student(
+    file: UploadFile = File(...),
+    session_id: Optional[int] = Form(None)
+):
+    """
+    Identify student(s) from an uploaded image.
+    Supports multiple face detection.
+    Uses InsightFace (ArcFace) for face detection and embedding.
+    Queries local cache first, then Pinecone as fallback.
+    
+    Args:
+        file: Image file to process
+        session_id: Optional session ID for attendance tracking
+        
+    Returns:
+        JSON with detected faces, bounding boxes, and identifications
+    """
+    # Get embedder instance
+    embedder = get_embedder()
+    
+    # Validate file type
+    if not file.filename.lower().endswith(('.jpg', '.jpeg', '.png')):
+        raise HTTPException(status_code=400, detail="Please provide a JPEG or PNG image")
+    
+    # Read image from upload
+    contents = await file.read()
+    nparr = np.frombuffer(contents, np.uint8)
+    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    
+    if frame is None:
+        raise HTTPException(status_code=400, detail="Could not read image")
+    
+    return identify_faces(embedder, frame)
+
+
 @router.post("/webcam")
 def identify_student_webcam():
     """
@@ -192,14 +224,11 @@ def identify_student_webcam():
     
     cap = None
     try:
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)  # Use DirectShow backend on Windows
+        cap = open_capture(label="Webcam")  # CAMERA_SOURCE: webcam, stream or replayed file
         
-        if not cap.isOpened():
+        if cap is None:
             raise HTTPException(status_code=500, detail="Could not open webcam")
         
-        # Give webcam time to initialize
-        time.sleep(0.1)
-        
         frame = None
         
         # Retry logic for grabbing frame
@@ -218,52 +247,5 @@ def identify_student_webcam():
     
     # Resize for consistency
     frame = cv2.resize(frame, (720, 480))
-    h, w = frame.shape[:2]
-    
-    # Detect faces using InsightFace
-    faces = embedder.app.get(frame)
     
-    if len(faces) == 0:
-        return {
-            "status": "no_face",
-            "faces": [],
-            "timestamp": time.time()
-        }
-    
-    # Process all faces
-    results = []
-    
-    for face_data in faces:
-        # Extract bounding box
-        bbox = face_data.bbox.astype(int)
-        x1, y1, x2, y2 = bbox[0], bbox[1], bbox[2], bbox[3]
-        
-        # Ensure bounds are valid
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(w, x2), min(h, y2)
-        
-        # Get normalized embedding
-        embedding = face_data.embedding / np.linalg.norm(face_data.embedding)
-        
-        # Query with cache
-        match_result = query_face_with_cache(embedding)
-        
-        # Build response
-        face_result = {
-            "bbox": [int(x1), int(y1), int(x2 - x1), int(y2 - y1)],  # [x, y, width, height]
-            "detection_score": float(round(face_data.det_score, 3))
-        }
-        
-        if match_result['student_id']:
-            face_result["student_id"] = match_result['student_id']
-            face_result["confidence"] = float(round(match_result['score'], 3))
-            face_result["name"] = match_result['metadata'].get('name', 'Student')
-            face_result["source"] = match_result['source']
-        
-        results.append(face_result)
-    
-    return {
-        "status": "success",
-        "faces": results,
-        "timestamp": time.time()
-    }
+    return identify_faces(embedder, frame)
@@ -0,0 +1,164 @@
+"""
+Shared database connection pool.
+Keeps a small set of open connections to PostgreSQL (health-checked before
+reuse) so request paths stop paying a fresh TLS handshake per query. Any
+DB-API connect function can be plugged in, e.g. sqlite3 for tests.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Load .env from backend directory (go up from core -> app -> backend)
+load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent.parent / '.env')
+
+# Configuration
+DATABASE_URL = os.getenv("DATABASE_URL")  # Required: set in the environment or backend/.env
+POOL_MAX_CONNECTIONS = 5         # Upper bound on open connections
+POOL_ACQUIRE_TIMEOUT = 10.0      # Seconds to wait for a free connection
+HEALTH_CHECK_IDLE_SECONDS = 30.0 # Ping idle connections older than this before reuse
+
+
+def is_integrity_error(error: Exception) -> bool:
+    """Whether a driver error is a constraint violation (DB-API IntegrityError, e.g. a missing foreign key)."""
+    return any(cls.__name__ == "IntegrityError" for cls in type(error).__mro__)
+
+
+class DatabasePool:
+    """
+    Thread-safe pool of DB-API connections.
+
+    Idle connections that have not been used for HEALTH_CHECK_IDLE_SECONDS
+    are checked with SELECT 1 before being handed out and replaced if dead
+    (serverless Postgres drops idle connections).
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], object],
+        max_connections: int = POOL_MAX_CONNECTIONS,
+        placeholder: str = "%s"
+    ):
+        self._connect = connect
+        self.max_connections = max_connections
+        self.placeholder = placeholder  # Parameter marker of the driver (%s or ?)
+        self._idle: List[Tuple[object, float]] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _is_alive(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _checkout(self):
+        with self._lock:
+            entry = self._idle.pop() if self._idle else None
+
+        if entry is not None:
+            conn, last_used = entry
+            if time.time() - last_used < HEALTH_CHECK_IDLE_SECONDS or self._is_alive(conn):
+                return conn
+            logger.info("Dropping dead pooled database connection")
+            self._close(conn)
+
+        return self._connect()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection. Commits on success, rolls back on error, and
+        returns the connection to the pool afterwards.
+        """
+        if not self._slots.acquire(timeout=POOL_ACQUIRE_TIMEOUT):
+            raise TimeoutError("Timed out waiting for a database connection")
+
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.commit()
+        except Exception:
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    # Broken connection, do not return it to the pool
+                    self._close(conn)
+                    conn = None
+            raise
+        finally:
+            if conn is not None:
+                with self._lock:
+                    self._idle.append((conn, time.time()))
+            self._slots.release()
+
+    def placeholders(self, count: int) -> str:
+        """Comma-separated parameter markers, e.g. for IN (...) clauses."""
+        return ", ".join([self.placeholder] * count)
+
+    def close_all(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+        logger.info(f"Closed {len(idle)} pooled database connections")
+
+
+def require_database_url() -> str:
+    """
+    Raises:
+        RuntimeError: If DATABASE_URL is not configured
+    """
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set; add it to the environment or backend/.env")
+    return DATABASE_URL
+
+
+def _connect_postgres():
+    import psycopg2
+    return psycopg2.connect(require_database_url(), connect_timeout=10)
+
+
+_pool: Optional[DatabasePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> DatabasePool:
+    """Get the global database pool, creating a PostgreSQL pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DatabasePool(_connect_postgres)
+    return _pool
+
+
+def set_pool(pool: Optional[DatabasePool]) -> None:
+    """Replace the global pool (e.g. with a SQLite-backed pool in tests)."""
+    global _pool
+    with _pool_lock:
+        old, _pool = _pool, pool
+    if old is not None and old is not pool:
+        old.close_all()
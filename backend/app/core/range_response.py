@@ -0,0 +1,178 @@
+"""
+File responses with HTTP range and conditional request support.
+Serves single byte ranges (206 Partial Content) so video players can seek
+without downloading the whole file, validates ETag/Last-Modified for
+conditional requests (304 Not Modified, If-Range), and streams the body in
+fixed-size chunks so memory stays bounded regardless of file size.
+"""
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024  # Bytes read per chunk while streaming
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested range lies outside the file."""
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against the ETag."""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _etag_matches_strong(header: str, etag: str) -> bool:
+    """Strong comparison of an If-Range entity tag (RFC 9110: weak tags never match)."""
+    return header.strip() == etag
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        return int(mtime) <= parsedate_to_datetime(header).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header into an inclusive (start, end) byte range.
+
+    Only single ranges are supported; multi-range and malformed headers
+    return None and are answered with the full file.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the file
+            (or any range of an empty file)
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if start_str == "":
+            # Suffix range: last N bytes
+            length = int(end_str)
+            if length <= 0 or size == 0:
+                raise RangeNotSatisfiable()  # No last byte of an empty file
+            return max(size - length, 0), size - 1
+
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def range_file_response(
+    request: Request,
+    path: Path,
+    media_type: str,
+    filename: Optional[str] = None,
+    inline: bool = False
+) -> Response:
+    """
+    Build a streaming response for a file honoring Range and conditional headers.
+
+    Args:
+        request: Incoming request (Range, If-Range, If-None-Match, If-Modified-Since)
+        path: File to serve
+        media_type: Content type of the file
+        filename: Name used in Content-Disposition
+        inline: Use an inline disposition (in-browser playback) instead of attachment
+
+    Returns:
+        200, 206, 304 or 416 response
+    """
+    stat = path.stat()
+    size = stat.st_size
+    etag = _etag(stat)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": "private, max-age=0, must-revalidate"
+    }
+    if filename:
+        disposition = "inline" if inline else "attachment"
+        headers["Content-Disposition"] = f"{disposition}; filename={filename}"
+
+    # Conditional GET: If-None-Match takes precedence over If-Modified-Since
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+    elif if_modified_since is not None and _not_modified_since(if_modified_since, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        # If-Range: only honor the range if the client's copy is still current
+        if_range = request.headers.get("if-range")
+        range_valid = (
+            if_range is None
+            or _etag_matches_strong(if_range, etag)
+            or if_range.strip() == last_modified
+        )
+        if range_valid:
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        start, length, status_code = 0, size, 200
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type
+    )
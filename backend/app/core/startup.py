@@ -7,6 +7,12 @@ import logging
 import numpy as np
 from app.services.face_embedding import FaceEmbedder
 from app.services.embedding_cache import embedding_cache
+from app.core.database import get_pool, require_database_url
+from app.services.student_directory import student_directory
+from app.services.annotated_outputs import retention_worker
+from app.services.annotation_renderer import annotation_renderer
+from app.services.attendance_engine import attendance_engine
+from app.services.attendance_writer import attendance_writer
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +76,9 @@ async def on_startup():
     
     logger.info("🚀 STARTING HACKCRYPT ATTENDANCE SYSTEM")
     
+    # Fail fast: attendance, names and rosters all need the database
+    require_database_url()
+    
     # 1. Check GPU
     gpu_available = check_gpu()
     
@@ -88,6 +97,21 @@ async def on_startup():
     except Exception as e:
         logger.error(f"❌ Error with Pinecone: {e}")
     
+    # 5. Preload student directory (names, classes) alongside the embedding cache
+    try:
+        num_students = student_directory.load_all()
+        logger.info(f"✅ Student directory loaded: {num_students} students")
+    except Exception as e:
+        logger.error(f"❌ Error loading student directory: {e}")
+    student_directory.start_refresh()
+    
+    # 6. Prune old annotated videos in the background
+    retention_worker.start()
+    
+    # 7. Background writer for attendance marks, live-session engine
+    attendance_writer.start()
+    attendance_engine.start()
+    
     logger.info("✅ STARTUP COMPLETE")
 
 async def on_shutdown():
@@ -97,6 +121,19 @@ async def on_shutdown():
         logger.info("✅ Cache saved")
     except Exception as e:
         logger.error(f"❌ Error saving cache: {e}")
+    
+    student_directory.stop_refresh()
+    retention_worker.stop()
+    from app.api.video_attendance import result_cache  # Routers import this module
+    result_cache.flush()  # LRU order of recent cache hits
+    annotation_renderer.shutdown()
+    attendance_engine.stop()
+    attendance_writer.stop()  # Writes queued marks before the pool is closed
+    
+    try:
+        get_pool().close_all()
+    except Exception as e:
+        logger.error(f"❌ Error closing database pool: {e}")
 
 def get_embedder() -> FaceEmbedder:
     """Get the global face embedder instance."""
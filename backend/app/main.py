@@ -1,4 +1,5 @@
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import enroll, identify
@@ -8,11 +9,22 @@ import time
 import numpy as np
 import threading
 import logging
-from collections import defaultdict
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional
+from pydantic import BaseModel
 
 from app.core.startup import on_startup, on_shutdown, get_embedder
 from app.services.embedding_cache import embedding_cache
+from app.services.student_directory import student_directory
+from app.services.mjpeg_broadcaster import MjpegBroadcaster
+from app.services.live_recognition import LiveRecognizer
+from app.services.detection_scheduler import DetectionScheduler
+from app.services.identification_events import IdentificationEventHub
+from app.services.attendance_engine import attendance_engine
+from app.services.attendance_writer import attendance_writer
+from app.services.camera_registry import (
+    CameraManager, CameraRegistry, DEFAULT_CAMERA_ID, STREAM_ENROLLMENT, STREAM_IDENTIFY
+)
+from app.services.roi import load_roi_config, set_regions
 from app.core.pinecone_client import index
 from app.api import enroll, identify, fingerprint
 from app.api.video_attendance import router as video_attendance_router
@@ -39,19 +51,6 @@ app.add_middleware(
 # Track enrollment sessions
 enrollment_sessions = {}
 
-# Verification buffer for robust recognition
-# Structure: {session_id: {student_id: [confidence_scores]}}
-verification_buffer: Dict[int, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
-
-# Track marked students to prevent duplicates
-# Structure: {session_id: {student_id: timestamp}}
-marked_students: Dict[int, Dict[str, float]] = defaultdict(dict)
-
-# Configuration
-CONFIDENCE_THRESHOLD = 0.55
-VERIFICATION_COUNT = 3  # Require 3 detections before marking
-COOLDOWN_SECONDS = 600  # 10 minutes cooldown
-
 app.include_router(enroll.router, prefix="/enroll", tags=["Enrollment"])
 app.include_router(identify.router, prefix="/identify", tags=["Identification"])
 app.include_router(fingerprint.router, prefix="/api/fingerprint", tags=["Fingerprint"])
@@ -59,6 +58,29 @@ app.include_router(video_attendance_router, prefix="/api/video-attendance", tags
 
 MATCH_THRESHOLD = 0.55
 
+# Adaptive detection intervals: fastest while new/unidentified faces are in view,
+# slowest for a static scene or a saturated CPU
+LIVE_MIN_INTERVAL = 0.15
+LIVE_MAX_INTERVAL = 1.0
+ENROLL_MIN_INTERVAL = 0.2  # Collecting samples from a face in view
+ENROLL_MAX_INTERVAL = 1.0  # Nobody in front of the camera
+NO_FRAME_TIMEOUT_SECONDS = 3.0  # Restart the camera when no new frame arrives for this long
+
+
+class RoiRequest(BaseModel):
+    regions: List[List[float]]  # Normalized [x1, y1, x2, y2]
+
+
+class LiveAttendanceRequest(BaseModel):
+    session_id: int
+    camera_id: str = DEFAULT_CAMERA_ID
+
+
+class CameraRequest(BaseModel):
+    source: str  # Device index or /dev/videoN, rtsp:// or http(s):// URL, video file, image directory/glob
+    fps: Optional[float] = None  # Replay rate for files and image sequences
+    loop: Optional[bool] = None  # Loop replays (default CAMERA_LOOP)
+
 
 # Startup and shutdown events
 @app.on_event("startup")
@@ -74,273 +96,166 @@ async def shutdown_event():
     await on_shutdown()
     logger.info("Application shutdown complete")
 
-# ============== SHARED CAMERA MANAGER ==============
-class CameraManager:
-    """Thread-safe singleton camera manager"""
-    _instance = None
-    _lock = threading.Lock()
-    
-    def __new__(cls):
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super().__new__(cls)
-                    cls._instance._initialized = False
-        return cls._instance
-    
-    def __init__(self):
-        if self._initialized:
-            return
-        self._initialized = True
-        self.cap = None
-        self.frame_lock = threading.Lock()
-        self.camera_lock = threading.Lock()  # Lock for camera operations
-        self.current_frame = None
-        self.last_frame_time = 0
-        self.is_running = False
-        self.capture_thread = None
-        self.ref_count = 0
-        self.ref_lock = threading.Lock()
-        self.error_count = 0
-        self.max_errors = 5
-        
-    def start(self):
-        """Start camera capture thread"""
-        with self.ref_lock:
-            self.ref_count += 1
-            if self.is_running and self.capture_thread and self.capture_thread.is_alive():
-                print(f"📷 Camera already running, ref_count: {self.ref_count}")
-                return True
-        
-        # Reset error count on new start
-        self.error_count = 0
-        
-        print("📷 Starting camera...")
-        
-        with self.camera_lock:
-            # Release any existing camera
-            if self.cap is not None:
-                try:
-                    self.cap.release()
-                except:
-                    pass
-                self.cap = None
-                time.sleep(0.5)  # Give camera time to release
-            
-            # Try different backends
-            backends = [
-                (cv2.CAP_DSHOW, "DirectShow"),
-                (cv2.CAP_MSMF, "Media Foundation"),
-                (cv2.CAP_ANY, "Default"),
-            ]
-            
-            for backend, name in backends:
-                print(f"📷 Trying {name} backend...")
-                try:
-                    self.cap = cv2.VideoCapture(0, backend)
-                    if self.cap.isOpened():
-                        # Test read
-                        ret, _ = self.cap.read()
-                        if ret:
-                            print(f"✅ Camera opened with {name} backend")
-                            break
-                        else:
-                            self.cap.release()
-                            self.cap = None
-                except Exception as e:
-                    print(f"❌ {name} backend failed: {e}")
-                    if self.cap:
-                        try:
-                            self.cap.release()
-                        except:
-                            pass
-                    self.cap = None
-            
-            if self.cap is None or not self.cap.isOpened():
-                print("❌ Cannot open camera with any backend")
-                with self.ref_lock:
-                    self.ref_count -= 1
-                return False
-            
-            # Set camera properties for better performance
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.cap.set(cv2.CAP_PROP_FPS, 30)
-            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer for real-time
-        
-        self.is_running = True
-        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
-        self.capture_thread.start()
-        
-        # Wait for first frame
-        for _ in range(50):  # Wait up to 5 seconds
-            time.sleep(0.1)
-            with self.frame_lock:
-                if self.current_frame is not None:
-                    print("✅ Camera started successfully")
-                    return True
-        
-        print("⚠️ Camera started but no frames received yet")
-        return True
-    
-    def _capture_loop(self):
-        """Continuously capture frames in background thread"""
-        print("📷 Capture loop started")
-        consecutive_errors = 0
-        
-        while self.is_running:
-            try:
-                with self.camera_lock:
-                    if self.cap is None or not self.cap.isOpened():
-                        print("❌ Camera not available in capture loop")
-                        break
-                    
-                    ret, frame = self.cap.read()
-                
-                if ret and frame is not None:
-                    consecutive_errors = 0
-                    with self.frame_lock:
-                        self.current_frame = frame.copy()
-                        self.last_frame_time = time.time()
-                else:
-                    consecutive_errors += 1
-                    if consecutive_errors > 10:
-                        print(f"⚠️ Too many consecutive read failures ({consecutive_errors})")
-                        time.sleep(0.1)
-                        consecutive_errors = 0  # Reset and try again
-                
-                time.sleep(0.016)  # ~60 FPS capture rate
-                
-            except cv2.error as e:
-                self.error_count += 1
-                print(f"⚠️ OpenCV error in capture loop: {e}")
-                if self.error_count >= self.max_errors:
-                    print("❌ Too many errors, stopping capture loop")
-                    break
-                time.sleep(0.1)
-            except Exception as e:
-                self.error_count += 1
-                print(f"⚠️ Error in capture loop: {e}")
-                if self.error_count >= self.max_errors:
-                    print("❌ Too many errors, stopping capture loop")
-                    break
-                time.sleep(0.1)
-        
-        print("📷 Capture loop ended")
-        self.is_running = False
-    
-    def get_frame(self):
-        """Get the latest frame (thread-safe)"""
-        with self.frame_lock:
-            if self.current_frame is not None:
-                # Check if frame is too old (more than 2 seconds)
-                if time.time() - self.last_frame_time > 2.0:
-                    return False, None
-                return True, self.current_frame.copy()
-            return False, None
-    
-    def is_healthy(self):
-        """Check if camera is working properly"""
-        if not self.is_running:
-            return False
-        if self.capture_thread is None or not self.capture_thread.is_alive():
-            return False
-        with self.frame_lock:
-            if self.current_frame is None:
-                return False
-            if time.time() - self.last_frame_time > 2.0:
-                return False
-        return True
-    
-    def restart(self):
-        """Force restart the camera"""
-        print("🔄 Restarting camera...")
-        self.force_stop()
-        time.sleep(1)
-        return self.start()
-    
-    def stop(self):
-        """Stop camera (only when all refs released)"""
-        with self.ref_lock:
-            self.ref_count -= 1
-            if self.ref_count > 0:
-                print(f"📷 Camera still in use, ref_count: {self.ref_count}")
-                return
-        
-        print("📷 Stopping camera...")
-        self.is_running = False
-        
-        if self.capture_thread and self.capture_thread.is_alive():
-            self.capture_thread.join(timeout=2)
-        
-        with self.camera_lock:
-            if self.cap:
-                try:
-                    self.cap.release()
-                except:
-                    pass
-                self.cap = None
-        
-        with self.frame_lock:
-            self.current_frame = None
-        
-        print("✅ Camera stopped")
-    
-    def force_stop(self):
-        """Force stop camera regardless of refs"""
-        print("📷 Force stopping camera...")
-        with self.ref_lock:
-            self.ref_count = 0
-        
-        self.is_running = False
-        
-        if self.capture_thread and self.capture_thread.is_alive():
-            self.capture_thread.join(timeout=2)
-        
-        with self.camera_lock:
-            if self.cap:
-                try:
-                    self.cap.release()
-                except:
-                    pass
-                self.cap = None
-        
-        with self.frame_lock:
-            self.current_frame = None
-        
-        print("✅ Camera force stopped")
+# ============== CAMERAS ==============
+# Cameras by ID (CAMERAS env); each has its own capture thread and reference count
+camera_registry = CameraRegistry()
+
+# Pushes changes of the live identification sets to /identify/events subscribers
+identification_events = IdentificationEventHub()
 
-# Global camera manager
-camera_manager = CameraManager()
+# Per-camera live pipelines, created on first use
+live_recognizers: Dict[str, LiveRecognizer] = {}
+identify_broadcasters: Dict[str, MjpegBroadcaster] = {}
+enrollment_schedulers: Dict[str, DetectionScheduler] = {}  # Active enrollment streams by camera
+pipelines_lock = threading.Lock()
+
+
+def get_camera(camera_id: str) -> CameraManager:
+    """Registered camera, or 404."""
+    try:
+        return camera_registry.get(camera_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Camera {camera_id} not found")
+
+
+def get_live_recognizer(camera: CameraManager) -> LiveRecognizer:
+    """Background recognition for a camera; streams overlay its latest results."""
+    with pipelines_lock:
+        recognizer = live_recognizers.get(camera.camera_id)
+        if recognizer is None:
+            recognizer = LiveRecognizer(
+                camera,
+                get_embedder,
+                index,
+                camera_id=camera.camera_id,
+                match_threshold=MATCH_THRESHOLD,
+                min_interval=LIVE_MIN_INTERVAL,
+                max_interval=LIVE_MAX_INTERVAL,
+                on_change=identification_events.publish,
+                on_results=attendance_engine.observe
+            )
+            live_recognizers[camera.camera_id] = recognizer
+        return recognizer
+
+
+def acquire_live_recognition(camera_id: str) -> Callable[[], None]:
+    """
+    Run a camera's live recognition without a viewer (live attendance).
+    Returns the function that releases it.
+
+    Raises:
+        RuntimeError: If the camera is unknown or cannot be started
+    """
+    try:
+        camera = camera_registry.get(camera_id)
+    except KeyError:
+        raise RuntimeError(f"Camera {camera_id} not found")
+    if not camera.start():
+        raise RuntimeError(f"Camera {camera_id} could not be started")
+    recognizer = get_live_recognizer(camera)
+    recognizer.start()
+
+    def release() -> None:
+        recognizer.stop()
+        camera.stop()
+    return release
+
+
+attendance_engine.feed = acquire_live_recognition
+
+
+def get_identify_broadcaster(camera: CameraManager) -> MjpegBroadcaster:
+    """One producer per camera runs inference overlay and JPEG encoding for all its viewers."""
+    with pipelines_lock:
+        broadcaster = identify_broadcasters.get(camera.camera_id)
+        if broadcaster is None:
+            broadcaster = MjpegBroadcaster(
+                lambda: generate_identify_frames(camera),
+                name=f"identify-feed-{camera.camera_id}",
+                latency=camera.latency[STREAM_IDENTIFY]
+            )
+            identify_broadcasters[camera.camera_id] = broadcaster
+        return broadcaster
+
+
+def detection_status(camera_id: str) -> Dict:
+    """Effective detection rates of a camera's live recognizer and enrollment stream."""
+    with pipelines_lock:
+        recognizer = live_recognizers.get(camera_id)
+        enrollment = enrollment_schedulers.get(camera_id)
+    return {
+        "identify": recognizer.scheduler.get_stats() if recognizer is not None and recognizer.ref_count else None,
+        "enrollment": enrollment.get_stats() if enrollment is not None else None
+    }
+
+
+def remove_pipelines(camera_id: str) -> None:
+    """
+    Stop and forget the live pipelines of a removed or replaced camera, so
+    they never publish next to the pipelines of its replacement. Blocking:
+    waits for the recognizer to exit.
+    """
+    with pipelines_lock:
+        recognizer = live_recognizers.pop(camera_id, None)
+        broadcaster = identify_broadcasters.pop(camera_id, None)
+    if broadcaster is not None:
+        broadcaster.close()
+    if recognizer is not None:
+        recognizer.close()
+        # Its faces are gone; the replacement (if any) publishes its own
+        cleared = dict(recognizer.get_results(), faces=[], last_update=time.time())
+        identification_events.publish(cleared)
+        attendance_engine.observe(cleared)
 
-# Store latest identification results for overlay
-identification_results = {
-    'faces': [],
-    'last_update': 0
-}
-results_lock = threading.Lock()
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Clean up camera on shutdown"""
-    camera_manager.force_stop()
+    """Clean up cameras on shutdown"""
+    camera_registry.stop_all()
 
 @app.get("/camera/status")
-async def camera_status():
-    """Check camera health"""
-    return {
-        "is_running": camera_manager.is_running,
-        "is_healthy": camera_manager.is_healthy(),
-        "ref_count": camera_manager.ref_count,
-        "error_count": camera_manager.error_count
-    }
+async def camera_status(camera_id: str = Query(DEFAULT_CAMERA_ID)):
+    """Check camera health and detection rates"""
+    return {**get_camera(camera_id).get_status(), "detection": detection_status(camera_id)}
 
 @app.post("/camera/restart")
-async def restart_camera():
+async def restart_camera(camera_id: str = Query(DEFAULT_CAMERA_ID)):
     """Force restart camera"""
-    success = camera_manager.restart()
+    camera = get_camera(camera_id)
+    success = await run_in_threadpool(camera.restart)
     return {"success": success, "message": "Camera restarted" if success else "Failed to restart camera"}
 
+@app.get("/cameras")
+async def list_cameras():
+    """List registered cameras with their health state"""
+    cameras = {
+        camera_id: {**status, "detection": detection_status(camera_id)}
+        for camera_id, status in camera_registry.get_status().items()
+    }
+    return {"success": True, "default": DEFAULT_CAMERA_ID, "cameras": cameras}
+
+@app.put("/cameras/{camera_id}")
+async def put_camera(camera_id: str, request: CameraRequest):
+    """Register a camera (device, RTSP/HTTP URL, video file or image sequence), replacing any with the same ID"""
+    try:
+        camera = await run_in_threadpool(
+            camera_registry.register, camera_id, request.source, request.fps, request.loop
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await run_in_threadpool(remove_pipelines, camera_id)
+    return {"success": True, "camera": camera.get_status()}
+
+@app.delete("/cameras/{camera_id}")
+async def delete_camera(camera_id: str):
+    """Stop and remove a camera"""
+    try:
+        await run_in_threadpool(camera_registry.remove, camera_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Camera {camera_id} not found")
+    await run_in_threadpool(remove_pipelines, camera_id)
+    return {"success": True, "camera_id": camera_id}
+
 @app.post("/enroll/webcam/start")
 async def start_webcam_enrollment(student_id: str = Query(...)):
     """Initialize webcam enrollment session"""
@@ -381,12 +296,12 @@ async def start_webcam_enrollment(student_id: str = Query(...)):
         "embedding_dimension": 512,
     }
 
-def generate_enrollment_frames(student_id: str):
+def generate_enrollment_frames(student_id: str, camera: CameraManager):
     """Generate video frames and collect face samples during enrollment"""
     # Get the global embedder instance
     embedder = get_embedder()
     
-    if not camera_manager.start():
+    if not camera.start():
         print("ERROR: Cannot start camera")
         # Yield an error frame
         error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
@@ -398,7 +313,7 @@ def generate_enrollment_frames(student_id: str):
                    b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
         return
     
-    print(f"Camera ready for student {student_id}")
+    print(f"Camera {camera.camera_id} ready for student {student_id}")
     
     # Initialize session with proper structure
     enrollment_sessions[student_id] = {
@@ -410,32 +325,39 @@ def generate_enrollment_frames(student_id: str):
     embeddings = []
     frame_count = 0
     target_samples = 15
-    last_detection_time = 0
-    no_frame_count = 0
+    scheduler = DetectionScheduler(ENROLL_MIN_INTERVAL, ENROLL_MAX_INTERVAL)
+    with pipelines_lock:
+        enrollment_schedulers[camera.camera_id] = scheduler
+    face_in_view = False
+    last_seq = 0
+    frame = None  # Drawing buffer, reused for every frame
     
     try:
         while len(embeddings) < target_samples:
-            ret, frame = camera_manager.get_frame()
-            if not ret or frame is None:
-                no_frame_count += 1
-                if no_frame_count > 100:  # ~3 seconds of no frames
-                    print("⚠️ No frames for too long, attempting camera restart")
-                    if camera_manager.restart():
-                        no_frame_count = 0
-                    else:
-                        break
-                time.sleep(0.03)
-                continue
+            ref = camera.copy_frame(after_seq=last_seq, timeout=NO_FRAME_TIMEOUT_SECONDS, out=frame)
+            if ref is None:
+                print("⚠️ No frames for too long, attempting camera restart")
+                if camera.restart():
+                    continue
+                break
             
-            no_frame_count = 0
+            last_seq = ref.seq
+            frame = ref.frame
             frame_count += 1
             current_time = time.time()
             
-            # Detect faces every 200ms (5 times per second)
-            if current_time - last_detection_time >= 0.2:
-                last_detection_time = current_time
+            # Detect faces at the scheduled rate: fast while a face is in view, backing off when empty or under load
+            if scheduler.due(current_time):
                 try:
                     faces = embedder.app.get(frame)
+                    scheduler.update(
+                        time.time(),
+                        faces=len(faces),
+                        new_faces=int(bool(faces) and not face_in_view),
+                        unconfirmed=len(faces),  # Every face in view still yields samples
+                        busy_seconds=time.time() - current_time
+                    )
+                    face_in_view = bool(faces)
                     
                     if len(faces) > 0:
                         # Get first face embedding
@@ -484,11 +406,10 @@ def generate_enrollment_frames(student_id: str):
                 
             frame_bytes = buffer.tobytes()
             
-            # Yield frame in multipart format
+            # Yield frame in multipart format (paced by the camera: the next wait blocks until a new frame)
             yield (b'--frame\r\n'
                    b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            
-            time.sleep(0.033)  # ~30 FPS output
+            camera.latency[STREAM_ENROLLMENT].record(time.time() - ref.timestamp)  # Resumed after the chunk was sent
         
         # Store embeddings for this session
         enrollment_sessions[student_id] = {
@@ -505,17 +426,15 @@ def generate_enrollment_frames(student_id: str):
         import traceback
         traceback.print_exc()
     finally:
-        camera_manager.stop()
-        print(f"Camera released for student {student_id}")
+        with pipelines_lock:
+            if enrollment_schedulers.get(camera.camera_id) is scheduler:
+                del enrollment_schedulers[camera.camera_id]
+        camera.stop()
+        print(f"Camera {camera.camera_id} released for student {student_id}")
 
-def generate_identify_frames():
+def generate_identify_frames(camera: CameraManager):
     """Generate video frames for identification mode with live recognition"""
-    global identification_results
-    
-    # Get the global embedder instance
-    embedder = get_embedder()
-    
-    if not camera_manager.start():
+    if not camera.start():
         print("ERROR: Cannot start camera for identification")
         # Yield an error frame
         error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
@@ -527,98 +446,40 @@ def generate_identify_frames():
                    b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
         return
     
-    print("Camera ready for identification mode")
-    last_detection_time = 0
-    cached_faces = []  # Cache face detection results
-    no_frame_count = 0
+    print(f"Camera {camera.camera_id} ready for identification mode")
+    last_seq = 0
+    frame = None  # Drawing buffer, reused for every frame
+    
+    # Recognition runs in a background worker; this loop only overlays its latest results
+    live_recognizer = get_live_recognizer(camera)
+    live_recognizer.start()
     
     try:
         while True:
             # Check if camera is still healthy
-            if not camera_manager.is_running:
+            if not camera.is_running:
                 print("⚠️ Camera stopped, attempting restart...")
-                if not camera_manager.restart():
+                if not camera.restart():
                     break
             
-            ret, frame = camera_manager.get_frame()
-            if not ret or frame is None:
-                no_frame_count += 1
-                if no_frame_count > 100:  # ~3 seconds of no frames
-                    print("⚠️ No frames for too long, attempting camera restart")
-                    if camera_manager.restart():
-                        no_frame_count = 0
-                    else:
-                        # Send error frame
-                        error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                        cv2.putText(error_frame, "Camera Error - Reconnecting...", (80, 240),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        ret, buffer = cv2.imencode('.jpg', error_frame)
-                        if ret:
-                            yield (b'--frame\r\n'
-                                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-                time.sleep(0.03)
+            # Wait for a frame newer than the last one sent (copied into the reused drawing buffer)
+            ref = camera.copy_frame(after_seq=last_seq, timeout=NO_FRAME_TIMEOUT_SECONDS, out=frame)
+            if ref is None:
+                print("⚠️ No frames for too long, attempting camera restart")
+                if not camera.restart():
+                    # Send error frame
+                    error_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+                    cv2.putText(error_frame, "Camera Error - Reconnecting...", (80, 240),
+                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                    ret, buffer = cv2.imencode('.jpg', error_frame)
+                    if ret:
+                        yield (b'--frame\r\n'
+                               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
                 continue
             
-            no_frame_count = 0
-            current_time = time.time()
-            
-            # Run face detection/identification every 300ms (reduced CPU load)
-            if current_time - last_detection_time >= 0.3:
-                last_detection_time = current_time
-                try:
-                    faces = embedder.app.get(frame)
-                    cached_faces = []
-                    
-                    for face in faces:
-                        bbox = face.bbox.astype(int)
-                        embedding = face.embedding / np.linalg.norm(face.embedding)
-                        
-                        # Try local cache first
-                        cache_result = embedding_cache.search(embedding, top_k=1, threshold=MATCH_THRESHOLD)
-                        
-                        identity = "Student"
-                        confidence = 0.0
-                        source = "none"
-                        
-                        if cache_result and len(cache_result) > 0:
-                            # Cache hit
-                            identity = cache_result[0]['student_id']
-                            confidence = cache_result[0]['score']
-                            source = "cache"
-                            logger.info(f"Cache hit: {identity} ({confidence:.3f})")
-                        else:
-                            # Cache miss - query Pinecone
-                            logger.info("Cache miss, querying Pinecone...")
-                            result = index.query(
-                                vector=embedding.tolist(),
-                                top_k=1,
-                                include_metadata=True
-                            )
-                            
-                            if result["matches"]:
-                                match = result["matches"][0]
-                                confidence = float(match["score"])
-                                
-                                if confidence >= MATCH_THRESHOLD:
-                                    identity = str(match["id"])
-                                    source = "pinecone"
-                        
-                        cached_faces.append({
-                            'bbox': bbox.tolist(),
-                            'identity': identity,
-                            'confidence': confidence,
-                            'source': source
-                        })
-                    
-                    # Update global results for POST endpoint
-                    with results_lock:
-                        identification_results['faces'] = cached_faces
-                        identification_results['last_update'] = current_time
-                        
-                except Exception as e:
-                    print(f"Error in identification: {e}")
-                    import traceback
-                    traceback.print_exc()
+            last_seq = ref.seq
+            frame = ref.frame
+            cached_faces = live_recognizer.get_results()['faces']
             
             # Draw cached face results on frame
             for face_data in cached_faces:
@@ -629,10 +490,10 @@ def generate_identify_frames():
                 confidence = face_data['confidence']
                 source = face_data.get('source', 'none')
                 
-                color = (0, 255, 0) if identity != "Unknown" else (0, 0, 255)
+                color = (0, 255, 0) if face_data.get('matched') else (0, 0, 255)
                 
                 cv2.rectangle(frame, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 2)
-                label = f"{identity} ({confidence:.2f})"
+                label = f"{face_data.get('name') or identity} ({confidence:.2f})"
                 cv2.putText(frame, label, (bbox[0], bbox[1]-10),
                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
                 
@@ -655,10 +516,9 @@ def generate_identify_frames():
                 continue
             
             frame_bytes = buffer.tobytes()
+            # Capture time goes with the chunk so the broadcaster can measure capture-to-client latency
             yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            
-            time.sleep(0.033)  # ~30 FPS output
+                   b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n', ref.timestamp)
             
     except GeneratorExit:
         print("Client disconnected from identification feed")
@@ -667,16 +527,22 @@ def generate_identify_frames():
         import traceback
         traceback.print_exc()
     finally:
-        camera_manager.stop()
-        print("Camera released from identification mode")
+        live_recognizer.stop()
+        camera.stop()
+        print(f"Camera {camera.camera_id} released from identification mode")
 
 @app.get("/video_feed")
-async def video_feed(student_id: str = Query(None), mode: str = Query("enroll")):
-    """Stream webcam video feed"""
+async def video_feed(
+    student_id: str = Query(None),
+    mode: str = Query("enroll"),
+    camera_id: str = Query(DEFAULT_CAMERA_ID)
+):
+    """Stream a camera's video feed"""
+    camera = get_camera(camera_id)
     if mode == "identify":
-        print("📹 Starting identification video feed")
+        print(f"📹 Starting identification video feed for camera {camera_id}")
         return StreamingResponse(
-            generate_identify_frames(),
+            get_identify_broadcaster(camera).subscribe(),
             media_type="multipart/x-mixed-replace; boundary=frame"
         )
     else:
@@ -684,19 +550,71 @@ async def video_feed(student_id: str = Query(None), mode: str = Query("enroll"))
             raise HTTPException(status_code=400, detail="student_id required for enrollment mode")
         print(f"📹 Video feed requested for student: {student_id}")
         return StreamingResponse(
-            generate_enrollment_frames(student_id),
+            generate_enrollment_frames(student_id, camera),
             media_type="multipart/x-mixed-replace; boundary=frame"
         )
 
 @app.get("/identify/latest")
-async def get_latest_identification():
+async def get_latest_identification(camera_id: str = Query(DEFAULT_CAMERA_ID)):
     """Get latest identification results (use this instead of POST /identify/webcam)"""
-    with results_lock:
-        return {
-            "success": True,
-            "faces": identification_results['faces'],
-            "last_update": identification_results['last_update']
-        }
+    return {"success": True, **get_live_recognizer(get_camera(camera_id)).get_results()}
+
+@app.get("/identify/events")
+async def identification_event_stream(
+    request: Request,
+    session_id: Optional[int] = Query(None),
+    camera_id: str = Query(DEFAULT_CAMERA_ID)
+):
+    """
+    Server-sent events for the live feed: a "snapshot" event on connect, then
+    a "faces" event with new/changed/left diffs whenever the identified set
+    changes. With session_id, only students of the session's class are sent.
+    """
+    get_camera(camera_id)
+    roster = None
+    if session_id is not None:
+        roster = await run_in_threadpool(student_directory.session_roster, session_id)
+        if roster is None:
+            raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+
+    return StreamingResponse(
+        identification_events.stream(camera_id, roster, is_disconnected=request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/roi")
+async def get_roi_config():
+    """Get the configured detection regions per camera and per session"""
+    return {"success": True, **load_roi_config()}
+
+
+@app.put("/roi/{kind}/{key}")
+async def put_roi(kind: str, key: str, request: RoiRequest):
+    """
+    Set the detection regions of a camera or session.
+    
+    Args:
+        kind: "cameras" or "sessions"
+        key: Camera ID or session ID
+        request: Normalized [x1, y1, x2, y2] regions
+    """
+    try:
+        config = set_regions(kind, key, request.regions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, **config}
+
+
+@app.delete("/roi/{kind}/{key}")
+async def delete_roi(kind: str, key: str):
+    """Remove the detection regions of a camera or session (falls back to automatic ROI)"""
+    try:
+        config = set_regions(kind, key, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, **config}
 
 @app.post("/enroll/webcam")
 async def enroll_webcam(student_id: str = Query(...)):
@@ -767,90 +685,45 @@ async def check_enrollment_status(student_id: str = Query(...)):
     }
 
 
-# ============== VERIFICATION BUFFER HELPERS ==============
+# ============== LIVE ATTENDANCE ==============
 
-def add_to_verification_buffer(session_id: int, student_id: str, confidence: float) -> bool:
+@app.post("/attendance/live/start")
+async def start_live_attendance(request: LiveAttendanceRequest):
     """
-    Add a detection to the verification buffer.
-    Returns True if student should be marked (passed verification).
-    
-    Args:
-        session_id: Session ID for attendance
-        student_id: Student identifier
-        confidence: Recognition confidence score
-        
-    Returns:
-        bool: True if verification passed and attendance should be marked
+    Mark attendance for a session from a camera's live recognition
+    (N-of-M verification, cooldown, batched database writes). The session
+    keeps the camera's recognition running until it is stopped, whether or
+    not anyone watches the identify feed.
     """
-    # Add confidence score to buffer
-    verification_buffer[session_id][student_id].append(confidence)
-    
-    # Keep only last VERIFICATION_COUNT scores
-    if len(verification_buffer[session_id][student_id]) > VERIFICATION_COUNT:
-        verification_buffer[session_id][student_id] = \
-            verification_buffer[session_id][student_id][-VERIFICATION_COUNT:]
-    
-    # Check if we have enough detections
-    if len(verification_buffer[session_id][student_id]) >= VERIFICATION_COUNT:
-        # Calculate average confidence
-        avg_confidence = np.mean(verification_buffer[session_id][student_id])
-        
-        logger.info(
-            f"Verification check - Student: {student_id}, "
-            f"Detections: {len(verification_buffer[session_id][student_id])}, "
-            f"Avg confidence: {avg_confidence:.3f}"
-        )
-        
-        # Check if average meets threshold
-        if avg_confidence >= CONFIDENCE_THRESHOLD:
-            # Check for duplicates and cooldown
-            if should_mark_attendance(session_id, student_id):
-                # Clear buffer for this student
-                verification_buffer[session_id][student_id].clear()
-                return True
-    
-    return False
+    get_camera(request.camera_id)
+    try:
+        session = await run_in_threadpool(attendance_engine.start_session, request.session_id, request.camera_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Session {request.session_id} not found")
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=f"Live recognition unavailable: {e}")
+    except Exception as e:
+        logger.error(f"Error starting live attendance: {e}")
+        raise HTTPException(status_code=500, detail=f"Could not start live attendance: {str(e)}")
+    return {"success": True, "session": session}
 
 
-def should_mark_attendance(session_id: int, student_id: str) -> bool:
-    """
-    Check if attendance should be marked for this student.
-    Prevents duplicates and enforces cooldown.
-    
-    Args:
-        session_id: Session ID for attendance
-        student_id: Student identifier
-        
-    Returns:
-        bool: True if attendance can be marked
-    """
-    current_time = time.time()
-    
-    # Check if already marked in this session
-    if student_id in marked_students[session_id]:
-        last_marked_time = marked_students[session_id][student_id]
-        
-        # Check cooldown
-        if current_time - last_marked_time < COOLDOWN_SECONDS:
-            logger.info(
-                f"Cooldown active for student {student_id} "
-                f"(marked {int(current_time - last_marked_time)}s ago)"
-            )
-            return False
-    
-    # Mark as attended
-    marked_students[session_id][student_id] = current_time
-    logger.info(f"✅ Attendance marked for student {student_id} in session {session_id}")
-    return True
+@app.post("/attendance/live/{session_id}/stop")
+async def stop_live_attendance(session_id: int):
+    """Stop live attendance for a session (queued marks are still written)"""
+    session = await run_in_threadpool(attendance_engine.end_session, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No live attendance for session {session_id}")
+    return {"success": True, "session": session}
 
 
-def clear_session_data(session_id: int):
-    """Clear verification buffer and marked students for a session."""
-    if session_id in verification_buffer:
-        del verification_buffer[session_id]
-    if session_id in marked_students:
-        del marked_students[session_id]
-    logger.info(f"Cleared session data for session {session_id}")
+@app.get("/attendance/live/{session_id}")
+async def get_live_attendance(session_id: int):
+    """Students marked so far by live attendance for a session"""
+    session = attendance_engine.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No live attendance for session {session_id}")
+    return {"success": True, "session": session}
 
 
 @app.get("/health")
@@ -862,8 +735,14 @@ async def health_check():
     return {
         "status": "healthy",
         "cache": cache_stats,
+        "student_directory": student_directory.get_stats(),
+        "cameras": camera_registry.get_status(),
+        "identify_feeds": {camera_id: b.get_stats() for camera_id, b in list(identify_broadcasters.items())},
+        "detection": {camera_id: detection_status(camera_id) for camera_id in camera_registry.camera_ids()},
+        "identify_events": identification_events.get_stats(),
         "gpu_enabled": embedder.ctx_id == 0,
-        "active_sessions": len(verification_buffer),
+        "attendance": attendance_engine.get_stats(),
+        "attendance_writer": attendance_writer.get_stats(),
         "timestamp": time.time()
     }
 
@@ -1,54 +1,59 @@
 """
 Video Face Recognition Script
 =============================
-Analyzes a video file, detects faces using RetinaFace (InsightFace),
-generates embeddings, matches with Pinecone, and outputs results to JSON.
+Analyzes video files with the same pipeline as POST /api/video-attendance/analyze
+(process_video_frames: adaptive frame sampling, ROI detection, face tracking,
+quality gate, one gallery search per track) and outputs results to JSON.
+Individual detections are streamed to a detection store
+(output/analyses/<name>/detections.jsonl); the JSON summary only keeps
+per-person aggregates (first/last seen, count, mean confidence, merged
+appearance intervals), so its size does not grow with video length.
 
 Usage:
-    python -m app.scripts.analyze_video
+    python -m app.scripts.analyze_video                      # interactive, one file
+    python -m app.scripts.analyze_video recordings/ --workers 2
+    python -m app.scripts.analyze_video "recordings/*.mp4" --annotate --force
+
+Batch mode processes every video in the given directories/globs with a pool
+of worker processes (one loaded model per worker), skips videos whose
+content hash was already analyzed with the same configuration (the one the
+API result cache keys on), and writes a combined summary next to the
+per-video results.
 
 Tech Stack:
     - RetinaFace (InsightFace) for face detection
     - ArcFace (InsightFace) for face embeddings
-    - Pinecone for vector matching
+    - Embedding cache, then Pinecone for vector matching
 """
 
-import cv2
+import argparse
+import glob
 import time
 import json
-import numpy as np
 import os
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import defaultdict
 
-from app.services.face_embedding import FaceEmbedder
-from app.core.pinecone_client import index
+from app.api.video_attendance import (
+    MATCH_THRESHOLD, analysis_config, build_attendance, get_embedder, process_video_frames, summarize_tracks
+)
+from app.services.annotation_renderer import render_annotated_video
+from app.services.detection_store import DetectionWriter
+from app.services.frame_reader import SharedFrameReader
+from app.services.video_hash import file_sha256
 
 # ---------- CONFIG ----------
-FRAME_SKIP = 5              # Process every N frames (adjust based on video FPS)
-MATCH_THRESHOLD = 0.55       # Minimum score for a match
-MAX_WORKERS = 5              # Parallel Pinecone queries
-MIN_FACE_CONFIDENCE = 0.6    # Minimum face detection confidence
 OUTPUT_DIR = Path(__file__).parent.parent.parent / "output"
+MANIFEST_PATH = OUTPUT_DIR / "batch_manifest.json"   # {content_hash: analysis record}
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v"}
+INTERVAL_GAP_SECONDS = 2.0   # Tracks of a person closer than this form one appearance interval
 
-# ---------- INIT ----------
-embedder = FaceEmbedder()
-executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
 
-
-def query_face(embedding_list):
-    """Query Pinecone for a single face"""
-    try:
-        return index.query(
-            vector=embedding_list,
-            top_k=1,
-            include_metadata=True
-        )
-    except Exception as e:
-        print(f"[ERROR] Pinecone query failed: {e}")
-        return {"matches": []}
+def config_signature():
+    """Settings that affect results (the API result cache key config); a cached analysis is reused only if they match."""
+    return analysis_config()
 
 
 def format_timestamp(seconds):
@@ -59,101 +64,56 @@ def format_timestamp(seconds):
     return f"{hours:02d}:{minutes:02d}:{secs:06.3f}"
 
 
-def extract_video_info(cap):
-    """Extract video metadata"""
-    return {
-        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
-        "fps": cap.get(cv2.CAP_PROP_FPS),
-        "total_frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
-        "duration_seconds": cap.get(cv2.CAP_PROP_FRAME_COUNT) / cap.get(cv2.CAP_PROP_FPS)
-    }
+def merge_intervals(intervals):
+    """Merge (start, end) intervals closer than INTERVAL_GAP_SECONDS."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start - merged[-1][1] <= INTERVAL_GAP_SECONDS:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [[round(start, 3), round(end, 3)] for start, end in merged]
 
 
-def process_frame(frame, frame_number, fps):
-    """
-    Process a single frame: detect faces, generate embeddings, match with Pinecone.
-    
-    Returns:
-        List of detected faces with identity info
-    """
-    h, w, _ = frame.shape
-    timestamp = frame_number / fps
-    
-    # Detect faces using InsightFace
-    faces = embedder.app.get(frame)
-    
-    if len(faces) == 0:
-        return []
-    
-    # Prepare embeddings and bounding boxes
-    embeddings = []
-    face_data_list = []
-    
-    for face_data in faces:
-        # Skip low confidence detections
-        if face_data.det_score < MIN_FACE_CONFIDENCE:
-            continue
-        
-        # Extract bounding box
-        bbox = face_data.bbox.astype(int)
-        x1, y1, x2, y2 = bbox[0], bbox[1], bbox[2], bbox[3]
-        
-        # Ensure bounds are valid
-        x1, y1 = max(0, x1), max(0, y1)
-        x2, y2 = min(w, x2), min(h, y2)
-        
-        # Get normalized embedding
-        embedding = face_data.embedding / np.linalg.norm(face_data.embedding)
-        embeddings.append(embedding.tolist())
-        
-        face_data_list.append({
-            "bbox": {"x1": int(x1), "y1": int(y1), "x2": int(x2), "y2": int(y2)},
-            "detection_confidence": float(round(face_data.det_score, 3))
-        })
-    
-    if len(embeddings) == 0:
-        return []
-    
-    # Parallel Pinecone queries
-    results = list(executor.map(query_face, embeddings))
-    
-    # Process results
-    frame_faces = []
-    for i, result in enumerate(results):
-        identity = "Unknown"
-        match_score = 0.0
-        matched = False
-        
-        if result["matches"]:
-            match = result["matches"][0]
-            match_score = float(match["score"])
-            
-            if match_score >= MATCH_THRESHOLD:
-                identity = str(match["id"])
-                matched = True
-        
-        frame_faces.append({
-            "identity": identity,
-            "match_score": round(match_score, 3),
-            "matched": matched,
-            "bbox": face_data_list[i]["bbox"],
-            "detection_confidence": face_data_list[i]["detection_confidence"],
-            "frame_number": frame_number,
-            "timestamp": format_timestamp(timestamp),
-            "timestamp_seconds": round(timestamp, 3)
-        })
-    
-    return frame_faces
+def summarize_people(track_summaries, fps):
+    """Per-student aggregates, with the same matching and minimum detections as the API."""
+    people = {}
+    for student in build_attendance(track_summaries, fps):
+        student_id = student["student_id"]
+        intervals = merge_intervals(
+            (t["first_seen_seconds"], t["last_seen_seconds"])
+            for t in track_summaries
+            if t["candidates"] and t["candidates"][0]["student_id"] == student_id
+            and t["candidates"][0]["score"] >= MATCH_THRESHOLD
+        )
+        people[student_id] = {
+            "total_appearances": student["detection_count"],
+            "tracks": student["track_count"],
+            "first_seen": format_timestamp(student["first_seen_seconds"]),
+            "last_seen": format_timestamp(student["last_seen_seconds"]),
+            "first_seen_seconds": student["first_seen_seconds"],
+            "last_seen_seconds": student["last_seen_seconds"],
+            "duration_in_video": round(student["last_seen_seconds"] - student["first_seen_seconds"], 3),
+            "average_confidence": student["average_confidence"],
+            "intervals": intervals
+        }
+    return people
 
 
-def analyze_video(video_path: str, output_annotated: bool = False):
+def analyze_video(
+    video_path: str,
+    output_annotated: bool = False,
+    show_progress: bool = True,
+    content_hash: str = None
+):
     """
     Main function to analyze a video file.
     
     Args:
         video_path: Path to the video file
-        output_annotated: If True, save an annotated video with bounding boxes
+        output_annotated: If True, render an annotated video from the detection store
+        show_progress: Print the analysis banner (disabled in batch workers)
+        content_hash: SHA-256 of the video, recorded in the results if known
     
     Returns:
         Dict containing analysis results
@@ -163,193 +123,118 @@ def analyze_video(video_path: str, output_annotated: bool = False):
     if not video_path.exists():
         raise FileNotFoundError(f"Video not found: {video_path}")
     
-    print(f"\n{'='*60}")
-    print(f"VIDEO FACE RECOGNITION ANALYSIS")
-    print(f"{'='*60}")
-    print(f"[INFO] Video: {video_path.name}")
-    print(f"[INFO] Using RetinaFace for detection, ArcFace for embeddings")
-    print(f"[INFO] Match threshold: {MATCH_THRESHOLD}")
-    print(f"[INFO] Processing every {FRAME_SKIP} frames")
-    print(f"{'='*60}\n")
-    
-    # Open video
-    cap = cv2.VideoCapture(str(video_path))
+    # Decode in a separate process into shared memory (raises ValueError if unreadable)
+    reader = SharedFrameReader(video_path)
+    fps = reader.fps
+    total_frames = reader.total_frames
+    video_info = {
+        "width": reader.width,
+        "height": reader.height,
+        "fps": fps,
+        "total_frames": total_frames,
+        "duration_seconds": total_frames / fps if fps else 0.0
+    }
     
-    if not cap.isOpened():
-        raise ValueError(f"Could not open video: {video_path}")
+    if show_progress:
+        print(f"\n{'='*60}")
+        print(f"VIDEO FACE RECOGNITION ANALYSIS")
+        print(f"{'='*60}")
+        print(f"[INFO] Video: {video_path.name}")
+        print(f"[INFO] Resolution: {video_info['width']}x{video_info['height']}, FPS: {fps:.2f}")
+        print(f"[INFO] Duration: {format_timestamp(video_info['duration_seconds'])} ({total_frames} frames)")
+        print(f"[INFO] Match threshold: {MATCH_THRESHOLD}")
+        print(f"{'='*60}\n")
+    
+    # Same-named recordings from different folders must not overwrite each other in batch runs
+    name_stem = f"{video_path.stem}_{content_hash[:8]}" if content_hash else video_path.stem
+    run_timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    
+    # Individual detections are streamed to the detection store
+    store_dir = OUTPUT_DIR / "analyses" / f"{name_stem}_{run_timestamp}"
+    detection_writer = DetectionWriter(store_dir)
+    start_time = time.time()
     
-    # Get video info
-    video_info = extract_video_info(cap)
-    fps = video_info["fps"]
-    total_frames = video_info["total_frames"]
+    print(f"[PROCESSING] Analyzing {video_path.name}...")
+    try:
+        with reader:
+            stats = process_video_frames(reader, detection_writer)
+        track_summaries = summarize_tracks(stats["finished_tracks"], fps)
+        # Track labels are read by the annotation renderer
+        detection_writer.close(metadata={
+            "content_hash": content_hash,
+            "video_info": video_info,
+            "tracks": track_summaries
+        })
+    finally:
+        if not detection_writer.closed:
+            detection_writer.close()
     
-    print(f"[INFO] Resolution: {video_info['width']}x{video_info['height']}")
-    print(f"[INFO] FPS: {fps:.2f}")
-    print(f"[INFO] Duration: {format_timestamp(video_info['duration_seconds'])}")
-    print(f"[INFO] Total frames: {total_frames}")
-    print(f"[INFO] Frames to process: ~{total_frames // FRAME_SKIP}\n")
+    elapsed_time = time.time() - start_time
+    sampler = stats["sampler"]
+    print(f"[COMPLETE] Processed {stats['processed_count']} of {stats['frame_count']} frames "
+          f"in {format_timestamp(elapsed_time)}")
     
-    # Prepare annotated video writer (if enabled)
-    annotated_writer = None
+    annotated_path = None
     if output_annotated:
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        output_video_path = OUTPUT_DIR / f"annotated_{video_path.stem}.mp4"
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        annotated_writer = cv2.VideoWriter(
-            str(output_video_path),
-            fourcc,
-            fps,
-            (video_info["width"], video_info["height"])
+        annotated_path = render_annotated_video(
+            video_path, OUTPUT_DIR / f"annotated_{name_stem}.mp4", store_dir, None
         )
-        print(f"[INFO] Annotated video will be saved to: {output_video_path}\n")
-    
-    # Analysis results
-    all_detections = []
-    people_appearances = defaultdict(list)  # {identity: [timestamps]}
-    frame_count = 0
-    processed_count = 0
-    start_time = time.time()
-    last_faces = []  # For drawing on skipped frames
-    
-    print("[PROCESSING] Starting video analysis...")
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_count += 1
-        
-        # Process every N frames
-        if frame_count % FRAME_SKIP == 0:
-            processed_count += 1
-            
-            # Process frame
-            frame_faces = process_frame(frame, frame_count, fps)
-            last_faces = frame_faces
-            
-            # Store detections
-            for face in frame_faces:
-                all_detections.append(face)
-                people_appearances[face["identity"]].append({
-                    "timestamp": face["timestamp"],
-                    "timestamp_seconds": face["timestamp_seconds"],
-                    "frame": face["frame_number"],
-                    "confidence": face["match_score"]
-                })
-            
-            # Progress update
-            progress = (frame_count / total_frames) * 100
-            elapsed = time.time() - start_time
-            eta = (elapsed / frame_count) * (total_frames - frame_count) if frame_count > 0 else 0
-            
-            print(f"\r[PROGRESS] {progress:.1f}% | Frame {frame_count}/{total_frames} | "
-                  f"Faces in frame: {len(frame_faces)} | ETA: {format_timestamp(eta)}", end="")
-        
-        # Draw annotations on frame (for video output)
-        if output_annotated and annotated_writer:
-            for face in last_faces:
-                bbox = face["bbox"]
-                color = (0, 255, 0) if face["matched"] else (0, 0, 255)
-                
-                # Draw bounding box
-                cv2.rectangle(
-                    frame,
-                    (bbox["x1"], bbox["y1"]),
-                    (bbox["x2"], bbox["y2"]),
-                    color, 2
-                )
-                
-                # Draw label
-                label = f"{face['identity']} ({face['match_score']:.2f})"
-                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
-                cv2.rectangle(
-                    frame,
-                    (bbox["x1"], bbox["y1"] - 25),
-                    (bbox["x1"] + label_size[0] + 10, bbox["y1"]),
-                    color, -1
-                )
-                cv2.putText(
-                    frame, label,
-                    (bbox["x1"] + 5, bbox["y1"] - 8),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6,
-                    (255, 255, 255), 2
-                )
-            
-            annotated_writer.write(frame)
-    
-    # Cleanup
-    cap.release()
-    if annotated_writer:
-        annotated_writer.release()
+        print(f"[INFO] Annotated video saved to: {annotated_path}")
     
-    elapsed_time = time.time() - start_time
-    
-    print(f"\n\n[COMPLETE] Processed {processed_count} frames in {format_timestamp(elapsed_time)}")
-    
-    # Generate summary
-    people_summary = {}
-    for identity, appearances in people_appearances.items():
-        if identity == "Unknown":
-            continue
-        
-        timestamps = [a["timestamp_seconds"] for a in appearances]
-        people_summary[identity] = {
-            "total_appearances": len(appearances),
-            "first_seen": format_timestamp(min(timestamps)),
-            "last_seen": format_timestamp(max(timestamps)),
-            "first_seen_seconds": min(timestamps),
-            "last_seen_seconds": max(timestamps),
-            "duration_in_video": round(max(timestamps) - min(timestamps), 3),
-            "average_confidence": round(sum(a["confidence"] for a in appearances) / len(appearances), 3),
-            "appearances": appearances
-        }
-    
-    # Unknown faces count
-    unknown_count = len([d for d in all_detections if d["identity"] == "Unknown"])
+    # Generate summary (per-detection data: detections_store)
+    people_summary = summarize_people(track_summaries, fps)
     
     # Final results
     results = {
         "analysis_info": {
             "video_file": str(video_path.name),
             "video_path": str(video_path.absolute()),
+            "content_hash": content_hash,
             "analysis_date": datetime.now().isoformat(),
             "processing_time_seconds": round(elapsed_time, 2),
             "processing_time_formatted": format_timestamp(elapsed_time)
         },
         "video_info": video_info,
         "processing_config": {
-            "frame_skip": FRAME_SKIP,
-            "match_threshold": MATCH_THRESHOLD,
-            "min_face_confidence": MIN_FACE_CONFIDENCE,
-            "frames_processed": processed_count
+            **config_signature(),
+            "frames_processed": stats["processed_count"],
+            "embeddings_computed": stats["embeddings_computed"],
+            "sampling": sampler.get_stats(),
+            "roi": stats["roi"].get_stats(),
+            "quality": stats["quality"].get_stats()
         },
+        "detections_store": str(store_dir),
+        "annotated_video": str(annotated_path) if annotated_path else None,
         "summary": {
-            "total_detections": len(all_detections),
+            "total_detections": sum(t["frames"] for t in track_summaries),
+            "face_tracks": len(track_summaries),
             "unique_people_identified": len(people_summary),
-            "unknown_faces": unknown_count,
+            "unknown_tracks": sum(1 for t in track_summaries if t["student_id"] is None),
             "people_list": list(people_summary.keys())
         },
-        "people": people_summary,
-        "all_detections": all_detections
+        "people": people_summary
     }
     
     # Save JSON output
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    output_json_path = OUTPUT_DIR / f"analysis_{video_path.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output_json_path = OUTPUT_DIR / f"analysis_{name_stem}_{run_timestamp}.json"
     
     with open(output_json_path, "w", encoding="utf-8") as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     
     print(f"\n[OUTPUT] Results saved to: {output_json_path}")
+    results["output_file"] = str(output_json_path)
     
     # Print summary
+    summary = results["summary"]
     print(f"\n{'='*60}")
     print("ANALYSIS SUMMARY")
     print(f"{'='*60}")
-    print(f"Total face detections: {len(all_detections)}")
-    print(f"Unique people identified: {len(people_summary)}")
-    print(f"Unknown faces: {unknown_count}")
+    print(f"Total face detections: {summary['total_detections']} ({summary['face_tracks']} tracks)")
+    print(f"Unique people identified: {summary['unique_people_identified']}")
+    print(f"Unknown face tracks: {summary['unknown_tracks']}")
+    print(f"Per-detection data: {store_dir}")
     print(f"\nPeople found in video:")
     for identity, data in people_summary.items():
         print(f"  • {identity}")
@@ -362,8 +247,186 @@ def analyze_video(video_path: str, output_annotated: bool = False):
     return results
 
 
-def main():
-    """Interactive main function"""
+def find_videos(inputs, recursive: bool = False):
+    """
+    Resolve directories, glob patterns and file paths to a sorted list of videos.
+    
+    Args:
+        inputs: Paths, directories or glob patterns
+        recursive: Descend into subdirectories of directory inputs
+    
+    Returns:
+        List of unique video paths
+    """
+    videos = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            candidates = path.rglob("*") if recursive else path.iterdir()
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = [Path(p) for p in glob.glob(item, recursive=recursive)]
+        
+        for candidate in candidates:
+            if candidate.is_file() and candidate.suffix.lower() in VIDEO_EXTENSIONS:
+                videos.add(candidate.resolve())
+    return sorted(videos)
+
+
+def load_manifest():
+    """Load the batch manifest ({content_hash: analysis record})."""
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    """Write the batch manifest atomically."""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def _init_worker():
+    """Load the model once per worker process."""
+    get_embedder()
+
+
+def _analyze_worker(video_path: str, content_hash: str, output_annotated: bool):
+    """Analyze one video in a worker process and return a compact summary."""
+    results = analyze_video(video_path, output_annotated, show_progress=False, content_hash=content_hash)
+    return {
+        "output_file": results["output_file"],
+        "detections_store": results["detections_store"],
+        "processing_time_seconds": results["analysis_info"]["processing_time_seconds"],
+        "total_detections": results["summary"]["total_detections"],
+        "people": {
+            identity: {
+                "total_appearances": data["total_appearances"],
+                "duration_in_video": data["duration_in_video"],
+                "average_confidence": data["average_confidence"]
+            }
+            for identity, data in results["people"].items()
+        }
+    }
+
+
+def run_batch(inputs, workers: int = 1, output_annotated: bool = False, force: bool = False, recursive: bool = False):
+    """
+    Analyze many videos non-interactively.
+    
+    Videos already in the manifest with the same content hash and
+    configuration are skipped unless force is set.
+    
+    Args:
+        inputs: Directories, glob patterns or files
+        workers: Number of worker processes (each loads its own model)
+        output_annotated: Also write annotated videos
+        force: Re-analyze videos even if already in the manifest
+        recursive: Descend into subdirectories
+    
+    Returns:
+        Combined batch summary
+    """
+    videos = find_videos(inputs, recursive)
+    print(f"[BATCH] Found {len(videos)} videos, {workers} worker(s)")
+    
+    manifest = load_manifest()
+    signature = config_signature()
+    entries = []
+    pending = []
+    
+    for video_path in videos:
+        content_hash = file_sha256(video_path)
+        record = manifest.get(content_hash)
+        if (
+            not force and record is not None
+            and record.get("config") == signature
+            and Path(record.get("output_file", "")).exists()
+        ):
+            print(f"[SKIP] {video_path.name} (already analyzed: {record['output_file']})")
+            entries.append({"video": str(video_path), "content_hash": content_hash, "status": "skipped", **record["result"]})
+            continue
+        pending.append((video_path, content_hash))
+    
+    start_time = time.time()
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_worker) as pool:
+        futures = {
+            pool.submit(_analyze_worker, str(video_path), content_hash, output_annotated): (video_path, content_hash)
+            for video_path, content_hash in pending
+        }
+        for future in as_completed(futures):
+            video_path, content_hash = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[FAILED] {video_path.name}: {e}")
+                entries.append({"video": str(video_path), "content_hash": content_hash, "status": "failed", "error": str(e)})
+                continue
+            
+            print(f"[DONE] {video_path.name}: {len(result['people'])} people, "
+                  f"{result['total_detections']} detections -> {result['output_file']}")
+            entries.append({"video": str(video_path), "content_hash": content_hash, "status": "analyzed", **result})
+            
+            # Record immediately so an interrupted run resumes where it stopped
+            manifest[content_hash] = {
+                "video": str(video_path),
+                "output_file": result["output_file"],
+                "config": signature,
+                "analyzed_at": datetime.now().isoformat(),
+                "result": result
+            }
+            save_manifest(manifest)
+    
+    # Combined per-student summary across all videos
+    students = defaultdict(lambda: {"videos": 0, "total_appearances": 0, "total_duration": 0.0})
+    for entry in entries:
+        for identity, data in entry.get("people", {}).items():
+            students[identity]["videos"] += 1
+            students[identity]["total_appearances"] += data["total_appearances"]
+            students[identity]["total_duration"] = round(
+                students[identity]["total_duration"] + data["duration_in_video"], 3
+            )
+    
+    entries.sort(key=lambda e: e["video"])
+    summary = {
+        "batch_info": {
+            "run_date": datetime.now().isoformat(),
+            "inputs": list(inputs),
+            "workers": workers,
+            "config": signature,
+            "processing_time_seconds": round(time.time() - start_time, 2)
+        },
+        "totals": {
+            "videos": len(entries),
+            "analyzed": sum(1 for e in entries if e["status"] == "analyzed"),
+            "skipped": sum(1 for e in entries if e["status"] == "skipped"),
+            "failed": sum(1 for e in entries if e["status"] == "failed"),
+            "unique_people_identified": len(students)
+        },
+        "students": dict(students),
+        "videos": entries
+    }
+    
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    summary_path = OUTPUT_DIR / f"batch_summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    
+    totals = summary["totals"]
+    print(f"\n[BATCH] {totals['analyzed']} analyzed, {totals['skipped']} skipped, "
+          f"{totals['failed']} failed, {totals['unique_people_identified']} people")
+    print(f"[OUTPUT] Batch summary saved to: {summary_path}")
+    return summary
+
+
+def interactive():
+    """Interactive mode for a single video"""
     print("\n" + "="*60)
     print("VIDEO FACE RECOGNITION - STANDALONE SCRIPT")
     print("="*60 + "\n")
@@ -388,5 +451,20 @@ def main():
         raise
 
 
+def main():
+    """Batch mode when inputs are given, interactive mode otherwise"""
+    parser = argparse.ArgumentParser(description="Analyze videos for face recognition")
+    parser.add_argument("inputs", nargs="*", help="Video files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=1, help="Parallel worker processes (one model each)")
+    parser.add_argument("--annotate", action="store_true", help="Also write annotated videos")
+    parser.add_argument("--force", action="store_true", help="Re-analyze videos already in the manifest")
+    parser.add_argument("--recursive", action="store_true", help="Search directories recursively")
+    args = parser.parse_args()
+    
+    if not args.inputs:
+        return interactive()
+    return run_batch(args.inputs, args.workers, args.annotate, args.force, args.recursive)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,24 +1,51 @@
+"""
+Live face identification from a webcam, stream, video file or image sequence.
+
+Usage:
+    python -m app.scripts.identify                      # CAMERA_SOURCE (webcam by default)
+    python -m app.scripts.identify clip.mp4 --fps 15
+    python -m app.scripts.identify frames/ --headless --max-frames 900   # headless benchmark
+"""
+
+import argparse
 import cv2
 import time
 import numpy as np
 from concurrent.futures import ThreadPoolExecutor
 
 from app.services.face_embedding import FaceEmbedder
+from app.services.frame_sampler import AdaptiveFrameSampler
+from app.services.frame_sources import open_capture
 from app.core.pinecone_client import index
 
 # ---------- PERFORMANCE CONFIG ----------
-FRAME_SKIP = 10          # Run recognition every N frames
-QUERY_COOLDOWN = 2.0     # Seconds to wait before re-querying Pinecone
+MIN_INTERVAL = 0.3       # Fastest recognition rate while the scene is changing (seconds)
+MAX_INTERVAL = 2.0       # Slowest recognition rate for a static scene (seconds)
 MATCH_THRESHOLD = 0.55   # Minimum score for a match
 
+# ---------- ARGS ----------
+parser = argparse.ArgumentParser(description="Live face identification")
+parser.add_argument("source", nargs="?", default=None,
+                    help="Device index, stream URL, video file or image directory/glob (default: CAMERA_SOURCE)")
+parser.add_argument("--fps", type=float, default=None, help="Replay rate for video files and image sequences")
+parser.add_argument("--no-loop", action="store_true", help="Stop at the end of a replayed source")
+parser.add_argument("--headless", action="store_true", help="No preview window (servers, CI, benchmarks)")
+parser.add_argument("--max-frames", type=int, default=0, help="Stop after this many frames (0 = no limit)")
+args = parser.parse_args()
+
 # ---------- INIT ----------
 embedder = FaceEmbedder()
-cap = cv2.VideoCapture(0)
+cap = open_capture(args.source, fps=args.fps, loop=False if args.no_loop else None, label="Identify")
+if cap is None:
+    raise SystemExit("[ERROR] Could not open frame source")
+
+sampler = AdaptiveFrameSampler(MIN_INTERVAL, MAX_INTERVAL)
 
 frame_count = 0
-last_query_time = 0
 prev_frame_time = 0
 fps = 0
+start_time = time.time()
+recognition_time = 0.0
 
 # Store multiple faces: list of dicts with bbox, label, color
 detected_faces = []
@@ -35,7 +62,7 @@ print("\n[INFO] Starting face identification (press Q to quit)")
 print("[INFO] Using ArcFace (InsightFace) for recognition")
 print("[INFO] Multiple face detection enabled\n")
 
-while True:
+while not args.max_frames or frame_count < args.max_frames:
     ret, frame = cap.read()
     if not ret:
         break
@@ -51,13 +78,11 @@ while True:
 
     frame_count += 1
 
-    # Run face detection and recognition
-    should_process = (
-        frame_count % FRAME_SKIP == 0
-        and time.time() - last_query_time > QUERY_COOLDOWN
-    )
+    # Run face detection and recognition when the scene changes
+    should_process = sampler.should_process(frame, current_time)
 
     if should_process:
+        recognition_started = time.time()
         # InsightFace detection + embedding in one call
         faces = embedder.app.get(frame)
         
@@ -108,10 +133,9 @@ while True:
                     "label": label,
                     "color": color
                 })
-
-            last_query_time = time.time()
         else:
             detected_faces = []
+        recognition_time += time.time() - recognition_started
 
     # Draw all detected faces
     for face in detected_faces:
@@ -159,10 +183,19 @@ while True:
         2
     )
 
-    cv2.imshow("Face Identification - ArcFace (Multi-Face)", frame)
+    if not args.headless:
+        cv2.imshow("Face Identification - ArcFace (Multi-Face)", frame)
 
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        break
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            break
 
 cap.release()
-cv2.destroyAllWindows()
+if not args.headless:
+    cv2.destroyAllWindows()
+
+elapsed = time.time() - start_time
+stats = sampler.get_stats()
+print(f"[INFO] Processed {stats['frames_processed']}/{stats['frames_seen']} frames "
+      f"({stats['frames_unchanged']} static frames skipped)")
+print(f"[INFO] {frame_count} frames in {elapsed:.1f}s ({frame_count / elapsed if elapsed else 0:.1f} FPS), "
+      f"recognition {recognition_time / max(stats['frames_processed'], 1) * 1000:.1f} ms per processed frame")
@@ -0,0 +1,381 @@
+"""
+Annotated video outputs: encoder backends, output index and retention.
+Annotated videos are encoded either with OpenCV (mp4v) or by piping raw
+frames into ffmpeg (H.264, browser-playable, configurable CRF/resolution).
+Finished files are recorded in an index so listing does not scan the
+directory, and a background pruner enforces age and total-size limits on
+the annotated videos, the source videos waiting to be rendered and the
+per-analysis detection stores (analyses still referenced by the result
+cache are kept). Partial renders left behind by a crash are removed once
+they have not been written to for PARTIAL_MAX_AGE_SECONDS.
+"""
+
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+# Output directory for annotated videos
+ANNOTATED_VIDEOS_DIR = Path(__file__).parent.parent.parent / "output" / "annotated_videos"
+ANNOTATED_VIDEOS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Source videos kept until their annotated version has been rendered
+PENDING_DIR = ANNOTATED_VIDEOS_DIR / "pending"
+PENDING_DIR.mkdir(parents=True, exist_ok=True)
+SOURCE_SUFFIX = "_source.mp4"
+
+# Per-analysis detection stores (detections, time index, track summaries)
+ANALYSES_DIR = ANNOTATED_VIDEOS_DIR.parent / "analyses"
+ANALYSES_DIR.mkdir(parents=True, exist_ok=True)
+
+# Encoder configuration
+ENCODER_BACKEND = os.getenv("ANNOTATED_ENCODER", "auto")        # auto, ffmpeg or opencv
+FFMPEG_CODEC = os.getenv("ANNOTATED_CODEC", "libx264")          # e.g. h264_nvenc for GPU encoding
+FFMPEG_PRESET = os.getenv("ANNOTATED_PRESET", "veryfast")       # libx264/libx265 only
+ENCODER_CRF = int(os.getenv("ANNOTATED_CRF", "28"))             # Lower = better quality, larger files (x264/x265 CRF, NVENC CQ)
+ENCODER_MAX_WIDTH = int(os.getenv("ANNOTATED_MAX_WIDTH", "1280"))  # Downscale wider videos (0 = keep)
+
+# Retention configuration
+RETENTION_MAX_AGE_DAYS = float(os.getenv("ANNOTATED_MAX_AGE_DAYS", "14"))
+RETENTION_MAX_TOTAL_MB = float(os.getenv("ANNOTATED_MAX_TOTAL_MB", "10240"))
+RETENTION_CHECK_SECONDS = 600
+RETENTION_MIN_AGE_SECONDS = 3600  # Never prune sources/stores younger than this (analysis may be running)
+PARTIAL_MAX_AGE_SECONDS = 6 * 3600  # Partial renders not written to for this long are from crashed renders
+
+INDEX_FILE = "index.json"
+PARTIAL_SUFFIX = ".part.mp4"  # In-progress renders; still .mp4 so writers pick the right container
+
+
+def partial_path(output_path: Path) -> Path:
+    """Temporary name an output is rendered under until it is complete."""
+    return output_path.with_name(output_path.stem + PARTIAL_SUFFIX)
+
+
+def _output_size(width: int, height: int) -> Tuple[int, int]:
+    """Target size after applying ENCODER_MAX_WIDTH (even dimensions for H.264)."""
+    if ENCODER_MAX_WIDTH and width > ENCODER_MAX_WIDTH:
+        height = int(height * ENCODER_MAX_WIDTH / width)
+        width = ENCODER_MAX_WIDTH
+    return width - width % 2, height - height % 2
+
+
+class OpenCVVideoEncoder:
+    """mp4v encoder through cv2.VideoWriter (no external dependencies)."""
+
+    name = "opencv"
+
+    def __init__(self, path: Path, fps: float, size: Tuple[int, int]):
+        self.input_size = size
+        self.size = _output_size(*size)
+        self.writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), fps, self.size, True)
+        if not self.writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {path}")
+
+    def write(self, frame) -> None:
+        if self.size != self.input_size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        self.writer.write(frame)
+
+    def close(self) -> None:
+        self.writer.release()
+
+
+def _quality_args(codec: str) -> List[str]:
+    """Preset and quality options the codec understands (none for other encoders)."""
+    if codec in ("libx264", "libx265"):
+        return ["-preset", FFMPEG_PRESET, "-crf", str(ENCODER_CRF)]
+    if codec.endswith("_nvenc"):
+        return ["-cq", str(ENCODER_CRF)]
+    logger.warning(f"No quality setting for codec {codec}, using its defaults")
+    return []
+
+
+class FFmpegVideoEncoder:
+    """H.264 encoder piping raw BGR frames into an ffmpeg subprocess."""
+
+    name = "ffmpeg"
+
+    def __init__(self, path: Path, fps: float, size: Tuple[int, int]):
+        width, height = size
+        out_width, out_height = _output_size(width, height)
+
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24",
+            "-s", f"{width}x{height}", "-r", f"{fps:.3f}",
+            "-i", "-",
+            "-vf", f"scale={out_width}:{out_height}",
+            "-c:v", FFMPEG_CODEC, *_quality_args(FFMPEG_CODEC),
+            "-pix_fmt", "yuv420p",
+            "-movflags", "+faststart",
+            "-f", "mp4", str(path)
+        ]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, frame) -> None:
+        self.process.stdin.write(frame.tobytes())
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        stderr = self.process.stderr.read()
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+
+
+def create_encoder(path: Path, fps: float, size: Tuple[int, int]):
+    """
+    Create the configured encoder backend.
+
+    ANNOTATED_ENCODER=auto uses ffmpeg when it is on PATH, OpenCV otherwise.
+    """
+    backend = ENCODER_BACKEND
+    if backend == "auto":
+        backend = "ffmpeg" if shutil.which("ffmpeg") else "opencv"
+
+    if backend == "ffmpeg":
+        return FFmpegVideoEncoder(path, fps, size)
+    return OpenCVVideoEncoder(path, fps, size)
+
+
+class OutputIndex:
+    """
+    JSON index of finished annotated videos, so listing does not stat every
+    file. Rebuilt from a directory scan only when the index is missing.
+    """
+
+    def __init__(self, output_dir: Path = ANNOTATED_VIDEOS_DIR):
+        self.output_dir = Path(output_dir)
+        self.index_path = self.output_dir / INDEX_FILE
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        self.load()
+
+    def load(self) -> None:
+        """Load the index, rebuilding it from the directory if missing or corrupt."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        """Rebuild the index from a directory scan."""
+        entries = {}
+        for file_path in self.output_dir.glob("*.mp4"):
+            if file_path.name.endswith(PARTIAL_SUFFIX):
+                continue
+            stat = file_path.stat()
+            entries[file_path.name] = {
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat()  # Same as add()
+            }
+        with self.lock:
+            self.entries = entries
+            self._save()
+        logger.info(f"Rebuilt annotated video index ({len(entries)} files)")
+
+    def _save(self) -> None:
+        """Write the index atomically (caller holds the lock)."""
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.index_path)
+
+    def add(self, file_path: Path) -> None:
+        """Record a finished output file."""
+        stat = file_path.stat()
+        with self.lock:
+            self.entries[file_path.name] = {
+                "size_bytes": stat.st_size,
+                "created_at": datetime.fromtimestamp(stat.st_mtime).isoformat()
+            }
+            self._save()
+
+    def remove(self, filename: str) -> None:
+        """Forget an output file."""
+        with self.lock:
+            if self.entries.pop(filename, None) is not None:
+                self._save()
+
+    def list(self) -> List[Dict]:
+        """All indexed files, newest first."""
+        with self.lock:
+            videos = [dict(entry, filename=name) for name, entry in self.entries.items()]
+        videos.sort(key=lambda x: x["created_at"], reverse=True)
+        return videos
+
+    def prune(self, max_age_days: float = RETENTION_MAX_AGE_DAYS, max_total_mb: float = RETENTION_MAX_TOTAL_MB) -> List[str]:
+        """
+        Delete outputs older than max_age_days, then the oldest outputs until
+        the total size is within max_total_mb.
+
+        Returns:
+            Names of deleted files
+        """
+        cutoff = datetime.fromtimestamp(time.time() - max_age_days * 86400).isoformat()
+        videos = self.list()  # Newest first
+
+        to_delete = [v for v in videos if v["created_at"] < cutoff]
+        kept = [v for v in videos if v["created_at"] >= cutoff]
+
+        total = sum(v["size_bytes"] for v in kept)
+        max_total = max_total_mb * 1024 * 1024
+        while kept and total > max_total:
+            oldest = kept.pop()
+            total -= oldest["size_bytes"]
+            to_delete.append(oldest)
+
+        deleted = []
+        for video in to_delete:
+            try:
+                (self.output_dir / video["filename"]).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not delete {video['filename']}: {e}")
+                continue
+            self.remove(video["filename"])
+            deleted.append(video["filename"])
+
+        if deleted:
+            logger.info(f"Retention pruned {len(deleted)} annotated videos")
+        return deleted
+
+
+def _path_size(path: Path) -> int:
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+    return path.stat().st_size
+
+
+def prune_paths(
+    paths: List[Path],
+    keep: Callable[[Path], bool],
+    max_age_days: float = RETENTION_MAX_AGE_DAYS,
+    max_total_mb: float = RETENTION_MAX_TOTAL_MB
+) -> List[str]:
+    """
+    Delete files or directories older than max_age_days, then the oldest
+    until the total size is within max_total_mb. Paths for which keep()
+    returns True, or modified within RETENTION_MIN_AGE_SECONDS, are never
+    deleted (but count toward the total).
+
+    Returns:
+        Names of deleted paths
+    """
+    now = time.time()
+    entries = []
+    for path in paths:
+        try:
+            entries.append((path, path.stat().st_mtime, _path_size(path)))
+        except OSError:
+            continue  # Removed meanwhile
+    entries.sort(key=lambda e: e[1])  # Oldest first
+
+    cutoff = now - max_age_days * 86400
+    total = sum(size for _, _, size in entries)
+    max_total = max_total_mb * 1024 * 1024
+
+    deleted = []
+    for path, mtime, size in entries:
+        if mtime >= cutoff and total <= max_total:
+            break
+        if now - mtime < RETENTION_MIN_AGE_SECONDS or keep(path):
+            continue
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not delete {path}: {e}")
+            continue
+        total -= size
+        deleted.append(path.name)
+    return deleted
+
+
+class RetentionWorker:
+    """
+    Background thread that periodically prunes annotated outputs, pending
+    source videos and analysis stores.
+    """
+
+    def __init__(
+        self,
+        index: OutputIndex,
+        sources_dir: Path = PENDING_DIR,
+        analyses_dir: Path = ANALYSES_DIR,
+        interval: float = RETENTION_CHECK_SECONDS
+    ):
+        self.index = index
+        self.sources_dir = Path(sources_dir)
+        self.analyses_dir = Path(analyses_dir)
+        self.interval = interval
+        self.referenced: Callable[[], Set[str]] = set  # Analysis IDs that must be kept
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def keep_referenced(self, referenced: Callable[[], Set[str]]) -> None:
+        """Never prune analyses (or their sources) whose ID is in referenced()."""
+        self.referenced = referenced
+
+    def prune(self) -> None:
+        self.index.prune()
+
+        partials = prune_paths(
+            list(self.index.output_dir.glob(f"*{PARTIAL_SUFFIX}")),
+            keep=lambda path: False,
+            max_age_days=PARTIAL_MAX_AGE_SECONDS / 86400,
+            max_total_mb=float("inf")
+        )
+        if partials:
+            logger.info(f"Retention removed {len(partials)} abandoned partial renders")
+
+        referenced = self.referenced()
+        sources = prune_paths(
+            list(self.sources_dir.glob(f"*{SOURCE_SUFFIX}")),
+            keep=lambda path: path.name[:-len(SOURCE_SUFFIX)] in referenced
+        )
+        analyses = prune_paths(
+            [path for path in self.analyses_dir.iterdir() if path.is_dir()],
+            keep=lambda path: path.name in referenced
+        )
+        if sources or analyses:
+            logger.info(f"Retention pruned {len(sources)} source videos and {len(analyses)} analysis stores")
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.prune()
+            except Exception as e:
+                logger.error(f"Retention pruning failed: {e}")
+            if self._stop_event.wait(self.interval):
+                break
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="annotated-retention")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+# Global instances
+output_index = OutputIndex()
+retention_worker = RetentionWorker(output_index)
@@ -0,0 +1,301 @@
+"""
+Annotated video rendering as a decoupled post-pass.
+Draws the per-frame detections from the detection store onto the source video in a low-priority
+background worker, or on demand when the download is requested first, so the
+attendance result does not wait for video encoding.
+"""
+
+import cv2
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.services.annotated_outputs import create_encoder, output_index, partial_path
+from app.services.detection_store import iter_frames, read_metadata
+
+logger = logging.getLogger(__name__)
+
+WORKER_NICENESS = 10  # Lower scheduling priority of the render thread (Linux only)
+JOB_RETENTION_SECONDS = 600  # Keep status of finished/failed jobs this long
+RENDER_ATTEMPTS = 3  # A failed job keeps its source and is retried on download up to this many attempts in total
+
+
+def draw_detections(frame, faces: List[Dict]) -> None:
+    """Draw face boxes and identity labels onto a frame in place."""
+    for face_info in faces:
+        bbox = face_info["bbox"]
+        identity = face_info["identity"]
+        confidence = face_info["confidence"]
+        matched = face_info["matched"]
+
+        # Color: Green for matched, Red for unknown
+        color = (0, 255, 0) if matched else (0, 0, 255)
+
+        # Draw bounding box
+        cv2.rectangle(frame, (bbox["x1"], bbox["y1"]), (bbox["x2"], bbox["y2"]), color, 2)
+
+        # Draw label background
+        label = f"{identity} ({confidence:.2f})" if matched else "Unknown"
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+        cv2.rectangle(
+            frame,
+            (bbox["x1"], bbox["y1"] - 25),
+            (bbox["x1"] + label_size[0] + 10, bbox["y1"]),
+            color, -1
+        )
+
+        # Draw label text
+        cv2.putText(
+            frame, label,
+            (bbox["x1"] + 5, bbox["y1"] - 8),
+            cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+            (255, 255, 255), 2
+        )
+
+
+def _face_info(detection: Dict, track_labels: Dict[int, Dict]) -> Dict:
+    """Convert a stored detection to the dict drawn by draw_detections."""
+    # Prefer the final identity of the track over the provisional one at that frame
+    label = track_labels.get(detection["track"])
+    identity = label["student_id"] if label else detection["identity"]
+    confidence = label["confidence"] if label else detection["score"]
+    return {
+        "bbox": {k: detection[k] for k in ("x1", "y1", "x2", "y2")},
+        "identity": identity,
+        "confidence": confidence,
+        "matched": identity is not None
+    }
+
+
+def render_annotated_video(
+    source_path: Path,
+    output_path: Path,
+    store_dir: Path,
+    session_id: Optional[int]
+) -> Path:
+    """
+    Render an annotated copy of a video from its detection store.
+
+    Frames that were not processed reuse the detections of the last
+    processed frame, matching what was on screen during analysis.
+
+    Args:
+        source_path: Original video file
+        output_path: Where to write the annotated mp4
+        store_dir: Detection store directory of the analysis
+        session_id: Session ID drawn in the overlay (None: no session line)
+
+    Returns:
+        Path of the written video
+    """
+    cap = cv2.VideoCapture(str(source_path))
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {source_path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    # Write to a temporary name so partial files are never served or listed
+    temp_path = partial_path(output_path)
+    try:
+        encoder = create_encoder(temp_path, fps, (width, height))
+    except Exception:
+        cap.release()
+        raise
+
+    try:
+        track_labels = {
+            t["track_id"]: t for t in read_metadata(store_dir).get("tracks", [])
+        }
+    except (OSError, ValueError):
+        track_labels = {}
+
+    frames = iter_frames(store_dir)
+    next_frame = next(frames, None)
+
+    frame_count = 0
+    last_faces: List[Dict] = []
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_count += 1
+
+            # Advance the detection stream in lockstep with decoding
+            while next_frame is not None and next_frame[0] <= frame_count:
+                last_faces = [_face_info(d, track_labels) for d in next_frame[1]]
+                next_frame = next(frames, None)
+            draw_detections(frame, last_faces)
+
+            # Add frame counter and session info
+            cv2.putText(frame, f"Frame: {frame_count}/{total_frames}", (10, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            if session_id is not None:
+                cv2.putText(frame, f"Session ID: {session_id}", (10, 60),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
+            encoder.write(frame)
+        encoder.close()
+    except BaseException:
+        # Decoding, drawing or encoding failed: never leave the partial file behind
+        try:
+            encoder.close()
+        except Exception:
+            pass
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    finally:
+        cap.release()
+
+    os.replace(temp_path, output_path)
+    output_index.add(output_path)
+    logger.info(f"Rendered annotated video {output_path.name} ({frame_count} frames, {encoder.name})")
+    return output_path
+
+
+def _lower_thread_priority() -> None:
+    """Run render jobs at reduced priority so they do not compete with recognition."""
+    try:
+        # On Linux, setpriority with a thread ID only affects that thread
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), WORKER_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+
+class AnnotationRenderer:
+    """
+    Background queue of annotation render jobs keyed by output filename.
+
+    Jobs run one at a time in a low-priority worker thread. If a download is
+    requested before its job has started, the job is rendered on demand in
+    the requesting thread instead of waiting in the queue. The source video
+    is deleted after a successful render; a failed job keeps it and is
+    rendered again when its download is requested, up to RENDER_ATTEMPTS
+    attempts. Finished and failed jobs are forgotten JOB_RETENTION_SECONDS
+    after they end (the output index keeps track of rendered files, and the
+    retention worker removes sources left behind).
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="annotation-render",
+            initializer=_lower_thread_priority
+        )
+        self.jobs: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def submit(
+        self,
+        source_path: Path,
+        output_path: Path,
+        store_dir: Path,
+        session_id: int
+    ) -> None:
+        """Queue rendering of an annotated video. The source file is deleted once rendered."""
+        job = {
+            "args": (source_path, output_path, store_dir, session_id),
+            "status": "pending",
+            "attempts": 0,
+            "error": None,
+            "finished_at": None,
+            "lock": threading.Lock()
+        }
+        with self.lock:
+            self._prune(time.time())
+            self.jobs[output_path.name] = job
+            job["future"] = self.executor.submit(self._run, output_path.name)
+
+    def _run(self, filename: str, retry: bool = False) -> None:
+        with self.lock:
+            job = self.jobs.get(filename)
+        if job is None:
+            return
+
+        # Job lock ensures the worker and an on-demand request never render twice
+        with job["lock"]:
+            if retry and job["status"] == "failed" and job["attempts"] < RENDER_ATTEMPTS:
+                job["status"] = "pending"
+            if job["status"] != "pending":
+                return
+            job["status"] = "rendering"
+            job["attempts"] += 1
+            source_path = job["args"][0]
+            try:
+                render_annotated_video(*job["args"])
+                job["status"] = "ready"
+                self._discard_source(source_path)
+            except Exception as e:
+                logger.error(f"Annotation render failed for {filename} (attempt {job['attempts']}/{RENDER_ATTEMPTS}): {e}")
+                job["status"] = "failed"
+                job["error"] = str(e)
+                if job["attempts"] >= RENDER_ATTEMPTS:
+                    self._discard_source(source_path)
+            finally:
+                job["finished_at"] = time.time()
+
+    @staticmethod
+    def _discard_source(source_path: Path) -> None:
+        try:
+            os.unlink(source_path)
+        except OSError:
+            pass
+
+    def _prune(self, now: float) -> None:
+        """Forget jobs that ended more than JOB_RETENTION_SECONDS ago (caller holds the lock)."""
+        expired = [
+            name for name, job in self.jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] >= JOB_RETENTION_SECONDS
+        ]
+        for name in expired:
+            job = self.jobs.pop(name)
+            if job["status"] == "failed":
+                self._discard_source(job["args"][0])  # No more retries
+
+    def get_status(self, filename: str) -> Optional[str]:
+        """Return pending/rendering/ready/failed, or None if no job exists."""
+        with self.lock:
+            self._prune(time.time())
+            job = self.jobs.get(filename)
+        return job["status"] if job else None
+
+    def ensure_rendered(self, filename: str) -> bool:
+        """
+        Block until the annotated video is rendered, rendering it in the
+        calling thread if the background worker has not started it yet.
+
+        Returns:
+            True if the video is available
+        """
+        with self.lock:
+            job = self.jobs.get(filename)
+        if job is None:
+            return False
+
+        future: Future = job["future"]
+        if future.cancel():
+            self._run(filename)
+        else:
+            future.result()
+        if job["status"] == "failed":
+            self._run(filename, retry=True)  # Source was kept: render again in this thread
+
+        return job["status"] == "ready"
+
+    def shutdown(self) -> None:
+        """Stop accepting jobs; queued jobs are dropped."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global renderer instance
+annotation_renderer = AnnotationRenderer()
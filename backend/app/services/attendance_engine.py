@@ -0,0 +1,337 @@
+"""
+Live-session attendance engine.
+Consumes the results of the live recognition workers and marks attendance
+for the session bound to each camera:
+
+- N-of-M verification: a student is marked once VERIFICATION_REQUIRED of
+  their last VERIFICATION_WINDOW observations (within
+  VERIFICATION_MAX_AGE_SECONDS) reach CONFIDENCE_THRESHOLD. Only fresh
+  identifications count: result sets repeat a track's stored identity
+  until it is re-identified (identified_at changes), and those repeats are
+  not observations
+- cooldown: a marked student is not marked again for COOLDOWN_SECONDS
+- only students of the session's class are marked
+
+Marks are handed to the attendance writer (app/services/attendance_writer.py),
+which upserts them in batches in the background, so the recognition thread
+never waits on the database. Students already marked in the database are
+loaded when a session starts, so a restart does not mark them again.
+Sessions are evicted after they end or after SESSION_TTL_SECONDS without
+observations, so memory stays bounded.
+
+A session bound to a camera holds a reference on that camera's live
+recognition (through the feed callback), so students are marked whether or
+not anyone watches the identify feed. The reference is released when the
+session ends, moves to another camera or is evicted.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Set, Tuple
+
+from app.core.database import get_pool
+from app.services.attendance_writer import AttendanceWriter, attendance_writer
+from app.services.student_directory import student_directory
+
+logger = logging.getLogger(__name__)
+
+# Verification
+CONFIDENCE_THRESHOLD = 0.55
+VERIFICATION_WINDOW = 5             # M: observations kept per student
+VERIFICATION_REQUIRED = 3           # N: observations at or above the threshold needed to mark
+VERIFICATION_MAX_AGE_SECONDS = 30.0 # Older observations do not count
+COOLDOWN_SECONDS = 600              # 10 minutes before a student can be marked again
+
+# Eviction
+EVICT_INTERVAL_SECONDS = 30.0
+SESSION_TTL_SECONDS = 3 * 3600      # Evict sessions without observations for this long
+ENDED_GRACE_SECONDS = 60.0          # Keep ended sessions this long (for status queries)
+
+
+class SessionState:
+    """Verification buffers and marks of one live session."""
+
+    def __init__(self, session_id: int, camera_id: Optional[str], roster: Set[str]):
+        self.session_id = session_id
+        self.camera_id = camera_id
+        self.roster = roster
+        self.observations: Dict[str, Deque[Tuple[float, float]]] = {}  # {student_id: (timestamp, confidence)}
+        self.marked: Dict[str, float] = {}  # {student_id: marked_at}
+        self.started_at = time.time()
+        self.last_seen = self.started_at
+        self.ended_at: Optional[float] = None
+        self.release: Optional[Callable[[], None]] = None  # Releases the camera's live recognition
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "camera_id": self.camera_id,
+            "marked": sorted(self.marked),
+            "buffered_students": len(self.observations),
+            "roster_size": len(self.roster),
+            "started_at": self.started_at,
+            "last_seen": self.last_seen,
+            "ended_at": self.ended_at
+        }
+
+
+class AttendanceEngine:
+    """Per-session verification; verified marks are queued on the attendance writer."""
+
+    def __init__(
+        self,
+        pool_factory: Callable = get_pool,
+        roster_lookup: Optional[Callable[[int], Optional[Set[str]]]] = None,
+        writer: Optional[AttendanceWriter] = None,
+        feed: Optional[Callable[[str], Callable[[], None]]] = None
+    ):
+        self.pool_factory = pool_factory
+        self.roster_lookup = roster_lookup or student_directory.session_roster
+        self.writer = writer or attendance_writer
+        # Starts a camera's live recognition (results arrive through observe) and returns its release
+        self.feed = feed
+
+        self.lock = threading.Lock()
+        self.sessions: Dict[int, SessionState] = {}
+        self.cameras: Dict[str, int] = {}  # {camera_id: session_id}
+        self._identified: Dict[str, Dict[int, float]] = {}  # {camera_id: {track_id: identified_at}} of the last result set
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.observations = 0
+        self.marks = 0
+        self.outside_roster = 0
+        self.evicted = 0
+
+    # ---------- Sessions ----------
+
+    @staticmethod
+    def _release(releases) -> None:
+        for release in releases:
+            try:
+                release()
+            except Exception as e:
+                logger.error(f"Could not release live recognition: {e}")
+
+    def _unbind(self, state: SessionState, releases: list) -> None:
+        """Detach a session from its camera (caller holds the lock; releases run after it is dropped)."""
+        if state.camera_id is not None and self.cameras.get(state.camera_id) == state.session_id:
+            del self.cameras[state.camera_id]
+        state.camera_id = None
+        if state.release is not None:
+            releases.append(state.release)
+            state.release = None
+
+    def _load_marked(self, session_id: int) -> Set[str]:
+        """Students already marked by face in the database."""
+        pool = self.pool_factory()
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT student_id FROM attendance WHERE session_id = {pool.placeholder} "
+                f"AND face_recognized_at IS NOT NULL",
+                [session_id]
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        return {str(row[0]) for row in rows}
+
+    def start_session(self, session_id: int, camera_id: Optional[str] = None) -> Dict:
+        """
+        Start (or rebind) live attendance for a session. Blocking: loads the
+        roster and existing marks from the database.
+
+        Args:
+            session_id: Session to mark attendance for
+            camera_id: Camera whose live recognition feeds the session
+
+        Raises:
+            KeyError: If the session does not exist
+            RuntimeError: If the camera's live recognition cannot be started
+        """
+        roster = self.roster_lookup(session_id)
+        if roster is None:
+            raise KeyError(f"Session {session_id} not found")
+        already_marked = self._load_marked(session_id)
+
+        # Recognition must run before the session is bound; the previous reference (if any) is released after
+        release = self.feed(camera_id) if camera_id is not None and self.feed is not None else None
+        releases = []
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is None or state.ended_at is not None:
+                state = SessionState(session_id, camera_id, roster)
+                self.sessions[session_id] = state
+            state.roster = roster
+            for student_id in already_marked:
+                state.marked.setdefault(student_id, state.started_at)
+
+            # A camera feeds one session at a time
+            self._unbind(state, releases)
+            if camera_id is not None:
+                previous = self.cameras.get(camera_id)
+                if previous is not None and previous != session_id and previous in self.sessions:
+                    self._unbind(self.sessions[previous], releases)
+                self.cameras[camera_id] = session_id
+            state.camera_id = camera_id
+            state.release = release
+        self._release(releases)
+
+        logger.info(
+            f"Live attendance started for session {session_id} on camera {camera_id} "
+            f"({len(already_marked)} already marked)"
+        )
+        return state.to_dict()
+
+    def end_session(self, session_id: int) -> Optional[Dict]:
+        """Stop marking a session (marks already queued are still written)."""
+        releases = []
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is None:
+                return None
+            state.ended_at = time.time()
+            state.observations.clear()
+            self._unbind(state, releases)
+        self._release(releases)
+        logger.info(f"Live attendance ended for session {session_id}")
+        return state.to_dict()
+
+    def get_session(self, session_id: int) -> Optional[Dict]:
+        with self.lock:
+            state = self.sessions.get(session_id)
+            return state.to_dict() if state is not None else None
+
+    # ---------- Verification ----------
+
+    def observe(self, results: Dict) -> None:
+        """Consume one live recognition result set (called from the recognition thread)."""
+        camera_id = results.get("camera_id")
+        timestamp = results.get("last_update") or time.time()
+        faces = results.get("faces", [])
+        identified = {
+            face["track_id"]: face["identified_at"]
+            for face in faces if face.get("identified_at") is not None
+        }
+        with self.lock:
+            session_id = self.cameras.get(camera_id)
+            previous = self._identified.get(camera_id, {})
+            if session_id is None:
+                self._identified.pop(camera_id, None)
+                return
+            self._identified[camera_id] = identified
+
+        for face in faces:
+            identity = face.get("identity")
+            identified_at = face.get("identified_at")
+            if identified_at is None or previous.get(face.get("track_id")) == identified_at:
+                continue  # Not a new identification of this track
+            if face.get("matched") and identity:
+                self.record(session_id, identity, face.get("confidence") or 0.0, timestamp)
+
+    def record(self, session_id: int, student_id: str, confidence: float, timestamp: Optional[float] = None) -> bool:
+        """
+        Add an observation of a student and queue a mark if verification passes.
+
+        Returns:
+            True if the student was marked by this observation
+        """
+        timestamp = timestamp or time.time()
+        student_id = str(student_id)
+
+        with self.lock:
+            state = self.sessions.get(session_id)
+            if state is None or state.ended_at is not None:
+                return False
+            state.last_seen = timestamp
+            self.observations += 1
+
+            if student_id not in state.roster:
+                self.outside_roster += 1
+                return False
+
+            marked_at = state.marked.get(student_id)
+            if marked_at is not None and timestamp - marked_at < COOLDOWN_SECONDS:
+                return False
+
+            window = state.observations.get(student_id)
+            if window is None:
+                window = state.observations[student_id] = deque(maxlen=VERIFICATION_WINDOW)
+            window.append((timestamp, confidence))
+
+            confirmed = [
+                c for t, c in window
+                if c >= CONFIDENCE_THRESHOLD and timestamp - t <= VERIFICATION_MAX_AGE_SECONDS
+            ]
+            if len(confirmed) < VERIFICATION_REQUIRED:
+                return False
+
+            # Verified: mark and drop the buffer until the cooldown expires
+            del state.observations[student_id]
+            state.marked[student_id] = timestamp
+            self.marks += 1
+
+        logger.info(f"✅ Attendance marked for student {student_id} in session {session_id}")
+        if student_id.isdigit():
+            self.writer.enqueue(
+                session_id, int(student_id), timestamp, max(confirmed),
+                key=f"live:{session_id}:{student_id}"
+            )
+        return True
+
+    def _evict(self, now: float) -> None:
+        """Drop ended sessions and sessions idle past their TTL."""
+        releases = []
+        with self.lock:
+            expired = [
+                session_id for session_id, state in self.sessions.items()
+                if (state.ended_at is not None and now - state.ended_at >= ENDED_GRACE_SECONDS)
+                or now - state.last_seen >= SESSION_TTL_SECONDS
+            ]
+            for session_id in expired:
+                self._unbind(self.sessions.pop(session_id), releases)
+            self.evicted += len(expired)
+        self._release(releases)
+        if expired:
+            logger.info(f"Evicted live attendance sessions: {expired}")
+
+    def _loop(self) -> None:
+        while not self._stop_event.wait(EVICT_INTERVAL_SECONDS):
+            self._evict(time.time())
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="attendance-engine")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop session eviction and release the live recognition held by sessions."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        releases = []
+        with self.lock:
+            for state in self.sessions.values():
+                self._unbind(state, releases)
+        self._release(releases)
+
+    def get_stats(self) -> Dict:
+        """Get engine statistics."""
+        with self.lock:
+            return {
+                "active_sessions": sum(1 for s in self.sessions.values() if s.ended_at is None),
+                "tracked_sessions": len(self.sessions),
+                "observations": self.observations,
+                "marks": self.marks,
+                "outside_roster": self.outside_roster,
+                "evicted": self.evicted
+            }
+
+
+# Global instance
+attendance_engine = AttendanceEngine()
@@ -0,0 +1,279 @@
+"""
+Background writer for attendance marks.
+Recognition paths (live sessions, video analysis) only enqueue marks; a
+writer thread collects them into batches and upserts each batch with one
+multi-row INSERT ... ON CONFLICT (session_id, student_id) statement, so no
+request or recognition loop waits on a database round-trip.
+
+- Idempotency: every mark has a key (e.g. "video:<hash>:<session>:<student>");
+  keys seen recently are not queued again, and the upsert itself is
+  idempotent (the first face recognition of a row wins).
+- Retry: a batch that fails on the connection is retried with exponential
+  backoff; after MAX_ATTEMPTS it is appended to FAILED_MARKS_FILE for
+  manual replay. A batch rejected by a constraint (e.g. a deleted student
+  or session) is split in halves until the offending rows are isolated;
+  only those are dead-lettered, the rest are written right away.
+
+Requires the unique index on attendance(session_id, student_id)
+(attendance_session_student_idx in frontend/db/schema.ts).
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from app.core.database import get_pool, is_integrity_error
+
+logger = logging.getLogger(__name__)
+
+FAILED_MARKS_FILE = Path(__file__).parent.parent.parent / "failed_attendance_marks.jsonl"
+
+BATCH_SIZE = 200                # Marks per INSERT statement (a full lecture hall)
+BATCH_LINGER_SECONDS = 0.2      # Wait after the first mark to collect a burst into one batch
+IDLE_WAIT_SECONDS = 1.0         # Queue poll interval while idle (re-checks the stop flag)
+QUEUE_MAX_SIZE = 10000
+MAX_ATTEMPTS = 8
+RETRY_BACKOFF_SECONDS = (0.5, 1, 2, 5, 10, 30)
+IDEMPOTENCY_CACHE_SIZE = 50000  # Recently queued keys remembered
+
+
+class AttendanceMark(NamedTuple):
+    session_id: int
+    student_id: int
+    recognized_at: float  # Unix time
+    confidence: float     # 0-1
+    key: str              # Idempotency key
+
+
+def upsert_sql(rows: int, placeholder: str = "%s") -> str:
+    """Multi-row upsert of face recognitions (same rules as the web app: fingerprint + face = PRESENT)."""
+    p = placeholder
+    values = ", ".join(f"({p}, {p}, {p}, {p}, 'FACE_ONLY'::attendance_status, {p})" for _ in range(rows))
+    return (
+        "INSERT INTO attendance "
+        "(session_id, student_id, face_recognized_at, face_confidence, status, updated_at) "
+        f"VALUES {values} "
+        "ON CONFLICT (session_id, student_id) DO UPDATE SET "
+        "face_recognized_at = EXCLUDED.face_recognized_at, "
+        "face_confidence = EXCLUDED.face_confidence, "
+        "status = CASE WHEN attendance.fingerprint_verified_at IS NOT NULL "
+        "THEN 'PRESENT'::attendance_status ELSE 'FACE_ONLY'::attendance_status END, "
+        "updated_at = EXCLUDED.updated_at "
+        "WHERE attendance.face_recognized_at IS NULL"
+    )
+
+
+def _utc(timestamp: Optional[float] = None) -> datetime:
+    """Naive UTC datetime for the attendance timestamp columns (timestamp without time zone)."""
+    moment = datetime.now(timezone.utc) if timestamp is None else datetime.fromtimestamp(timestamp, timezone.utc)
+    return moment.replace(tzinfo=None)
+
+
+class AttendanceWriter:
+    """Queue of attendance marks drained in batches by a background thread."""
+
+    def __init__(self, pool_factory: Callable = get_pool, batch_size: int = BATCH_SIZE):
+        self.pool_factory = pool_factory
+        self.batch_size = batch_size
+        self.queue: "queue.Queue[AttendanceMark]" = queue.Queue(maxsize=QUEUE_MAX_SIZE)
+        self.lock = threading.Lock()
+        self._keys: "OrderedDict[str, None]" = OrderedDict()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.enqueued = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.rows_written = 0  # Rows actually inserted or updated (cursor.rowcount)
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self.rejected = 0  # Marks refused by a constraint (included in failed)
+        self.last_error = None
+
+    def enqueue(
+        self,
+        session_id: int,
+        student_id: int,
+        recognized_at: float,
+        confidence: float,
+        key: Optional[str] = None
+    ) -> bool:
+        """
+        Queue a mark without blocking.
+
+        Returns:
+            False if the key was already queued or the queue is full
+        """
+        key = key or f"{session_id}:{student_id}"
+        with self.lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                self.duplicates += 1
+                return False
+            self._keys[key] = None
+            if len(self._keys) > IDEMPOTENCY_CACHE_SIZE:
+                self._keys.popitem(last=False)
+
+        try:
+            self.queue.put_nowait(AttendanceMark(session_id, student_id, recognized_at, confidence, key))
+        except queue.Full:
+            with self.lock:
+                self._keys.pop(key, None)
+                self.dropped += 1
+            logger.error(f"Attendance write queue full, dropped mark {key}")
+            return False
+
+        with self.lock:
+            self.enqueued += 1
+        return True
+
+    def _next_batch(self) -> List[AttendanceMark]:
+        """Wait for a mark, then collect up to batch_size (lingering briefly for bursts)."""
+        try:
+            batch = [self.queue.get(timeout=IDLE_WAIT_SECONDS)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + BATCH_LINGER_SECONDS
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[AttendanceMark]) -> int:
+        """Upsert a batch. Returns the number of rows inserted or updated."""
+        # A statement cannot upsert the same row twice: keep the first mark per (session, student)
+        unique: Dict[tuple, AttendanceMark] = {}
+        for mark in sorted(batch, key=lambda m: m.recognized_at):
+            unique.setdefault((mark.session_id, mark.student_id), mark)
+
+        now = _utc()
+        params = []
+        for mark in unique.values():
+            params.extend([
+                mark.session_id,
+                mark.student_id,
+                _utc(mark.recognized_at),
+                int(round(mark.confidence * 100)),  # Stored as percentage 0-100
+                now
+            ])
+
+        pool = self.pool_factory()
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(upsert_sql(len(unique), pool.placeholder), params)
+            written = max(cursor.rowcount, 0)  # Rows already marked by face are left untouched
+            cursor.close()
+        return written
+
+    def _dead_letter(self, batch: List[AttendanceMark], reason: str) -> None:
+        """Persist marks that could not be written, and forget their keys so they can be queued again."""
+        try:
+            with open(FAILED_MARKS_FILE, "a", encoding="utf-8") as f:
+                for mark in batch:
+                    f.write(json.dumps(dict(mark._asdict(), reason=reason)) + "\n")
+        except OSError as e:
+            logger.error(f"Could not record failed attendance marks: {e}")
+        with self.lock:
+            for mark in batch:
+                self._keys.pop(mark.key, None)
+            self.failed += len(batch)
+        logger.error(f"Gave up writing {len(batch)} attendance marks, saved to {FAILED_MARKS_FILE}")
+
+    def _write_with_retry(self, batch: List[AttendanceMark], attempts: int = MAX_ATTEMPTS) -> None:
+        for attempt in range(attempts):
+            try:
+                written = self._write(batch)
+                with self.lock:
+                    self.batches += 1
+                    self.rows_written += written
+                logger.info(f"Wrote {written} attendance rows for {len(batch)} marks")
+                return
+            except Exception as e:
+                with self.lock:
+                    self.last_error = str(e)
+                if is_integrity_error(e):
+                    self._isolate(batch, attempts, str(e))
+                    return
+                with self.lock:
+                    if attempt + 1 < attempts:
+                        self.retries += 1
+                logger.warning(f"Attendance batch write failed (attempt {attempt + 1}/{attempts}): {e}")
+                if attempt + 1 < attempts:
+                    delay = RETRY_BACKOFF_SECONDS[min(attempt, len(RETRY_BACKOFF_SECONDS) - 1)]
+                    if self._stop_event.wait(delay):
+                        break  # Shutting down: don't keep the process waiting
+        self._dead_letter(batch, self.last_error or "write failed")
+
+    def _isolate(self, batch: List[AttendanceMark], attempts: int, error: str) -> None:
+        """A constraint rejected the batch: write its halves separately so only offending rows are dropped."""
+        if len(batch) == 1:
+            logger.error(f"Attendance mark {batch[0].key} rejected: {error}")
+            with self.lock:
+                self.rejected += 1
+            self._dead_letter(batch, error)
+            return
+        middle = len(batch) // 2
+        self._write_with_retry(batch[:middle], attempts)
+        self._write_with_retry(batch[middle:], attempts)
+
+    def _loop(self) -> None:
+        while not self._stop_event.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write_with_retry(batch)
+
+        # Final flush of whatever is still queued, one attempt per batch
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._write_with_retry(batch, attempts=1)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="attendance-writer")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer after flushing queued marks."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def get_stats(self) -> Dict:
+        """Get writer statistics."""
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "enqueued": self.enqueued,
+                "duplicates": self.duplicates,
+                "dropped": self.dropped,
+                "rows_written": self.rows_written,
+                "batches": self.batches,
+                "retries": self.retries,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "last_error": self.last_error
+            }
+
+
+# Global instance
+attendance_writer = AttendanceWriter()
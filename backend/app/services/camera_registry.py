@@ -0,0 +1,408 @@
+"""
+Camera registry for serving several classrooms from one backend.
+Each camera is identified by a camera ID and has its own capture thread,
+health state and reference count. Sources are opened through
+frame_sources.open_capture: local devices (index or /dev/videoN), network
+streams (RTSP/HTTP, reconnected on failure) and replayed video files or
+image sequences (real-time pacing, looping) for headless runs.
+
+Cameras are configured with the CAMERAS environment variable, either JSON
+({"room-101": "rtsp://...", "replay": {"source": "/data/class.mp4", "fps": 15}})
+or "id=source" pairs separated by commas, and can be added or removed at
+runtime. Without CAMERAS, the default camera uses CAMERA_SOURCE.
+
+Frames are decoded into a preallocated FrameRing; consumers wait for a
+frame newer than the last sequence number they saw and read it through a
+read-only view (acquire) or copy it into their own reusable buffer
+(copy_frame) when they need to draw on it.
+
+The capture loop has no fixed sleep: devices and streams block in read()
+until the next frame arrives, and replays pace themselves the same way.
+Each commit wakes the waiting consumers. Streams record capture-to-socket
+latency per camera and stream type (STREAM_IDENTIFY, STREAM_ENROLLMENT) in
+`latency`, so the percentiles of different pipelines are not mixed.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Union
+
+import cv2
+
+from app.services.frame_ring import FrameRef, FrameRing
+from app.services.frame_sources import (
+    CAMERA_SOURCE, SOURCE_DEVICE, SOURCE_FILE, SOURCE_IMAGES, open_capture, parse_source
+)
+from app.services.latency_stats import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+# Stream types with separate latency statistics
+STREAM_IDENTIFY = "identify"
+STREAM_ENROLLMENT = "enrollment"
+
+DEFAULT_CAMERA_ID = os.getenv("DEFAULT_CAMERA_ID", "0")
+CAMERAS = os.getenv("CAMERAS", "")
+
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+FRAME_FPS = 30
+STALE_FRAME_SECONDS = 2.0       # Frames older than this are not served
+MAX_CONSECUTIVE_FAILURES = 10   # Failed reads before a device or stream is reconnected
+RECONNECT_BACKOFF_SECONDS = (1, 2, 5, 10)
+
+STATE_STOPPED = "stopped"
+STATE_STARTING = "starting"
+STATE_RUNNING = "running"
+STATE_RECONNECTING = "reconnecting"
+STATE_FAILED = "failed"
+
+
+def parse_camera_config(config: str) -> Dict[str, Union[str, Dict]]:
+    """
+    Parse the CAMERAS setting: a JSON object mapping camera IDs to a source
+    or to {"source", "fps", "loop"}, or "id=source,id=source".
+    """
+    config = config.strip()
+    if not config:
+        return {}
+    if config.startswith("{"):
+        return {str(k): v if isinstance(v, dict) else str(v) for k, v in json.loads(config).items()}
+
+    cameras = {}
+    for entry in config.split(","):
+        if not entry.strip():
+            continue
+        camera_id, sep, source = entry.partition("=")
+        if not sep:
+            raise ValueError(f"Invalid camera entry '{entry}': expected id=source")
+        cameras[camera_id.strip()] = source.strip()
+    return cameras
+
+
+class CameraManager:
+    """Capture thread, latest frame and health state of one camera."""
+
+    def __init__(self, camera_id: str, source, fps: Optional[float] = None, loop: Optional[bool] = None):
+        self.camera_id = camera_id
+        self.source = str(source)
+        self.kind, _ = parse_source(source)  # Validates the source
+        self.fps = fps  # Replay rate (files and image sequences)
+        self.loop = loop
+
+        self.cap = None
+        self.camera_lock = threading.Lock()  # Lock for camera operations
+        self.ring = FrameRing()
+        # Capture to socket write, recorded by the streams per stream type
+        self.latency: Dict[str, LatencyStats] = {
+            STREAM_IDENTIFY: LatencyStats(),
+            STREAM_ENROLLMENT: LatencyStats()
+        }
+        self.source_fps = FRAME_FPS
+        self.is_running = False
+        self.capture_thread = None
+        self.ref_count = 0
+        self.ref_lock = threading.Lock()
+        self.error_count = 0
+        self.max_errors = 5
+        self.closed = False
+
+        self.state = STATE_STOPPED
+        self.last_error = None
+        self.reconnects = 0
+
+    def _open(self) -> bool:
+        """Open the source (caller holds camera_lock)."""
+        self.cap = open_capture(self.source, fps=self.fps, loop=self.loop, label=f"Camera {self.camera_id}")
+        if self.cap is None:
+            self.last_error = f"Cannot open {self.kind} source {self.source}"
+            return False
+
+        if self.kind == SOURCE_DEVICE:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+            self.cap.set(cv2.CAP_PROP_FPS, FRAME_FPS)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer for real-time
+        self.source_fps = self.cap.get(cv2.CAP_PROP_FPS) or FRAME_FPS
+        return True
+
+    def _release(self) -> None:
+        """Release the capture device (caller holds camera_lock)."""
+        if self.cap is not None:
+            try:
+                self.cap.release()
+            except Exception:
+                pass
+            self.cap = None
+
+    def start(self) -> bool:
+        """Add a reference, starting the capture thread if it is not running."""
+        with self.ref_lock:
+            if self.closed:
+                return False
+            self.ref_count += 1
+            if self.is_running and self.capture_thread and self.capture_thread.is_alive():
+                return True
+
+        # Reset error count on new start
+        self.error_count = 0
+        self.state = STATE_STARTING
+        logger.info(f"Starting camera {self.camera_id} ({self.source})")
+
+        with self.camera_lock:
+            if self.cap is not None:
+                self._release()
+                time.sleep(0.5)  # Give camera time to release
+
+            if not self._open():
+                logger.error(f"Camera {self.camera_id}: {self.last_error}")
+                self.state = STATE_FAILED
+                with self.ref_lock:
+                    self.ref_count -= 1
+                return False
+
+        first_seq = self.ring.latest_info()[0]
+        self.is_running = True
+        self.capture_thread = threading.Thread(
+            target=self._capture_loop, daemon=True, name=f"camera-{self.camera_id}"
+        )
+        self.capture_thread.start()
+
+        # Wait up to 5 seconds for the first frame
+        with self.ring.acquire(after_seq=first_seq, timeout=5.0) as ref:
+            if ref is not None:
+                logger.info(f"Camera {self.camera_id} started")
+                return True
+
+        logger.warning(f"Camera {self.camera_id} started but no frames received yet")
+        return True
+
+    def _recover(self) -> bool:
+        """Reconnect a stream/device after repeated read failures."""
+        if self.kind in (SOURCE_FILE, SOURCE_IMAGES):
+            return False  # Replays loop by themselves; failing here means the replay ended
+
+        self.state = STATE_RECONNECTING
+        for delay in RECONNECT_BACKOFF_SECONDS:
+            if not self.is_running:
+                return False
+            logger.warning(f"Camera {self.camera_id}: reconnecting in {delay}s")
+            time.sleep(delay)
+            with self.camera_lock:
+                self._release()
+                if self._open():
+                    self.reconnects += 1
+                    self.state = STATE_RUNNING
+                    return True
+        return False
+
+    def _capture_loop(self):
+        """Continuously capture frames in background thread, at the source's own cadence"""
+        consecutive_errors = 0
+        self.state = STATE_RUNNING
+
+        while self.is_running:
+            slot, buffer = self.ring.begin_write()
+            try:
+                with self.camera_lock:
+                    if self.cap is None or not self.cap.isOpened():
+                        self.ring.abort(slot)
+                        self.last_error = "Camera not available in capture loop"
+                        break
+                    # Decode straight into the ring slot (OpenCV allocates only if the shape differs)
+                    ret, frame = self.cap.read(buffer) if buffer is not None else self.cap.read()
+
+                if ret and frame is not None:
+                    consecutive_errors = 0
+                    self.ring.commit(slot, frame, time.time())
+                else:
+                    self.ring.abort(slot)
+                    consecutive_errors += 1
+                    if consecutive_errors > MAX_CONSECUTIVE_FAILURES:
+                        logger.warning(f"Camera {self.camera_id}: {consecutive_errors} consecutive read failures")
+                        consecutive_errors = 0
+                        if not self._recover():
+                            self.last_error = "Read failures, recovery failed"
+                            break
+
+            except Exception as e:
+                self.ring.abort(slot)
+                self.error_count += 1
+                self.last_error = str(e)
+                logger.warning(f"Camera {self.camera_id}: error in capture loop: {e}")
+                if self.error_count >= self.max_errors:
+                    logger.error(f"Camera {self.camera_id}: too many errors, stopping capture loop")
+                    break
+                time.sleep(0.1)
+
+        logger.info(f"Camera {self.camera_id} capture loop ended")
+        self.state = STATE_STOPPED if not self.is_running else STATE_FAILED
+        self.is_running = False
+
+    def acquire(self, after_seq: int = 0, timeout: Optional[float] = None):
+        """
+        Context manager pinning the newest frame newer than after_seq (see
+        FrameRing.acquire); yields a FrameRef with a read-only view, or None on timeout.
+        """
+        return self.ring.acquire(after_seq, timeout)
+
+    def copy_frame(self, after_seq: int = 0, timeout: Optional[float] = None, out=None) -> Optional[FrameRef]:
+        """Wait for a frame newer than after_seq and copy it into out (reused across calls)."""
+        return self.ring.copy_latest(after_seq, timeout, out)
+
+    def get_frame(self):
+        """Get a copy of the latest frame (thread-safe)"""
+        ret, frame, _ = self.get_frame_with_time()
+        return ret, frame
+
+    def get_frame_with_time(self):
+        """Get a copy of the latest frame and its capture time (thread-safe)"""
+        ref = self.ring.copy_latest(timeout=0)
+        if ref is None or time.time() - ref.timestamp > STALE_FRAME_SECONDS:
+            return False, None, self.ring.latest_info()[1]
+        return True, ref.frame, ref.timestamp
+
+    def is_healthy(self):
+        """Check if camera is working properly"""
+        if not self.is_running:
+            return False
+        if self.capture_thread is None or not self.capture_thread.is_alive():
+            return False
+        seq, last_frame_time = self.ring.latest_info()
+        if seq == 0 or time.time() - last_frame_time > STALE_FRAME_SECONDS:
+            return False
+        return True
+
+    def restart(self):
+        """Force restart the camera"""
+        logger.info(f"Restarting camera {self.camera_id}")
+        self.force_stop()
+        time.sleep(1)
+        return self.start()
+
+    def _shutdown(self) -> None:
+        self.is_running = False
+
+        if self.capture_thread and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=2)
+
+        with self.camera_lock:
+            self._release()
+
+        self.ring.clear()
+        self.state = STATE_STOPPED
+
+    def stop(self):
+        """Stop camera (only when all refs released)"""
+        with self.ref_lock:
+            self.ref_count = max(0, self.ref_count - 1)
+            if self.ref_count > 0:
+                return
+
+        logger.info(f"Stopping camera {self.camera_id}")
+        self._shutdown()
+
+    def force_stop(self):
+        """Force stop camera regardless of refs"""
+        with self.ref_lock:
+            self.ref_count = 0
+        logger.info(f"Force stopping camera {self.camera_id}")
+        self._shutdown()
+
+    def close(self) -> None:
+        """Stop the camera for good (it was removed from the registry)."""
+        with self.ref_lock:
+            self.closed = True
+        self.force_stop()
+
+    def get_status(self) -> Dict:
+        """Get camera health and statistics."""
+        seq, last_frame_time = self.ring.latest_info()
+        return {
+            "camera_id": self.camera_id,
+            "source": self.source,
+            "kind": self.kind,
+            "state": self.state,
+            "is_running": self.is_running,
+            "is_healthy": self.is_healthy(),
+            "ref_count": self.ref_count,
+            "error_count": self.error_count,
+            "last_error": self.last_error,
+            "frames_captured": self.ring.seq,
+            "frame_age": round(time.time() - last_frame_time, 2) if last_frame_time else None,
+            "reconnects": self.reconnects,
+            "source_fps": round(self.source_fps, 2),
+            "frame_ring": self.ring.get_stats(),
+            "latency": {stream: stats.get_stats() for stream, stats in self.latency.items()}
+        }
+
+
+class CameraRegistry:
+    """Cameras by camera ID."""
+
+    def __init__(self, config: Optional[Dict[str, Union[str, Dict]]] = None):
+        self.lock = threading.Lock()
+        self.cameras: Dict[str, CameraManager] = {}
+
+        if config is None:
+            config = parse_camera_config(CAMERAS) or {DEFAULT_CAMERA_ID: CAMERA_SOURCE}
+        for camera_id, entry in config.items():
+            if isinstance(entry, dict):
+                camera = CameraManager(camera_id, entry["source"], entry.get("fps"), entry.get("loop"))
+            else:
+                camera = CameraManager(camera_id, entry)
+            self.cameras[camera_id] = camera
+
+    def get(self, camera_id: str) -> CameraManager:
+        """
+        Raises:
+            KeyError: If the camera is not registered
+        """
+        with self.lock:
+            return self.cameras[camera_id]
+
+    def register(self, camera_id: str, source, fps: Optional[float] = None, loop: Optional[bool] = None) -> CameraManager:
+        """
+        Add a camera, replacing (and stopping) an existing one with the same ID.
+
+        Raises:
+            ValueError: If the source is invalid
+        """
+        camera = CameraManager(camera_id, source, fps, loop)
+        with self.lock:
+            previous = self.cameras.get(camera_id)
+            self.cameras[camera_id] = camera
+        if previous is not None:
+            previous.close()
+        logger.info(f"Registered camera {camera_id}: {camera.source}")
+        return camera
+
+    def remove(self, camera_id: str) -> None:
+        """
+        Raises:
+            KeyError: If the camera is not registered
+        """
+        with self.lock:
+            camera = self.cameras.pop(camera_id)
+        camera.close()
+        logger.info(f"Removed camera {camera_id}")
+
+    def camera_ids(self) -> List[str]:
+        with self.lock:
+            return list(self.cameras)
+
+    def stop_all(self) -> None:
+        """Force stop every camera (shutdown)."""
+        with self.lock:
+            cameras = list(self.cameras.values())
+        for camera in cameras:
+            camera.force_stop()
+
+    def get_status(self) -> Dict[str, Dict]:
+        """Status of every camera by ID."""
+        with self.lock:
+            cameras = list(self.cameras.values())
+        return {camera.camera_id: camera.get_status() for camera in cameras}
@@ -0,0 +1,151 @@
+"""
+Adaptive detection interval for live camera pipelines.
+Instead of detecting at a fixed rate, each consumer (live recognizer,
+enrollment stream) asks its scheduler whether detection is due and reports
+what the last detection found:
+
+- new faces or unconfirmed tracks → detect at min_interval (fast pickup)
+- a static scene (nothing new, every track confirmed) → back off by
+  BACKOFF_FACTOR per detection, up to max_interval
+- CPU saturated (load average per core ≥ CPU_SATURATED) → back off even
+  with activity
+- a detection (plus the wait for an inference slot) may use at most
+  MAX_DUTY_CYCLE of wall time, so slow hardware settles at a rate it can
+  sustain
+
+The effective rate (detections actually run over the last
+RATE_WINDOW_SECONDS) is reported next to the target interval.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+MIN_INTERVAL_SECONDS = 0.15  # Fastest detection rate (new or unconfirmed faces)
+MAX_INTERVAL_SECONDS = 1.0   # Slowest detection rate (static scene or saturated CPU)
+BACKOFF_FACTOR = 1.5         # Interval growth per detection without activity
+CPU_SATURATED = 0.9          # 1-minute load average per core treated as saturated
+MAX_DUTY_CYCLE = 0.5         # Share of wall time one consumer may spend detecting
+RATE_WINDOW_SECONDS = 10.0
+LOAD_CACHE_SECONDS = 1.0
+
+_load_lock = threading.Lock()
+_load_cache = (0.0, None)  # (checked_at, load)
+
+
+def cpu_load() -> Optional[float]:
+    """1-minute load average per CPU core, or None where unavailable (Windows)."""
+    global _load_cache
+    now = time.monotonic()
+    with _load_lock:
+        checked_at, load = _load_cache
+        if now - checked_at < LOAD_CACHE_SECONDS:
+            return load
+        try:
+            load = os.getloadavg()[0] / (os.cpu_count() or 1)
+        except (AttributeError, OSError):
+            load = None
+        _load_cache = (now, load)
+        return load
+
+
+class DetectionScheduler:
+    """Detection interval of one consumer, adapted to scene activity and load."""
+
+    def __init__(
+        self,
+        min_interval: float = MIN_INTERVAL_SECONDS,
+        max_interval: float = MAX_INTERVAL_SECONDS,
+        load_fn: Callable[[], Optional[float]] = cpu_load
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.load_fn = load_fn
+
+        self.lock = threading.Lock()
+        self.interval = min_interval
+        self.reason = "start"
+        self.last_load: Optional[float] = None
+        self._last_detection: Optional[float] = None
+        self._detections = deque()  # Detection times within RATE_WINDOW_SECONDS
+
+        # Statistics
+        self.detections = 0
+        self.boosts = 0
+        self.backoffs = 0
+
+    def due(self, now: float) -> bool:
+        """Whether the next detection is due at this (wall clock) time."""
+        with self.lock:
+            return self._last_detection is None or now - self._last_detection >= self.interval
+
+    def update(
+        self,
+        now: float,
+        faces: int,
+        new_faces: int = 0,
+        unconfirmed: int = 0,
+        busy_seconds: float = 0.0
+    ) -> float:
+        """
+        Record a detection and choose the next interval.
+
+        Args:
+            now: Time of the detection
+            faces: Faces found
+            new_faces: Faces that were not in the previous detection
+            unconfirmed: Faces whose identity (or enrollment sample) is still needed
+            busy_seconds: Time spent on the detection, including waiting for an inference slot
+
+        Returns:
+            Next detection interval in seconds
+        """
+        load = self.load_fn()
+        with self.lock:
+            self._last_detection = now
+            self._detections.append(now)
+            while self._detections and now - self._detections[0] > RATE_WINDOW_SECONDS:
+                self._detections.popleft()
+            self.detections += 1
+            self.last_load = load
+
+            previous = self.interval
+            if new_faces or unconfirmed:
+                target, reason = self.min_interval, "activity"
+            else:
+                target, reason = previous * BACKOFF_FACTOR, "static" if faces else "empty"
+
+            if load is not None and load >= CPU_SATURATED:
+                target, reason = max(target, previous * BACKOFF_FACTOR), "cpu"
+
+            duty_floor = busy_seconds / MAX_DUTY_CYCLE
+            if duty_floor > target:
+                target, reason = duty_floor, "busy"
+
+            self.interval = min(max(target, self.min_interval), self.max_interval)
+            self.reason = reason
+            if self.interval < previous:
+                self.boosts += 1
+            elif self.interval > previous:
+                self.backoffs += 1
+            return self.interval
+
+    def get_stats(self) -> Dict:
+        """Target and effective detection rate."""
+        now = time.time()
+        with self.lock:
+            recent = [t for t in self._detections if now - t <= RATE_WINDOW_SECONDS]
+            return {
+                "interval_ms": round(self.interval * 1000, 1),
+                "target_fps": round(1.0 / self.interval, 2),
+                "effective_fps": round(len(recent) / RATE_WINDOW_SECONDS, 2),
+                "reason": self.reason,
+                "cpu_load": round(self.last_load, 2) if self.last_load is not None else None,
+                "min_interval": self.min_interval,
+                "max_interval": self.max_interval,
+                "detections": self.detections,
+                "boosts": self.boosts,
+                "backoffs": self.backoffs
+            }
@@ -0,0 +1,181 @@
+"""
+Persistent per-frame detection store for analyzed videos.
+Detections are appended incrementally to a compact line-delimited file (one
+JSON array per detection) with a sparse time index, so annotation,
+re-thresholding and audits can stream them back without re-running inference.
+
+Layout of an analysis directory:
+    detections.jsonl   one row per detection, see COLUMNS; processed frames
+                       without faces are recorded as a short [frame, t] row
+    index.json         [[timestamp, byte_offset], ...] every INDEX_INTERVAL_SECONDS
+    analysis.json      analysis metadata and per-track summaries
+"""
+
+import bisect
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Row layout of detections.jsonl
+COLUMNS = ["frame", "t", "x1", "y1", "x2", "y2", "track", "identity", "score", "det_score"]
+
+INDEX_INTERVAL_SECONDS = 1.0  # Granularity of the time index used for range queries
+
+DETECTIONS_FILE = "detections.jsonl"
+INDEX_FILE = "index.json"
+META_FILE = "analysis.json"
+
+
+class DetectionWriter:
+    """Appends detections for one analysis; rows must be written in time order."""
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.store_dir / DETECTIONS_FILE, "w", encoding="utf-8")
+        self._index: List[Tuple[float, int]] = []
+        self._next_index_time = 0.0
+        self.rows_written = 0
+
+    def write_frame(self, frame_number: int, timestamp: float, faces: List[Dict]) -> None:
+        """
+        Append all detections of a processed frame.
+
+        Args:
+            frame_number: Frame number in the video
+            timestamp: Frame time in seconds
+            faces: Face dicts with bbox, track_id, identity, confidence, detection_score
+        """
+        if timestamp >= self._next_index_time:
+            self._index.append((round(timestamp, 3), self._file.tell()))
+            self._next_index_time = timestamp + INDEX_INTERVAL_SECONDS
+
+        if not faces:
+            self._file.write(json.dumps([frame_number, round(timestamp, 3)], separators=(",", ":")) + "\n")
+            return
+
+        for face in faces:
+            bbox = face["bbox"]
+            row = [
+                frame_number,
+                round(timestamp, 3),
+                bbox["x1"], bbox["y1"], bbox["x2"], bbox["y2"],
+                face.get("track_id"),
+                face["identity"] if face.get("matched") else None,
+                round(float(face.get("confidence", 0.0)), 3),
+                round(float(face.get("detection_score", 0.0)), 3)
+            ]
+            self._file.write(json.dumps(row, separators=(",", ":")) + "\n")
+            self.rows_written += 1
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def close(self, metadata: Optional[Dict] = None) -> None:
+        """Flush detections and write the time index and analysis metadata."""
+        self._file.close()
+        with open(self.store_dir / INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, separators=(",", ":"))
+        if metadata is not None:
+            write_metadata(self.store_dir, metadata)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.closed:
+            self.close()
+
+
+def write_metadata(store_dir: Path, metadata: Dict) -> None:
+    """Write (or replace) the analysis metadata file."""
+    with open(Path(store_dir) / META_FILE, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+
+
+def read_metadata(store_dir: Path) -> Dict:
+    """Read the analysis metadata file."""
+    with open(Path(store_dir) / META_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _iter_rows(
+    store_dir: Path,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+) -> Iterator[list]:
+    """Stream raw rows in a time range, seeking via the sparse time index."""
+    store_dir = Path(store_dir)
+    offset = 0
+
+    if start is not None and (store_dir / INDEX_FILE).exists():
+        with open(store_dir / INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        times = [entry[0] for entry in index]
+        pos = bisect.bisect_right(times, start) - 1
+        if pos >= 0:
+            offset = index[pos][1]
+
+    with open(store_dir / DETECTIONS_FILE, "r", encoding="utf-8") as f:
+        f.seek(offset)
+        for line in f:
+            row = json.loads(line)
+            t = row[1]
+            if start is not None and t < start:
+                continue
+            if end is not None and t > end:
+                break
+            yield row
+
+
+def iter_detections(
+    store_dir: Path,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+) -> Iterator[Dict]:
+    """
+    Stream detections, optionally restricted to a time range.
+
+    Uses the sparse time index to seek close to `start` instead of scanning
+    the file from the beginning.
+
+    Args:
+        store_dir: Analysis directory
+        start: Inclusive start time in seconds
+        end: Inclusive end time in seconds
+
+    Yields:
+        Detection dicts keyed by COLUMNS
+    """
+    for row in _iter_rows(store_dir, start, end):
+        if len(row) == len(COLUMNS):
+            yield dict(zip(COLUMNS, row))
+
+
+def iter_frames(
+    store_dir: Path,
+    start: Optional[float] = None,
+    end: Optional[float] = None
+) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    Stream detections grouped by processed frame, including frames without faces.
+
+    Yields:
+        (frame_number, [detection, ...]) in frame order
+    """
+    current_frame = None
+    current: List[Dict] = []
+    for row in _iter_rows(store_dir, start, end):
+        if row[0] != current_frame:
+            if current_frame is not None:
+                yield current_frame, current
+            current_frame = row[0]
+            current = []
+        if len(row) == len(COLUMNS):
+            current.append(dict(zip(COLUMNS, row)))
+    if current_frame is not None:
+        yield current_frame, current
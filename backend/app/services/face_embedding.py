@@ -6,11 +6,13 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = "buffalo_l"  # InsightFace model pack (detection + ArcFace recognition)
+
 
 class FaceEmbedder:
     def __init__(self, use_gpu: bool = True):
         # Initialize InsightFace with ArcFace model
-        logger.info("Initializing FaceAnalysis with buffalo_l model...")
+        logger.info(f"Initializing FaceAnalysis with {MODEL_NAME} model...")
         
         # Ensure model directory exists
         model_dir = os.path.expanduser("~/.insightface")
@@ -33,18 +35,19 @@ class FaceEmbedder:
         if use_gpu and gpu_available:
             # Force CUDA execution provider for GPU acceleration
             self.app = FaceAnalysis(
-                name="buffalo_l",
+                name=MODEL_NAME,
                 providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
             )
             ctx_id = 0  # Use GPU
         else:
-            self.app = FaceAnalysis(name="buffalo_l")
+            self.app = FaceAnalysis(name=MODEL_NAME)
             ctx_id = -1  # Use CPU
         
         logger.info("Preparing model (this may download models on first run)...")
         # det_size controls detection resolution (higher = better detection but slower)
         # ctx_id=0 uses GPU, -1 for CPU
-        self.app.prepare(ctx_id=ctx_id, det_size=(640, 640))
+        self.det_size = (640, 640)
+        self.app.prepare(ctx_id=ctx_id, det_size=self.det_size)
         
         self.ctx_id = ctx_id
         logger.info(f"FaceEmbedder initialized successfully! Using: {'GPU' if ctx_id == 0 else 'CPU'}")
@@ -124,3 +127,50 @@ class FaceEmbedder:
         embedding = self._rec_model.get_feat(face).flatten()
         
         return embedding / np.linalg.norm(embedding)
+
+    def detect(self, frame, input_size=None):
+        """
+        Run face detection only, without computing embeddings.
+        
+        Returns InsightFace Face objects with bbox, kps and det_score set,
+        so that embeddings can be computed later only for the faces that
+        actually need identification (see embed_face).
+        
+        Args:
+            frame: BGR image (numpy array)
+            input_size: Detector input (width, height), multiples of 32;
+                defaults to det_size. Smaller inputs for image crops keep
+                the pixel density of a full-frame pass at lower cost.
+            
+        Returns:
+            List of InsightFace Face objects without embeddings
+        """
+        from insightface.app.common import Face
+        
+        bboxes, kpss = self.app.det_model.detect(frame, input_size=input_size, max_num=0, metric='default')
+        
+        faces = []
+        for i in range(bboxes.shape[0]):
+            faces.append(Face(
+                bbox=bboxes[i, 0:4],
+                kps=kpss[i] if kpss is not None else None,
+                det_score=bboxes[i, 4]
+            ))
+        return faces
+
+    def embed_face(self, frame, face):
+        """
+        Compute the ArcFace embedding for a face returned by detect().
+        
+        Args:
+            frame: BGR image the face was detected in
+            face: InsightFace Face object with kps set
+            
+        Returns:
+            Normalized 512-dimensional embedding vector
+        """
+        if not hasattr(self, '_rec_model'):
+            self._rec_model = self.app.models.get('recognition')
+        
+        embedding = self._rec_model.get(frame, face)
+        return embedding / np.linalg.norm(embedding)
@@ -0,0 +1,130 @@
+"""
+Cheap face quality gate applied before embedding.
+Tiny, motion-blurred or strongly turned faces produce unreliable embeddings
+and waste recognition work. Quality is computed from the detector output
+(box size, landmark-based yaw) and a small grayscale crop (variance of the
+Laplacian as a blur measure). Faces below the thresholds are rejected with a
+reason; accepted faces get a quality score used to weight their embeddings.
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Configuration
+MIN_FACE_SIZE = 40           # Reject faces smaller than this (px, shorter box side)
+IDEAL_FACE_SIZE = 112        # Face size (px) at which size stops lowering quality
+MAX_YAW_DEGREES = 45.0       # Reject faces turned further than this
+MIN_SHARPNESS = 30.0         # Reject crops with a lower Laplacian variance (blurred)
+SHARP_REFERENCE = 150.0      # Laplacian variance at which blur stops lowering quality
+BLUR_CROP_SIZE = 64          # Crops are resized to this size so sharpness is scale independent
+
+REJECT_SIZE = "too_small"
+REJECT_YAW = "profile"
+REJECT_BLUR = "blurry"
+
+
+def estimate_yaw(kps: Optional[np.ndarray]) -> float:
+    """
+    Approximate head yaw in degrees from the 5-point landmarks
+    (left eye, right eye, nose, left mouth, right mouth): the horizontal
+    offset of the nose from the eye midpoint relative to half the eye distance.
+    """
+    if kps is None or len(kps) < 3:
+        return 0.0
+    left_eye, right_eye, nose = kps[0], kps[1], kps[2]
+    half_eye_distance = abs(right_eye[0] - left_eye[0]) / 2.0
+    if half_eye_distance < 1e-3:
+        return 90.0
+    offset = (nose[0] - (left_eye[0] + right_eye[0]) / 2.0) / half_eye_distance
+    return float(np.degrees(np.arcsin(np.clip(offset, -1.0, 1.0))))
+
+
+def sharpness(frame, bbox) -> float:
+    """Variance of the Laplacian of the face crop (higher = sharper)."""
+    h, w = frame.shape[:2]
+    x1, y1 = max(0, int(bbox[0])), max(0, int(bbox[1]))
+    x2, y2 = min(w, int(bbox[2])), min(h, int(bbox[3]))
+    if x2 <= x1 or y2 <= y1:
+        return 0.0
+    crop = cv2.resize(frame[y1:y2, x1:x2], (BLUR_CROP_SIZE, BLUR_CROP_SIZE), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def assess_face(frame, face) -> Dict:
+    """
+    Assess a detected face. Checks run cheapest first and stop at the first failure.
+
+    Args:
+        frame: BGR image the face was detected in
+        face: InsightFace Face with bbox, kps and det_score
+
+    Returns:
+        dict with size, yaw, sharpness, score (0-1, 0 if rejected) and
+        reason (None if accepted)
+    """
+    bbox = face.bbox
+    size = float(min(bbox[2] - bbox[0], bbox[3] - bbox[1]))
+    result = {"size": round(size, 1), "yaw": None, "sharpness": None, "score": 0.0, "reason": None}
+
+    if size < MIN_FACE_SIZE:
+        result["reason"] = REJECT_SIZE
+        return result
+
+    yaw = estimate_yaw(face.kps)
+    result["yaw"] = round(yaw, 1)
+    if abs(yaw) > MAX_YAW_DEGREES:
+        result["reason"] = REJECT_YAW
+        return result
+
+    sharp = sharpness(frame, bbox)
+    result["sharpness"] = round(sharp, 1)
+    if sharp < MIN_SHARPNESS:
+        result["reason"] = REJECT_BLUR
+        return result
+
+    result["score"] = round(
+        float(face.det_score)
+        * float(np.clip(size / IDEAL_FACE_SIZE, 0.0, 1.0))
+        * float(np.cos(np.radians(yaw)))
+        * float(np.clip(sharp / SHARP_REFERENCE, 0.0, 1.0)),
+        4
+    )
+    return result
+
+
+class QualityGate:
+    """Applies assess_face and counts accepted faces and rejections by reason."""
+
+    def __init__(self):
+        self.assessed = 0
+        self.accepted = 0
+        self.rejections: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def check(self, frame, face) -> Tuple[bool, Dict]:
+        """
+        Returns:
+            (accepted, quality dict from assess_face)
+        """
+        quality = assess_face(frame, face)
+        with self.lock:
+            self.assessed += 1
+            if quality["reason"] is None:
+                self.accepted += 1
+            else:
+                self.rejections[quality["reason"]] += 1
+        return quality["reason"] is None, quality
+
+    def get_stats(self) -> Dict:
+        """Get gate statistics."""
+        with self.lock:
+            return {
+                "assessed": self.assessed,
+                "accepted": self.accepted,
+                "rejected": dict(self.rejections)
+            }
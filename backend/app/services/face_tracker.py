@@ -0,0 +1,239 @@
+"""
+Lightweight IoU-based multi-face tracker.
+Associates RetinaFace detections across frames so that identity only has to be
+resolved once per track (with periodic re-verification) instead of on every frame.
+Tracks also keep their best-quality embeddings so a single, more stable
+aggregated embedding can be matched per track.
+"""
+
+import itertools
+import logging
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+IOU_THRESHOLD = 0.3          # Minimum IoU to associate a detection with a track
+MAX_MISSED_SECONDS = 1.0     # Drop a track after it has not been seen for this long
+REVERIFY_SECONDS = 5.0       # Re-run identification on a confirmed track this often
+TOP_K_SAMPLES = 5            # Best-quality embeddings kept per track for aggregation
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Compute pairwise IoU between two sets of [x1, y1, x2, y2] boxes.
+
+    Args:
+        boxes_a: Array of shape (N, 4)
+        boxes_b: Array of shape (M, 4)
+
+    Returns:
+        Array of shape (N, M) with IoU values
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+
+    return inter / np.maximum(union, 1e-6)
+
+
+class FaceTrack:
+    """State of a single tracked face."""
+
+    def __init__(self, track_id: int, bbox: np.ndarray, timestamp: float):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+
+        # Identity resolution state
+        self.identity: Optional[str] = None
+        self.confidence = 0.0
+        self.source = "none"
+        self.last_verified: Optional[float] = None
+        self.searches = 0
+        self.candidates: List[Dict] = []  # Top-k gallery matches of the last search
+
+        # Best-quality embeddings as (quality, embedding), highest quality first
+        self.samples: List[Tuple[float, np.ndarray]] = []
+        self.samples_seen = 0
+        self._samples_at_last_search = 0
+
+    def needs_identification(self, timestamp: float, reverify_seconds: float = REVERIFY_SECONDS) -> bool:
+        """Whether identity should be (re-)resolved for this track now."""
+        if self.last_verified is None:
+            return True
+        return timestamp - self.last_verified >= reverify_seconds
+
+    def set_identity(
+        self,
+        identity: Optional[str],
+        confidence: float,
+        source: str,
+        timestamp: float,
+        candidates: Optional[List[Dict]] = None
+    ) -> None:
+        """Record the result of an identification attempt."""
+        self.identity = identity
+        self.confidence = confidence
+        self.source = source
+        self.last_verified = timestamp
+        self.searches += 1
+        if candidates is not None:
+            self.candidates = candidates
+        self._samples_at_last_search = self.samples_seen
+
+    def wants_sample(self, quality: float, max_samples: int = TOP_K_SAMPLES) -> bool:
+        """Whether a sample of this quality would be kept (i.e. is worth embedding)."""
+        return len(self.samples) < max_samples or quality > self.samples[-1][0]
+
+    def add_sample(self, embedding: np.ndarray, quality: float, max_samples: int = TOP_K_SAMPLES) -> None:
+        """Keep the embedding if it is among the best max_samples seen for this track."""
+        self.samples_seen += 1
+        self.samples.append((quality, embedding))
+        self.samples.sort(key=lambda s: s[0], reverse=True)
+        del self.samples[max_samples:]
+
+    def has_new_samples(self) -> bool:
+        """Whether samples were added since the last identification."""
+        return self.samples_seen > self._samples_at_last_search
+
+    def aggregate_embedding(self) -> Optional[np.ndarray]:
+        """
+        Quality-weighted mean of the kept embeddings.
+
+        Returns:
+            Normalized embedding, or None if the track has no samples
+        """
+        if not self.samples:
+            return None
+        weights = np.array([max(q, 1e-3) for q, _ in self.samples], dtype=np.float32)
+        embeddings = np.stack([e for _, e in self.samples])
+        mean = np.average(embeddings, axis=0, weights=weights)
+        return mean / (np.linalg.norm(mean) + 1e-8)
+
+    def quality_metrics(self) -> Dict:
+        """Per-track quality metrics for reporting."""
+        qualities = [q for q, _ in self.samples]
+        return {
+            "samples_seen": self.samples_seen,
+            "samples_used": len(self.samples),
+            "best_quality": round(max(qualities), 3) if qualities else 0.0,
+            "mean_quality": round(float(np.mean(qualities)), 3) if qualities else 0.0,
+            "searches": self.searches
+        }
+
+    def to_dict(self) -> Dict:
+        """Serialize track state for API responses."""
+        return {
+            "track_id": self.track_id,
+            "bbox": [int(v) for v in self.bbox],
+            "identity": self.identity,
+            "confidence": round(float(self.confidence), 3),
+            "source": self.source,
+            "hits": self.hits,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "quality": self.quality_metrics()
+        }
+
+
+class FaceTracker:
+    """
+    Greedy IoU tracker over face bounding boxes.
+
+    Call update() with the detections of each processed frame; it returns the
+    track each detection was assigned to. Tracks that are not seen for
+    max_missed_seconds are dropped and returned by update() as ended tracks.
+    """
+
+    def __init__(
+        self,
+        iou_threshold: float = IOU_THRESHOLD,
+        max_missed_seconds: float = MAX_MISSED_SECONDS,
+        reverify_seconds: float = REVERIFY_SECONDS
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_missed_seconds = max_missed_seconds
+        self.reverify_seconds = reverify_seconds
+        self.tracks: Dict[int, FaceTrack] = {}
+        self._ids = itertools.count(1)
+        self.total_tracks = 0
+
+    def update(self, bboxes: List[np.ndarray], timestamp: float) -> Tuple[List[FaceTrack], List[FaceTrack]]:
+        """
+        Associate detections of the current frame with existing tracks.
+
+        Args:
+            bboxes: List of [x1, y1, x2, y2] boxes detected in the frame
+            timestamp: Frame time in seconds (video time or wall clock)
+
+        Returns:
+            Tuple of (tracks aligned with bboxes, tracks that ended)
+        """
+        track_ids = list(self.tracks.keys())
+        track_boxes = np.array([self.tracks[t].bbox for t in track_ids], dtype=np.float32).reshape(-1, 4)
+        det_boxes = np.array(bboxes, dtype=np.float32).reshape(-1, 4)
+
+        ious = iou_matrix(track_boxes, det_boxes)
+        assigned: List[Optional[FaceTrack]] = [None] * len(det_boxes)
+        used_tracks = set()
+
+        # Greedy association, best overlaps first
+        if ious.size > 0:
+            for flat in np.argsort(-ious, axis=None):
+                t_idx, d_idx = np.unravel_index(flat, ious.shape)
+                if ious[t_idx, d_idx] < self.iou_threshold:
+                    break
+                if t_idx in used_tracks or assigned[d_idx] is not None:
+                    continue
+                track = self.tracks[track_ids[t_idx]]
+                track.bbox = det_boxes[d_idx]
+                track.last_seen = timestamp
+                track.hits += 1
+                assigned[d_idx] = track
+                used_tracks.add(t_idx)
+
+        # Unmatched detections start new tracks
+        for d_idx, track in enumerate(assigned):
+            if track is None:
+                track = FaceTrack(next(self._ids), det_boxes[d_idx], timestamp)
+                self.tracks[track.track_id] = track
+                self.total_tracks += 1
+                assigned[d_idx] = track
+
+        # Expire stale tracks
+        ended = [
+            track for track in self.tracks.values()
+            if timestamp - track.last_seen > self.max_missed_seconds
+        ]
+        for track in ended:
+            del self.tracks[track.track_id]
+
+        return assigned, ended
+
+    def needs_identification(self, track: FaceTrack, timestamp: float) -> bool:
+        """Whether a track's identity should be (re-)resolved at this time."""
+        return track.needs_identification(timestamp, self.reverify_seconds)
+
+    def flush(self) -> List[FaceTrack]:
+        """End and return all remaining tracks (e.g. at end of video)."""
+        ended = list(self.tracks.values())
+        self.tracks.clear()
+        return ended
+
+    def active_tracks(self) -> List[FaceTrack]:
+        """Return all currently active tracks."""
+        return list(self.tracks.values())
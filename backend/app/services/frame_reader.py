@@ -0,0 +1,167 @@
+"""
+Video decoding in a dedicated reader process.
+The reader process decodes frames with OpenCV and writes them into a ring
+buffer in shared memory (multiprocessing.shared_memory). The consuming
+thread receives only (slot, frame_number) messages and reads frames as
+read-only numpy views into the ring, so neither decoding nor frame copies
+hold the GIL of the API process.
+
+Usage:
+    with SharedFrameReader(path) as reader:
+        for frame_number, frame in reader:
+            ...  # frame is valid until the next iteration
+"""
+
+import logging
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RING_SLOTS = 8              # Decoded frames buffered ahead of the consumer
+SLOT_WAIT_SECONDS = 0.5     # Poll interval of the reader while the ring is full
+STOP_TIMEOUT_SECONDS = 5.0  # Wait for the reader process to exit before terminating it
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without letting this process unlink it on exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+def _reader_main(source: str, shm_name: str, shape: Tuple[int, ...], free_slots, filled_slots, stop_event) -> None:
+    """Reader process: decode frames into free ring slots until the video ends or stop is set."""
+    shm = _attach(shm_name)
+    ring = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    height, width = shape[1], shape[2]
+    cap = cv2.VideoCapture(source)
+    frame_number = 0
+
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_number += 1
+
+            slot = None
+            while slot is None and not stop_event.is_set():
+                try:
+                    slot = free_slots.get(timeout=SLOT_WAIT_SECONDS)
+                except queue.Empty:
+                    pass
+            if slot is None:
+                break
+
+            if frame.shape != ring.shape[1:]:
+                frame = cv2.resize(frame, (width, height))
+            np.copyto(ring[slot], frame)
+            filled_slots.put((slot, frame_number))
+    except Exception as e:
+        filled_slots.put(("error", str(e)))
+    finally:
+        cap.release()
+        filled_slots.put(None)
+        del ring
+        shm.close()
+
+
+class SharedFrameReader:
+    """
+    Iterates over the frames of a video decoded by a separate process.
+
+    Yielded frames are read-only views into shared memory; a frame stays
+    valid until the next iteration, when its slot is handed back to the
+    reader. Copy it if it must outlive the loop body.
+    """
+
+    def __init__(self, source: Path, slots: int = RING_SLOTS):
+        # Probe the container in this process to size the ring
+        cap = cv2.VideoCapture(str(source))
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {source}")
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        self.total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+
+        shape = (slots, self.height, self.width, 3)
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        self._ring = np.ndarray(shape, dtype=np.uint8, buffer=self._shm.buf)
+        self._held = None
+
+        # Spawn (not fork): the API process is multi-threaded and may hold CUDA state
+        ctx = mp.get_context("spawn")
+        self._free = ctx.Queue()
+        self._filled = ctx.Queue()
+        self._stop = ctx.Event()
+        for slot in range(slots):
+            self._free.put(slot)
+
+        self._process = ctx.Process(
+            target=_reader_main,
+            args=(str(source), self._shm.name, shape, self._free, self._filled, self._stop),
+            daemon=True,
+            name="frame-reader"
+        )
+        self._process.start()
+
+    def _release_held(self) -> None:
+        if self._held is not None:
+            self._free.put(self._held)
+            self._held = None
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        while True:
+            self._release_held()
+            item = self._filled.get()
+            if item is None:
+                return
+            if item[0] == "error":
+                raise RuntimeError(f"Frame reader failed: {item[1]}")
+
+            slot, frame_number = item
+            self._held = slot
+            frame = self._ring[slot]
+            frame.flags.writeable = False
+            yield frame_number, frame
+
+    def close(self) -> None:
+        """Stop the reader process and release the shared memory."""
+        self._stop.set()
+        self._process.join(timeout=STOP_TIMEOUT_SECONDS)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join()
+
+        self._free.close()
+        self._filled.close()
+        self._held = None
+        del self._ring
+        try:
+            self._shm.close()
+        except BufferError:
+            # A caller still references a frame view; the mapping is freed with it
+            logger.warning("Frame view still referenced, deferring shared memory unmap")
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,159 @@
+"""
+Preallocated frame ring for handing camera frames to consumers without copies.
+The capture thread decodes straight into a free ring slot and publishes it
+with a sequence number; consumers wait on a condition for a frame newer than
+the last one they saw and get a read-only view of the slot. A slot is pinned
+while a consumer holds it, so the writer never overwrites a frame in use;
+buffers are only allocated for the first frame (or a resolution change).
+
+Usage:
+    with ring.acquire(after_seq=last_seq, timeout=1.0) as ref:
+        if ref is not None:
+            last_seq = ref.seq
+            ...  # ref.frame is read-only and valid inside the block
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RING_SLOTS = 4  # Latest frame + slot being written + frames pinned by consumers
+
+
+class FrameRef(NamedTuple):
+    seq: int
+    frame: np.ndarray
+    timestamp: float
+
+
+class FrameRing:
+    """Single-writer, multi-reader ring of frame buffers."""
+
+    def __init__(self, slots: int = RING_SLOTS):
+        self.cond = threading.Condition()
+        self.buffers = [None] * slots
+        self.pins = [0] * slots
+        self.seq = 0
+        self.latest = None  # Slot of the newest frame
+        self.timestamp = 0.0
+        self._writing = None
+
+        self.allocations = 0
+        self.slots_added = 0
+
+    def begin_write(self) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Reserve a slot for the next frame (not the latest, not pinned).
+
+        Returns:
+            (slot, buffer to decode into - None until the slot is first used)
+        """
+        with self.cond:
+            for slot, pins in enumerate(self.pins):
+                if slot != self.latest and pins == 0:
+                    break
+            else:
+                # Every slot is in use by slow consumers: grow instead of overwriting
+                self.buffers.append(None)
+                self.pins.append(0)
+                slot = len(self.buffers) - 1
+                self.slots_added += 1
+                logger.warning(f"Frame ring grown to {len(self.buffers)} slots")
+            self._writing = slot
+            return slot, self.buffers[slot]
+
+    def commit(self, slot: int, frame: np.ndarray, timestamp: float) -> int:
+        """
+        Publish a written slot as the newest frame.
+
+        Args:
+            slot: Slot from begin_write
+            frame: Decoded frame (the slot buffer, or a new array if the decoder allocated one)
+            timestamp: Capture time
+
+        Returns:
+            Sequence number of the frame
+        """
+        with self.cond:
+            if frame is not self.buffers[slot]:
+                self.buffers[slot] = frame
+                self.allocations += 1
+            self._writing = None
+            self.seq += 1
+            self.latest = slot
+            self.timestamp = timestamp
+            self.cond.notify_all()
+            return self.seq
+
+    def abort(self, slot: int) -> None:
+        """Release a reserved slot without publishing it."""
+        with self.cond:
+            self._writing = None
+
+    def clear(self) -> None:
+        """Forget the latest frame and drop unpinned buffers (camera stopped); sequence numbers keep increasing."""
+        with self.cond:
+            self.latest = None
+            self.timestamp = 0.0
+            for slot, pins in enumerate(self.pins):
+                if pins == 0:
+                    self.buffers[slot] = None  # Pinned views keep their own array alive
+
+    def latest_info(self) -> Tuple[int, float]:
+        """(sequence number, capture time) of the newest frame."""
+        with self.cond:
+            return (self.seq if self.latest is not None else 0), self.timestamp
+
+    @contextmanager
+    def acquire(self, after_seq: int = 0, timeout: Optional[float] = None) -> Iterator[Optional[FrameRef]]:
+        """
+        Pin the newest frame with a sequence number above after_seq, waiting
+        up to timeout seconds for it. Yields None if no such frame arrived.
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.latest is not None and self.seq > after_seq, timeout):
+                slot = None
+            else:
+                slot = self.latest
+                self.pins[slot] += 1
+                ref = FrameRef(self.seq, self.buffers[slot].view(), self.timestamp)
+                ref.frame.flags.writeable = False
+
+        if slot is None:
+            yield None
+            return
+        try:
+            yield ref
+        finally:
+            with self.cond:
+                self.pins[slot] -= 1
+
+    def copy_latest(self, after_seq: int = 0, timeout: Optional[float] = None,
+                    out: Optional[np.ndarray] = None) -> Optional[FrameRef]:
+        """
+        Copy the newest frame into out (reallocated only if its shape differs),
+        for consumers that draw on the frame. Returns a FrameRef with a writable frame.
+        """
+        with self.acquire(after_seq, timeout) as ref:
+            if ref is None:
+                return None
+            if out is None or out.shape != ref.frame.shape:
+                out = np.empty_like(ref.frame)
+            np.copyto(out, ref.frame)
+            return FrameRef(ref.seq, out, ref.timestamp)
+
+    def get_stats(self) -> Dict:
+        """Get ring statistics."""
+        with self.cond:
+            return {
+                "seq": self.seq,
+                "slots": len(self.buffers),
+                "pinned": sum(1 for p in self.pins if p > 0),
+                "allocations": self.allocations,
+                "slots_added": self.slots_added
+            }
@@ -0,0 +1,124 @@
+"""
+Motion / scene-change adaptive frame sampling.
+Decides which frames are worth running face detection on by comparing a tiny
+grayscale thumbnail of the frame against the last processed one.
+
+Savings are reported against the fixed cadence the sampler replaces
+(baseline_interval, e.g. every 5th frame): frames_saved is how many fewer
+detections ran than that cadence would have run, while frames_unchanged
+counts every eligible frame skipped because nothing changed.
+"""
+
+import cv2
+import logging
+import numpy as np
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MIN_INTERVAL_SECONDS = 0.1   # Never process frames closer together than this
+MAX_INTERVAL_SECONDS = 1.0   # Always process at least once per this interval
+CHANGE_THRESHOLD = 4.0       # Mean absolute thumbnail difference (0-255) that counts as a change
+THUMBNAIL_SIZE = (64, 36)    # (width, height) of the comparison thumbnail
+
+
+class AdaptiveFrameSampler:
+    """
+    Frame sampler that processes more often when the scene changes and less
+    often when it is static.
+
+    Timestamps are in seconds and can be video time (frame_number / fps) or
+    wall-clock time, so the same sampler works for uploaded videos and live
+    camera streams.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = MIN_INTERVAL_SECONDS,
+        max_interval: float = MAX_INTERVAL_SECONDS,
+        change_threshold: float = CHANGE_THRESHOLD,
+        thumbnail_size: tuple = THUMBNAIL_SIZE,
+        baseline_interval: Optional[float] = None
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.change_threshold = change_threshold
+        self.thumbnail_size = thumbnail_size
+        self.baseline_interval = baseline_interval  # Fixed cadence to compare against (None = no comparison)
+
+        self._last_thumbnail: Optional[np.ndarray] = None
+        self._last_time: Optional[float] = None
+        self._last_baseline_time: Optional[float] = None
+
+        # Statistics
+        self.frames_seen = 0
+        self.frames_processed = 0
+        self.frames_unchanged = 0  # Eligible frames skipped because nothing changed
+        self.baseline_frames = 0   # Frames the fixed baseline cadence would have processed
+        self.last_change = 0.0
+
+    def _thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        """Cheap downscaled grayscale version of the frame."""
+        # Strided view first so the resize touches only a fraction of the pixels
+        step = max(1, frame.shape[1] // (self.thumbnail_size[0] * 4))
+        small = cv2.resize(frame[::step, ::step], self.thumbnail_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def should_process(self, frame: np.ndarray, timestamp: float) -> bool:
+        """
+        Decide whether to run detection on this frame.
+
+        Args:
+            frame: BGR frame
+            timestamp: Frame time in seconds
+
+        Returns:
+            True if the frame should be processed
+        """
+        self.frames_seen += 1
+        if self.baseline_interval is not None and (
+            self._last_baseline_time is None or timestamp - self._last_baseline_time >= self.baseline_interval
+        ):
+            self.baseline_frames += 1
+            self._last_baseline_time = timestamp
+
+        elapsed = None if self._last_time is None else timestamp - self._last_time
+        if elapsed is not None and elapsed < self.min_interval:
+            return False
+
+        thumbnail = self._thumbnail(frame)
+
+        if elapsed is not None and elapsed < self.max_interval and self._last_thumbnail is not None:
+            self.last_change = float(cv2.absdiff(thumbnail, self._last_thumbnail).mean())
+            if self.last_change < self.change_threshold:
+                self.frames_unchanged += 1
+                return False
+
+        self._last_thumbnail = thumbnail
+        self._last_time = timestamp
+        self.frames_processed += 1
+        return True
+
+    def reset(self) -> None:
+        """Forget the reference frame so the next eligible frame is processed."""
+        self._last_thumbnail = None
+        self._last_time = None
+
+    def get_stats(self) -> Dict:
+        """Get sampling statistics."""
+        return {
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "frames_seen": self.frames_seen,
+            "frames_processed": self.frames_processed,
+            "frames_unchanged": self.frames_unchanged,
+            **({
+                "baseline_frames": self.baseline_frames,
+                # Detections avoided compared to the fixed cadence (negative if motion needed more)
+                "frames_saved": self.baseline_frames - self.frames_processed
+            } if self.baseline_interval is not None else {}),
+            "last_change": round(self.last_change, 2)
+        }
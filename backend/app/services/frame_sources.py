@@ -0,0 +1,237 @@
+"""
+Frame sources for the live pipeline.
+open_capture() turns a source string into a cv2.VideoCapture-compatible
+object, so camera capture, /enroll/webcam, /identify/webcam and
+scripts/identify.py work the same on a real webcam and on a headless box:
+
+    0, 1, /dev/video0        local device (V4L2 on Linux, DirectShow/MSMF on Windows)
+    rtsp://..., http://...   network stream
+    /data/class.mp4          video file, replayed in real time
+    /data/frames/, *.jpg     image sequence (directory or glob), replayed in real time
+
+Replayed sources block in read() until the next frame is due at the
+configured FPS (the file's own rate by default) and loop at the end, so
+they behave like a camera for load tests and benchmarks.
+
+Configuration: CAMERA_SOURCE (default "0"), CAMERA_FPS (replay rate
+override) and CAMERA_LOOP (replay looping, default on).
+"""
+
+import glob
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "0")
+CAMERA_FPS = float(os.getenv("CAMERA_FPS", "0")) or None
+CAMERA_LOOP = os.getenv("CAMERA_LOOP", "1").lower() not in ("0", "false", "no")
+
+DEFAULT_REPLAY_FPS = 30.0
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+MAX_LAG_SECONDS = 1.0  # A replay that falls further behind resets its clock instead of bursting
+
+SOURCE_DEVICE = "device"
+SOURCE_STREAM = "stream"
+SOURCE_FILE = "file"
+SOURCE_IMAGES = "images"
+
+STREAM_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https", "udp", "tcp")
+
+
+def parse_source(source) -> Tuple[str, object]:
+    """
+    Classify a frame source.
+
+    Returns:
+        (kind, value) - device index or path, stream URL, file path or image paths
+
+    Raises:
+        ValueError: If the source is empty, uses an unsupported URL scheme or
+            matches no images
+    """
+    value = str(source).strip()
+    if not value:
+        raise ValueError("Camera source must not be empty")
+    if value.isdigit():
+        return SOURCE_DEVICE, int(value)
+    if value.startswith("/dev/video"):
+        return SOURCE_DEVICE, value
+    if "://" in value:
+        scheme = value.split("://", 1)[0].lower()
+        if scheme not in STREAM_SCHEMES:
+            raise ValueError(f"Unsupported camera URL scheme: {scheme}")
+        return SOURCE_STREAM, value
+    if os.path.isdir(value) or any(c in value for c in "*["):
+        pattern = os.path.join(value, "*") if os.path.isdir(value) else value
+        images = sorted(p for p in glob.glob(pattern) if p.lower().endswith(IMAGE_EXTENSIONS))
+        if not images:
+            raise ValueError(f"No images found for {value}")
+        return SOURCE_IMAGES, images
+    return SOURCE_FILE, value
+
+
+def capture_backends(kind: str) -> List[Tuple[int, str]]:
+    """OpenCV backends to try, in order, for a device or stream on this platform."""
+    if kind == SOURCE_DEVICE:
+        if sys.platform == "win32":
+            return [(cv2.CAP_DSHOW, "DirectShow"), (cv2.CAP_MSMF, "Media Foundation"), (cv2.CAP_ANY, "Default")]
+        if sys.platform.startswith("linux"):
+            return [(cv2.CAP_V4L2, "V4L2"), (cv2.CAP_ANY, "Default")]
+        return [(cv2.CAP_ANY, "Default")]
+    if kind == SOURCE_STREAM:
+        return [(cv2.CAP_FFMPEG, "FFmpeg"), (cv2.CAP_ANY, "Default")]
+    return [(cv2.CAP_ANY, "Default")]
+
+
+class ReplayCapture:
+    """
+    cv2.VideoCapture-compatible replay of a video file or image sequence.
+    read() returns frames at the replay FPS with real-time pacing and
+    restarts at the end when looping.
+    """
+
+    def __init__(self, kind: str, target, fps: Optional[float] = None, loop: bool = True):
+        self.kind = kind
+        self.loop = loop
+        self.position = 0
+        self.loops = 0
+        self._due = None
+
+        if kind == SOURCE_IMAGES:
+            self.images = list(target)
+            self.video = None
+            first = cv2.imread(self.images[0])
+            self.height, self.width = first.shape[:2] if first is not None else (0, 0)
+            native_fps = None
+        else:
+            self.images = None
+            self.video = cv2.VideoCapture(str(target))
+            self.width = int(self.video.get(cv2.CAP_PROP_FRAME_WIDTH))
+            self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            native_fps = self.video.get(cv2.CAP_PROP_FPS) or None
+        self.fps = fps or native_fps or DEFAULT_REPLAY_FPS
+
+    def isOpened(self) -> bool:
+        if self.images is not None:
+            return self.width > 0
+        return self.video is not None and self.video.isOpened()
+
+    def _next_frame(self, image=None):
+        if self.images is not None:
+            if self.position >= len(self.images):
+                return False, None
+            frame = cv2.imread(self.images[self.position])
+            if frame is not None and image is not None and image.shape == frame.shape:
+                image[...] = frame
+                frame = image
+            return frame is not None, frame
+        return self.video.read(image) if image is not None else self.video.read()
+
+    def _rewind(self) -> None:
+        self.position = 0
+        if self.video is not None:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def read(self, image=None):
+        """Next frame once it is due; loops at the end of the source."""
+        ret, frame = self._next_frame(image)
+        if not ret and self.loop and self.position > 0:
+            self._rewind()
+            self.loops += 1
+            ret, frame = self._next_frame(image)
+        if not ret:
+            return False, None
+        self.position += 1
+
+        # Real-time pacing: frame n is delivered 1/fps after frame n-1
+        now = time.monotonic()
+        if self._due is None or now - self._due > MAX_LAG_SECONDS:
+            self._due = now
+        elif self._due > now:
+            time.sleep(self._due - now)
+        self._due += 1.0 / self.fps
+        return True, frame
+
+    def grab(self) -> bool:
+        return self.read()[0]
+
+    def get(self, prop) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.position)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.images)) if self.images is not None else self.video.get(prop)
+        return 0.0
+
+    def set(self, prop, value) -> bool:
+        if prop == cv2.CAP_PROP_POS_FRAMES and value == 0:
+            self._rewind()
+            return True
+        return False  # Resolution/FPS/buffer settings don't apply to a replay
+
+    def release(self) -> None:
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+
+def open_capture(source=None, fps: Optional[float] = None, loop: Optional[bool] = None, label: str = "camera"):
+    """
+    Open a frame source (CAMERA_SOURCE by default) and verify it delivers frames.
+
+    Args:
+        source: Source string (see module docstring)
+        fps: Replay rate for files and image sequences (default CAMERA_FPS, then the file's rate)
+        loop: Loop replays (default CAMERA_LOOP)
+        label: Name used in log messages
+
+    Returns:
+        An opened VideoCapture-compatible object, or None if the source cannot be opened
+
+    Raises:
+        ValueError: If the source string is invalid
+    """
+    kind, target = parse_source(CAMERA_SOURCE if source is None else source)
+
+    if kind in (SOURCE_FILE, SOURCE_IMAGES):
+        if kind == SOURCE_FILE and not Path(target).is_file():
+            logger.error(f"{label}: video file not found: {target}")
+            return None
+        cap = ReplayCapture(kind, target, fps=fps or CAMERA_FPS, loop=CAMERA_LOOP if loop is None else loop)
+        if not cap.isOpened():
+            logger.error(f"{label}: cannot open {kind} source {target}")
+            cap.release()
+            return None
+        logger.info(f"{label}: replaying {kind} source at {cap.fps:.1f} FPS (loop={cap.loop})")
+        return cap
+
+    for backend, name in capture_backends(kind):
+        cap = None
+        try:
+            cap = cv2.VideoCapture(target, backend)
+            if cap.isOpened():
+                ret, _ = cap.read()  # Test read
+                if ret:
+                    logger.info(f"{label} opened with {name} backend")
+                    return cap
+            cap.release()
+        except Exception as e:
+            logger.warning(f"{label}: {name} backend failed: {e}")
+            if cap is not None:
+                try:
+                    cap.release()
+                except Exception:
+                    pass
+    return None
@@ -0,0 +1,159 @@
+"""
+Push delivery of live identification results.
+The recognition worker publishes each result set here; subscribers receive
+only what changed since the last set they saw, keyed by face track:
+
+    new      a track appeared
+    changed  a track's identity (or resolved name) changed
+    left     a track is gone
+
+Confidence jitter alone is not an event. Subscribers follow one camera
+(track IDs are per camera) and can additionally be restricted
+to a roster (the students of a session's class); faces outside it are
+treated as absent for that subscriber. Delivery is latest-wins: a slow
+client diffs against the newest set instead of queueing every update.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15.0  # Keep-alive comment interval so proxies don't close idle streams
+
+EVENT_NEW = "new"
+EVENT_CHANGED = "changed"
+EVENT_LEFT = "left"
+
+
+def filter_faces(faces: List[Dict], roster: Optional[Set[str]]) -> Dict[int, Dict]:
+    """Faces visible to a subscriber, keyed by track ID (all faces if roster is None)."""
+    return {
+        face["track_id"]: face
+        for face in faces
+        if roster is None or face.get("identity") in roster
+    }
+
+
+def diff_faces(previous: Dict[int, Dict], current: Dict[int, Dict]) -> List[Dict]:
+    """Changes between two face sets keyed by track ID."""
+    changes = []
+    for track_id, face in current.items():
+        before = previous.get(track_id)
+        if before is None:
+            changes.append({"type": EVENT_NEW, "face": face})
+        elif before.get("identity") != face.get("identity") or before.get("name") != face.get("name"):
+            changes.append({
+                "type": EVENT_CHANGED,
+                "face": face,
+                "previous_identity": before.get("identity")
+            })
+    for track_id, face in previous.items():
+        if track_id not in current:
+            changes.append({"type": EVENT_LEFT, "track_id": track_id, "identity": face.get("identity")})
+    return changes
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Encode one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class IdentificationEventHub:
+    """Thread-safe publisher with asyncio subscribers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()  # {(loop, queue, camera_id)}
+        self.latest: Dict[str, Dict] = {}  # {camera_id: results}
+
+        self.published = 0
+        self.events_sent = 0
+
+    def publish(self, results: Dict) -> None:
+        """Publish a camera's result set (called from its recognition thread)."""
+        camera_id = results.get("camera_id")
+        with self.lock:
+            self.latest[camera_id] = results
+            self.published += 1
+            subscribers = [s for s in self.subscribers if s[2] == camera_id]
+        for loop, queue, _ in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, results)
+            except RuntimeError:
+                pass  # Subscriber's loop is closed
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, results: Dict) -> None:
+        # Latest wins: replace a set the subscriber has not picked up yet
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(results)
+
+    async def stream(
+        self,
+        camera_id: str,
+        roster: Optional[Set[str]] = None,
+        is_disconnected=None
+    ) -> AsyncIterator[str]:
+        """
+        Server-sent event stream: a snapshot of the current faces, then a
+        "faces" event with the changes each time the visible set changes.
+
+        Args:
+            camera_id: Camera whose results are streamed
+            roster: Student IDs visible to this subscriber (None for all)
+            is_disconnected: Optional coroutine function checked on each heartbeat
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        entry = (asyncio.get_running_loop(), queue, camera_id)
+        with self.lock:
+            self.subscribers.add(entry)
+            latest = self.latest.get(camera_id, {"faces": [], "last_update": 0})
+
+        try:
+            visible = filter_faces(latest["faces"], roster)
+            yield format_sse("snapshot", {
+                "camera_id": camera_id,
+                "faces": list(visible.values()),
+                "last_update": latest.get("last_update", 0)
+            })
+
+            while True:
+                try:
+                    results = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if is_disconnected is not None and await is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+
+                current = filter_faces(results["faces"], roster)
+                changes = diff_faces(visible, current)
+                visible = current
+                if not changes:
+                    continue
+
+                with self.lock:
+                    self.events_sent += 1
+                yield format_sse("faces", {
+                    "camera_id": camera_id,
+                    "changes": changes,
+                    "last_update": results.get("last_update", time.time())
+                })
+        finally:
+            with self.lock:
+                self.subscribers.discard(entry)
+
+    def get_stats(self) -> Dict:
+        """Get hub statistics."""
+        with self.lock:
+            return {
+                "subscribers": len(self.subscribers),
+                "published": self.published,
+                "events_sent": self.events_sent
+            }
@@ -0,0 +1,43 @@
+"""
+Rolling latency statistics.
+Used for the end-to-end latency of live streams: from the moment a frame
+was captured to the moment its JPEG was handed to the client's socket.
+"""
+
+import threading
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+LATENCY_WINDOW = 300  # Samples kept (~10 s of a 30 FPS stream)
+
+
+class LatencyStats:
+    """Thread-safe window of latency samples in seconds."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self.lock:
+            self.samples.append(seconds)
+            self.count += 1
+
+    def get_stats(self) -> Dict:
+        """Sample count and last/mean/p50/p95/max latency over the window in milliseconds."""
+        with self.lock:
+            samples = np.array(self.samples, dtype=np.float64) * 1000
+            count = self.count
+        if len(samples) == 0:
+            return {"count": count}
+        return {
+            "count": count,
+            "last_ms": round(float(samples[-1]), 1),
+            "mean_ms": round(float(samples.mean()), 1),
+            "p50_ms": round(float(np.percentile(samples, 50)), 1),
+            "p95_ms": round(float(np.percentile(samples, 95)), 1),
+            "max_ms": round(float(samples.max()), 1)
+        }
@@ -0,0 +1,271 @@
+"""
+Background recognition worker for the live camera feed.
+Detection, tracking, quality gating and gallery lookups (cache first,
+Pinecone on a miss) run in their own thread on the newest camera frame,
+skipping frames that arrived while it was busy. Frames are read in place
+from the camera's frame ring (pinned, read-only) without copies. The MJPEG stream only
+overlays the latest published results, so display frame rate no longer
+depends on inference or network latency. An optional on_change callback
+receives the results whenever the set of identified faces changes, and
+on_results receives every published result set.
+
+With several cameras, each has its own recognizer (sampler, tracker, ROI),
+and inference is scheduled across them through a shared pool of
+LIVE_INFERENCE_SLOTS slots, so one busy room cannot starve the others and
+the detector is never oversubscribed.
+
+The detection interval adapts per camera (DetectionScheduler): it drops to
+min_interval while new or unidentified (unmatched) faces are in view and backs
+off towards max_interval for a static scene or a saturated CPU. The scene
+change sampler still skips frames that did not change within the interval.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.detection_scheduler import DetectionScheduler
+from app.services.embedding_cache import embedding_cache
+from app.services.face_quality import QualityGate
+from app.services.face_tracker import FaceTracker
+from app.services.frame_sampler import AdaptiveFrameSampler
+from app.services.roi import RoiDetector, regions_for
+from app.services.student_directory import student_directory
+
+logger = logging.getLogger(__name__)
+
+FRAME_WAIT_SECONDS = 0.5  # Max wait for a new frame before re-checking the stop flag
+CLOSE_TIMEOUT_SECONDS = 5.0  # Max wait for the worker to exit on close()
+UNKNOWN_IDENTITY = "Student"  # Identity shown for faces without a gallery match (matched is False)
+LIVE_INFERENCE_SLOTS = int(os.getenv("LIVE_INFERENCE_SLOTS", "1"))  # Concurrent inferences across all cameras
+
+# Shared by the recognizers of all cameras; waiters are served roughly in arrival order
+inference_slots = threading.BoundedSemaphore(LIVE_INFERENCE_SLOTS)
+
+
+def face_set_signature(faces: List[Dict]) -> frozenset:
+    """Identity-relevant content of a face set (boxes and confidences excluded)."""
+    return frozenset((f['track_id'], f['identity'], f['name']) for f in faces)
+
+
+class LiveRecognizer:
+    """
+    Recognition worker for one camera. Started and stopped with reference
+    counting by the streams that need it.
+    """
+
+    def __init__(
+        self,
+        frames,
+        embedder_factory: Callable[[], object],
+        pinecone_index,
+        camera_id: str = "0",
+        match_threshold: float = 0.55,
+        min_interval: float = 0.3,
+        max_interval: float = 1.0,
+        on_change: Optional[Callable[[Dict], None]] = None,
+        on_results: Optional[Callable[[Dict], None]] = None
+    ):
+        self.frames = frames  # Provides acquire(after_seq, timeout), e.g. a CameraManager
+        self.embedder_factory = embedder_factory
+        self.pinecone_index = pinecone_index
+        self.camera_id = camera_id
+        self.match_threshold = match_threshold
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.on_change = on_change
+        self.on_results = on_results
+        self.scheduler = DetectionScheduler(min_interval, max_interval)
+
+        self.lock = threading.Lock()
+        self.ref_count = 0
+        self.closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        self.results = {
+            'camera_id': camera_id,
+            'faces': [],
+            'last_update': 0,
+            'sampling': {},
+            'roi': {},
+            'quality': {},
+            'inference_ms': 0.0,
+            'slot_wait_ms': 0.0,
+            'detection': {}
+        }
+
+    def start(self) -> None:
+        """Add a reference, starting the worker thread if it is not running."""
+        with self.lock:
+            if self.closed:
+                return
+            self.ref_count += 1
+            if self._thread is not None and self._thread.is_alive() and not self._stop_event.is_set():
+                return
+            # A worker that is still winding down exits on its own (old) stop event
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(
+                target=self._loop, args=(self._stop_event,), daemon=True,
+                name=f"live-recognition-{self.camera_id}"
+            )
+            self._thread.start()
+        logger.info(f"Live recognition started for camera {self.camera_id}")
+
+    def stop(self) -> None:
+        """Release a reference, stopping the worker after the last one."""
+        with self.lock:
+            self.ref_count = max(0, self.ref_count - 1)
+            if self.ref_count > 0:
+                return
+            self._stop_event.set()
+        logger.info(f"Live recognition stopped for camera {self.camera_id}")
+
+    def close(self) -> None:
+        """
+        Stop the worker regardless of references (camera removed or replaced)
+        and wait for it to exit. A closed recognizer publishes nothing more.
+        """
+        with self.lock:
+            self.closed = True
+            self.ref_count = 0
+            self._stop_event.set()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=CLOSE_TIMEOUT_SECONDS)
+        logger.info(f"Live recognition closed for camera {self.camera_id}")
+
+    def get_results(self) -> Dict:
+        """Latest published results (faces are replaced, never mutated, on update)."""
+        with self.lock:
+            return dict(self.results)
+
+    def _identify(self, embedding) -> Tuple[Optional[str], float, str]:
+        """Look up an embedding: local cache first, Pinecone on a miss."""
+        cache_result = embedding_cache.search(embedding, top_k=1, threshold=self.match_threshold)
+        if cache_result:
+            return cache_result[0]['student_id'], cache_result[0]['score'], "cache"
+
+        logger.info("Cache miss, querying Pinecone...")
+        result = self.pinecone_index.query(vector=embedding.tolist(), top_k=1, include_metadata=True)
+        if result["matches"]:
+            confidence = float(result["matches"][0]["score"])
+            if confidence >= self.match_threshold:
+                return str(result["matches"][0]["id"]), confidence, "pinecone"
+            return None, confidence, "none"
+        return None, 0.0, "none"
+
+    def _publish(self, results: Dict, signature: frozenset, last_signature: frozenset) -> frozenset:
+        """Store results, notify on_results and on_change (if the face set changed). Returns the current signature."""
+        with self.lock:
+            if self.closed:
+                return signature  # A replacement recognizer may already publish for this camera
+            self.results = results
+        if self.on_results is not None:
+            try:
+                self.on_results(results)
+            except Exception as e:
+                logger.error(f"Recognition results callback failed: {e}")
+        if self.on_change is not None and signature != last_signature:
+            try:
+                self.on_change(results)
+            except Exception as e:
+                logger.error(f"Identification change callback failed: {e}")
+        return signature
+
+    def _recognize(
+        self, frame, frame_time: float, embedder, roi_detector, tracker, quality_gate
+    ) -> Tuple[List[Dict], int]:
+        """Detect, track and identify the faces of one frame. Returns (faces, tracks without an identity)."""
+        faces = roi_detector.detect(frame, frame_time)
+        tracks, _ = tracker.update([f.bbox for f in faces], frame_time)
+        current_faces = []
+        unconfirmed = 0
+
+        for face, track in zip(faces, tracks):
+            # Poor-quality faces wait for a better frame of the same track
+            if tracker.needs_identification(track, frame_time) and quality_gate.check(frame, face)[0]:
+                identity, confidence, source = self._identify(embedder.embed_face(frame, face))
+                if source == "cache":
+                    logger.info(f"Cache hit: {identity} ({confidence:.3f}) for track {track.track_id}")
+                track.set_identity(identity, confidence, source, frame_time)
+            if track.last_verified is None or track.identity is None:
+                unconfirmed += 1  # Not looked up yet, or no gallery match (unknown person in view)
+
+            current_faces.append({
+                'bbox': face.bbox.astype(int).tolist(),
+                'track_id': track.track_id,
+                'identity': track.identity or UNKNOWN_IDENTITY,
+                'matched': track.identity is not None,
+                'name': student_directory.get_name(track.identity) if track.identity else None,
+                'confidence': track.confidence,
+                'source': track.source,
+                'identified_at': track.last_verified  # Changes only when the track is (re-)identified
+            })
+        return current_faces, unconfirmed
+
+    def _loop(self, stop_event: threading.Event) -> None:
+        embedder = self.embedder_factory()
+        sampler = AdaptiveFrameSampler(self.min_interval, self.max_interval)
+        tracker = FaceTracker(max_missed_seconds=2 * self.max_interval)  # Resolve identity once per face track
+        roi_detector = RoiDetector(embedder, regions_for(camera_id=self.camera_id))  # Skip walls/ceiling
+        quality_gate = QualityGate()  # Identify only from usable faces
+
+        last_seq = 0
+        last_signature = frozenset()
+        last_tracks = set()
+
+        while not stop_event.is_set():
+            # Frames that arrived while the previous one was processed are skipped
+            with self.frames.acquire(after_seq=last_seq, timeout=FRAME_WAIT_SECONDS) as ref:
+                if ref is None:
+                    continue
+                last_seq = ref.seq
+
+                # Run face detection/identification at the scheduled rate, when the scene changes
+                sampler.min_interval = self.scheduler.interval
+                if not sampler.should_process(ref.frame, ref.timestamp):
+                    continue
+
+                waited = time.time()
+                try:
+                    with inference_slots:
+                        started = time.time()
+                        current_faces, unconfirmed = self._recognize(
+                            ref.frame, ref.timestamp, embedder, roi_detector, tracker, quality_gate
+                        )
+                except Exception as e:
+                    logger.error(f"Error in live recognition (camera {self.camera_id}): {e}", exc_info=True)
+                    continue
+
+            finished = time.time()
+            track_ids = {f['track_id'] for f in current_faces}
+            self.scheduler.update(
+                finished,
+                faces=len(current_faces),
+                new_faces=len(track_ids - last_tracks),
+                unconfirmed=unconfirmed,
+                busy_seconds=finished - waited
+            )
+            last_tracks = track_ids
+
+            last_signature = self._publish({
+                'camera_id': self.camera_id,
+                'faces': current_faces,
+                'last_update': time.time(),
+                'sampling': sampler.get_stats(),
+                'roi': roi_detector.get_stats(),
+                'quality': quality_gate.get_stats(),
+                'inference_ms': round((finished - started) * 1000, 1),
+                'slot_wait_ms': round((started - waited) * 1000, 1),
+                'detection': self.scheduler.get_stats()
+            }, face_set_signature(current_faces), last_signature)
+
+        # Nobody is watching the camera any more: the faces are gone (unless a new worker took over)
+        with self.lock:
+            if self._stop_event is not stop_event:
+                return
+            cleared = dict(self.results, faces=[], last_update=time.time())
+        self._publish(cleared, frozenset(), last_signature)
@@ -0,0 +1,139 @@
+"""
+Encode-once MJPEG fan-out.
+A single producer thread drives a frame source (a generator of ready-to-send
+multipart JPEG chunks) and publishes each chunk to all subscribers, so
+inference, drawing and JPEG encoding run once per frame no matter how many
+clients watch the feed. Subscribers always receive the newest chunk; a slow
+client skips frames instead of queueing them. The producer starts with the
+first subscriber and stops (closing the source) after the last one leaves,
+or when the broadcaster is closed (its camera was removed or replaced).
+
+Sources may yield (chunk, capture_time) pairs; the broadcaster then records
+the time from capture until the chunk was handed to each client's socket.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+from app.services.latency_stats import LatencyStats
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_WAIT_SECONDS = 5.0  # Max wait for a new chunk before re-checking producer state
+
+
+class MjpegBroadcaster:
+    """Fans out the chunks of one source generator to any number of subscribers."""
+
+    def __init__(
+        self,
+        source_factory: Callable[[], Iterator],
+        name: str = "mjpeg",
+        latency: Optional[LatencyStats] = None
+    ):
+        self.source_factory = source_factory
+        self.name = name
+        self.latency = latency if latency is not None else LatencyStats()
+        self.cond = threading.Condition()
+        self.seq = 0
+        self.chunk = None
+        self.captured_at = None
+        self.subscribers = 0
+        self.running = False
+        self.closed = False
+        self._generation = 0
+
+        self.chunks_published = 0
+        self.chunks_dropped = 0  # Chunks skipped by slow subscribers
+
+    def _run(self, generation: int) -> None:
+        source = self.source_factory()
+        try:
+            for item in source:
+                chunk, captured_at = item if isinstance(item, tuple) else (item, None)
+                with self.cond:
+                    if self.subscribers == 0 or self.closed:
+                        # Stop atomically with the check so a new subscriber starts a fresh producer
+                        self.running = False
+                        break
+                    self.seq += 1
+                    self.chunk = chunk
+                    self.captured_at = captured_at
+                    self.chunks_published += 1
+                    self.cond.notify_all()
+        except Exception as e:
+            logger.error(f"{self.name} producer failed: {e}")
+        finally:
+            source.close()
+            with self.cond:
+                if self._generation == generation:
+                    self.running = False
+                self.cond.notify_all()
+            logger.info(f"{self.name} producer stopped")
+
+    def _ensure_running(self) -> None:
+        """Start the producer if needed (caller holds the condition)."""
+        if self.running:
+            return
+        self.running = True
+        self._generation += 1
+        self.chunk = None
+        threading.Thread(
+            target=self._run, args=(self._generation,), daemon=True, name=f"{self.name}-producer"
+        ).start()
+        logger.info(f"{self.name} producer started")
+
+    def subscribe(self) -> Iterator[bytes]:
+        """
+        Yield published chunks until the client disconnects or the source ends.
+        Intermediate chunks are dropped when the client falls behind.
+        """
+        with self.cond:
+            if self.closed:
+                return
+            self.subscribers += 1
+            self._ensure_running()
+            generation = self._generation
+            last = self.seq - 1 if self.chunk is not None else self.seq  # Send the current frame right away
+
+        try:
+            while True:
+                with self.cond:
+                    while self.seq == last and self.running and self._generation == generation:
+                        self.cond.wait(timeout=SUBSCRIBER_WAIT_SECONDS)
+                    if self.seq == last:
+                        # The producer this subscriber belongs to has ended
+                        return
+                    self.chunks_dropped += self.seq - last - 1
+                    last = self.seq
+                    chunk = self.chunk
+                    captured_at = self.captured_at
+                yield chunk
+                # Resumed once the server has written the chunk to the client
+                if captured_at is not None:
+                    self.latency.record(time.time() - captured_at)
+        finally:
+            with self.cond:
+                self.subscribers -= 1
+
+    def close(self) -> None:
+        """End all subscriptions and stop the producer at its next chunk; no new subscribers are accepted."""
+        with self.cond:
+            self.closed = True
+            self.running = False
+            self._generation += 1  # Subscribers of the current producer see it as ended
+            self.cond.notify_all()
+        logger.info(f"{self.name} closed")
+
+    def get_stats(self) -> Dict:
+        """Get broadcaster statistics."""
+        with self.cond:
+            return {
+                "running": self.running,
+                "subscribers": self.subscribers,
+                "chunks_published": self.chunks_published,
+                "chunks_dropped": self.chunks_dropped,
+                "latency": self.latency.get_stats()
+            }
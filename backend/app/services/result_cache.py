@@ -0,0 +1,119 @@
+"""
+LRU cache of video analysis results keyed by content hash and configuration.
+Re-uploads of an already analyzed video (same bytes, same model and
+thresholds) are answered from the stored analysis instead of re-running
+inference. The cache only maps keys to analysis IDs; the results themselves
+live in the analysis metadata of the detection store, so the cache file stays
+small. Evicted entries are forgotten, their analyses are kept.
+
+Lookups only reorder the in-memory LRU; the file is written on put and
+invalidate, and by a lookup at most every RECENCY_SAVE_SECONDS, so cache
+hits do not rewrite it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 256  # Analyses remembered before least-recently-used eviction
+RECENCY_SAVE_SECONDS = 60.0  # Max age of unsaved LRU order changes from lookups
+
+
+def make_key(content_hash: str, config: Dict) -> str:
+    """Cache key of a video analyzed with a given configuration."""
+    config_digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{content_hash}:{config_digest}"
+
+
+class AnalysisResultCache:
+    """Thread-safe, persisted LRU map of cache key -> analysis ID."""
+
+    def __init__(self, cache_file: Path, max_entries: int = MAX_ENTRIES):
+        self.cache_file = Path(cache_file)
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, str]" = OrderedDict()
+        self.lock = threading.Lock()
+        self._dirty = False  # LRU order changed since the last save
+        self._saved_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self) -> None:
+        """Load the cache file (ordered least to most recently used)."""
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                self.entries = OrderedDict(json.load(f))
+        except (OSError, ValueError):
+            self.entries = OrderedDict()
+
+    def _save(self) -> None:
+        """Write the cache file atomically (caller holds the lock)."""
+        tmp_path = self.cache_file.with_suffix(".json.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(self.entries.items()), f)
+            os.replace(tmp_path, self.cache_file)
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        except OSError as e:
+            logger.error(f"Failed to save analysis result cache: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Analysis ID cached for a key (marks it most recently used), or None. Blocking: may save the file."""
+        with self.lock:
+            analysis_id = self.entries.get(key)
+            if analysis_id is None:
+                self.misses += 1
+                return None
+            if next(reversed(self.entries)) != key:
+                self.entries.move_to_end(key)
+                self._dirty = True
+            self.hits += 1
+            if self._dirty and time.monotonic() - self._saved_at >= RECENCY_SAVE_SECONDS:
+                self._save()
+            return analysis_id
+
+    def flush(self) -> None:
+        """Save pending LRU order changes."""
+        with self.lock:
+            if self._dirty:
+                self._save()
+
+    def put(self, key: str, analysis_id: str) -> None:
+        """Remember an analysis, evicting the least recently used entries."""
+        with self.lock:
+            self.entries[key] = analysis_id
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._save()
+
+    def invalidate(self, key: str) -> None:
+        """Forget a key (e.g. when its stored analysis is gone)."""
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def analysis_ids(self) -> Set[str]:
+        """Analysis IDs referenced by cache entries."""
+        with self.lock:
+            return set(self.entries.values())
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics."""
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,284 @@
+"""
+Region-of-interest detection for fixed cameras.
+Fixed classroom cameras see walls, ceiling and whiteboard for most of the
+frame. Detection can be restricted to configured regions (per camera or per
+session, stored in roi_config.json) or to an automatic region learned from
+where faces have appeared so far. Crops are detected at the same scale as a
+full-frame pass with a proportionally smaller detector input, and boxes and
+landmarks are mapped back to full-frame coordinates, so tracking and
+embedding are unchanged.
+
+Regions are normalized [x1, y1, x2, y2] in the range 0-1.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.face_tracker import iou_matrix
+
+logger = logging.getLogger(__name__)
+
+ROI_CONFIG_FILE = Path(__file__).parent.parent.parent / "roi_config.json"
+
+# Automatic ROI
+AUTO_ROI_GRID = (16, 9)          # Occupancy grid (columns, rows) over the frame
+AUTO_ROI_MIN_FACES = 30          # Faces observed before the learned region is used
+AUTO_ROI_MARGIN = 0.1            # Expansion of the learned region (fraction of the frame)
+AUTO_ROI_MIN_COVERAGE = 0.6      # Learned region larger than this fraction of the frame is not worth cropping
+FULL_FRAME_INTERVAL = 10.0       # Seconds between full-frame passes while using a learned region
+DUPLICATE_IOU = 0.5              # Faces found in overlapping regions are merged above this IoU
+
+_config_lock = threading.Lock()
+
+
+def validate_regions(regions) -> List[List[float]]:
+    """
+    Validate a list of normalized regions.
+
+    Raises:
+        ValueError: If a region is malformed or empty
+    """
+    if not isinstance(regions, list) or not regions:
+        raise ValueError("regions must be a non-empty list of [x1, y1, x2, y2]")
+
+    validated = []
+    for region in regions:
+        if not isinstance(region, (list, tuple)) or len(region) != 4:
+            raise ValueError(f"Invalid region {region}: expected [x1, y1, x2, y2]")
+        x1, y1, x2, y2 = (float(v) for v in region)
+        if not (0.0 <= x1 < x2 <= 1.0 and 0.0 <= y1 < y2 <= 1.0):
+            raise ValueError(f"Invalid region {region}: coordinates must be normalized with x1 < x2, y1 < y2")
+        validated.append([x1, y1, x2, y2])
+    return validated
+
+
+def _read_config() -> Dict:
+    """Read the ROI configuration file (caller holds _config_lock)."""
+    try:
+        with open(ROI_CONFIG_FILE, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    config.setdefault("cameras", {})
+    config.setdefault("sessions", {})
+    return config
+
+
+def load_roi_config() -> Dict:
+    """Load ROI configuration ({"cameras": {id: regions}, "sessions": {id: regions}})."""
+    with _config_lock:
+        return _read_config()
+
+
+def set_regions(kind: str, key, regions: Optional[list]) -> Dict:
+    """
+    Set (or clear, with regions=None) the ROI of a camera or session.
+
+    Args:
+        kind: "cameras" or "sessions"
+        key: Camera or session ID
+        regions: Normalized regions, or None to remove the entry
+
+    Returns:
+        Updated configuration
+    """
+    if kind not in ("cameras", "sessions"):
+        raise ValueError(f"Unknown ROI kind: {kind}")
+    if regions is not None:
+        regions = validate_regions(regions)
+
+    # One lock hold for read-modify-write, so concurrent updates never drop each other
+    with _config_lock:
+        config = _read_config()
+        if regions is None:
+            config[kind].pop(str(key), None)
+        else:
+            config[kind][str(key)] = regions
+
+        with open(ROI_CONFIG_FILE, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+    return config
+
+
+def regions_for(camera_id=None, session_id=None) -> Optional[List[List[float]]]:
+    """Configured regions for a session (preferred) or camera, or None."""
+    config = load_roi_config()
+    if session_id is not None and str(session_id) in config["sessions"]:
+        return config["sessions"][str(session_id)]
+    if camera_id is not None and str(camera_id) in config["cameras"]:
+        return config["cameras"][str(camera_id)]
+    return None
+
+
+def crop_input_size(crop_width: int, crop_height: int, width: int, height: int, det_size=(640, 640)):
+    """
+    Detector input size for a crop that keeps the scale of a full-frame pass
+    (the full frame is letterboxed into det_size), rounded up to multiples of 32.
+    """
+    scale = min(det_size[0] / width, det_size[1] / height)
+    return (
+        min(det_size[0], max(32, int(np.ceil(crop_width * scale / 32)) * 32)),
+        min(det_size[1], max(32, int(np.ceil(crop_height * scale / 32)) * 32))
+    )
+
+
+def to_pixels(region: Sequence[float], width: int, height: int):
+    """Convert a normalized region to clamped integer pixel coordinates."""
+    x1 = max(0, int(region[0] * width))
+    y1 = max(0, int(region[1] * height))
+    x2 = min(width, int(np.ceil(region[2] * width)))
+    y2 = min(height, int(np.ceil(region[3] * height)))
+    return x1, y1, x2, y2
+
+
+class AutoRoi:
+    """Learns the part of the frame where faces appear from an occupancy grid."""
+
+    def __init__(self, grid=AUTO_ROI_GRID, min_faces: int = AUTO_ROI_MIN_FACES, margin: float = AUTO_ROI_MARGIN):
+        self.cols, self.rows = grid
+        self.min_faces = min_faces
+        self.margin = margin
+        self.counts = np.zeros((self.rows, self.cols), dtype=np.int32)
+        self.faces_seen = 0
+
+    def observe(self, bboxes, width: int, height: int) -> None:
+        """Record the grid cells covered by detected face boxes."""
+        for bbox in bboxes:
+            c1 = int(np.clip(bbox[0] / width * self.cols, 0, self.cols - 1))
+            r1 = int(np.clip(bbox[1] / height * self.rows, 0, self.rows - 1))
+            c2 = int(np.clip(bbox[2] / width * self.cols, 0, self.cols - 1))
+            r2 = int(np.clip(bbox[3] / height * self.rows, 0, self.rows - 1))
+            self.counts[r1:r2 + 1, c1:c2 + 1] += 1
+            self.faces_seen += 1
+
+    def region(self) -> Optional[List[float]]:
+        """Learned normalized region, or None until enough faces were seen or if it covers most of the frame."""
+        if self.faces_seen < self.min_faces:
+            return None
+
+        rows, cols = np.nonzero(self.counts)
+        if len(rows) == 0:
+            return None
+
+        region = [
+            max(0.0, cols.min() / self.cols - self.margin),
+            max(0.0, rows.min() / self.rows - self.margin),
+            min(1.0, (cols.max() + 1) / self.cols + self.margin),
+            min(1.0, (rows.max() + 1) / self.rows + self.margin)
+        ]
+        if (region[2] - region[0]) * (region[3] - region[1]) > AUTO_ROI_MIN_COVERAGE:
+            return None
+        return region
+
+
+def _merge_duplicates(faces: list) -> list:
+    """Keep the highest-scoring face among boxes that overlap across regions."""
+    if len(faces) < 2:
+        return faces
+    faces = sorted(faces, key=lambda f: f.det_score, reverse=True)
+    ious = iou_matrix(
+        np.array([f.bbox[:4] for f in faces], dtype=np.float32),
+        np.array([f.bbox[:4] for f in faces], dtype=np.float32)
+    )
+    kept = []
+    for i in range(len(faces)):
+        if all(ious[i, j] < DUPLICATE_IOU for j in kept):
+            kept.append(i)
+    return [faces[i] for i in kept]
+
+
+class RoiDetector:
+    """
+    Face detection restricted to regions of interest.
+
+    Configured regions are used as-is. Without configuration, an automatic
+    region is learned; while it is in use the full frame is still scanned
+    every FULL_FRAME_INTERVAL seconds so faces outside it are discovered.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        regions: Optional[List[List[float]]] = None,
+        auto: bool = True,
+        full_frame_interval: float = FULL_FRAME_INTERVAL
+    ):
+        self.embedder = embedder
+        self.regions = validate_regions(regions) if regions else None
+        self.auto = AutoRoi() if auto and self.regions is None else None
+        self.full_frame_interval = full_frame_interval
+        self.last_full_frame = None
+
+        self.full_frame_passes = 0
+        self.roi_passes = 0
+        self.pixels_processed = 0
+        self.pixels_total = 0
+
+    def _active_regions(self, timestamp: float) -> Optional[List[List[float]]]:
+        if self.regions is not None:
+            return self.regions
+        if self.auto is None:
+            return None
+
+        region = self.auto.region()
+        if region is None:
+            return None
+        if self.last_full_frame is None or timestamp - self.last_full_frame >= self.full_frame_interval:
+            return None
+        return [region]
+
+    def detect(self, frame, timestamp: float) -> list:
+        """
+        Detect faces in the active regions (or the full frame).
+
+        Returns:
+            InsightFace Face objects with bbox and kps in full-frame coordinates
+        """
+        height, width = frame.shape[:2]
+        self.pixels_total += width * height
+        regions = self._active_regions(timestamp)
+
+        if regions is None:
+            faces = self.embedder.detect(frame)
+            self.last_full_frame = timestamp
+            self.full_frame_passes += 1
+            self.pixels_processed += width * height
+        else:
+            faces = []
+            for region in regions:
+                x1, y1, x2, y2 = to_pixels(region, width, height)
+                if x2 <= x1 or y2 <= y1:
+                    continue
+                # Slicing creates a view; the smaller detector input is where the work is saved
+                input_size = crop_input_size(
+                    x2 - x1, y2 - y1, width, height, getattr(self.embedder, "det_size", (640, 640))
+                )
+                for face in self.embedder.detect(frame[y1:y2, x1:x2], input_size=input_size):
+                    face.bbox = face.bbox + np.array([x1, y1, x1, y1], dtype=face.bbox.dtype)
+                    if face.kps is not None:
+                        face.kps = face.kps + np.array([x1, y1], dtype=face.kps.dtype)
+                    faces.append(face)
+                self.pixels_processed += (x2 - x1) * (y2 - y1)
+            faces = _merge_duplicates(faces) if len(regions) > 1 else faces
+            self.roi_passes += 1
+
+        if self.auto is not None:
+            self.auto.observe([f.bbox for f in faces], width, height)
+        return faces
+
+    def get_stats(self) -> Dict:
+        """Get ROI statistics."""
+        return {
+            "mode": "configured" if self.regions is not None else ("auto" if self.auto is not None else "off"),
+            "regions": self.regions if self.regions is not None else (
+                [self.auto.region()] if self.auto is not None and self.auto.region() is not None else []
+            ),
+            "full_frame_passes": self.full_frame_passes,
+            "roi_passes": self.roi_passes,
+            "pixel_fraction": round(self.pixels_processed / self.pixels_total, 3) if self.pixels_total else 1.0
+        }
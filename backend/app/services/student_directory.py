@@ -0,0 +1,249 @@
+"""
+In-memory student directory (ID -> name, class membership).
+Preloaded at startup alongside the embedding cache and refreshed
+incrementally in the background, so every recognition path resolves names
+with a dict lookup instead of a database round-trip. IDs that are not in
+the directory fall back to a read-through query on the pooled connection.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.database import DatabasePool, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+NAME_TTL_SECONDS = 600           # How long an ID missing from the database stays cached as missing
+REFRESH_INTERVAL_SECONDS = 60    # Incremental refresh of changed students
+FULL_RELOAD_SECONDS = 3600       # Full reload (picks up deletions and rows without updated_at)
+
+
+class StudentDirectory:
+    """Thread-safe in-memory directory of students backed by the students table."""
+
+    def __init__(self, ttl: float = NAME_TTL_SECONDS, pool: Optional[DatabasePool] = None):
+        self.ttl = ttl
+        self._pool = pool
+        self._students: Dict[str, Dict] = {}
+        self._classes: Dict[str, Set[str]] = defaultdict(set)
+        self._missing: Dict[str, float] = {}  # {student_id: checked_at} for IDs not in the database
+        self._session_classes: Dict[int, str] = {}  # {session_id: "grade-section"}
+        self._lock = threading.Lock()
+
+        self._watermark = None          # Latest updated_at seen
+        self._last_full_load = 0.0
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def pool(self) -> DatabasePool:
+        return self._pool or get_pool()
+
+    def _query(self, where: str = "", params: Optional[list] = None) -> list:
+        pool = self.pool
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f'SELECT id, first_name, last_name, "class", updated_at FROM students {where}',
+                params or []
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def _store(self, rows: list) -> None:
+        """Insert or update directory entries from query rows (caller holds the lock)."""
+        for student_id, first_name, last_name, class_name, updated_at in rows:
+            sid = str(student_id)
+            previous = self._students.get(sid)
+            if previous is not None and previous['class']:
+                self._classes[previous['class']].discard(sid)
+
+            self._students[sid] = {
+                'first_name': first_name or '',
+                'last_name': last_name or '',
+                'class': class_name or ''
+            }
+            if class_name:
+                self._classes[class_name].add(sid)
+            self._missing.pop(sid, None)
+
+            if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+
+    def load_all(self) -> int:
+        """
+        (Re)load the full directory.
+
+        Returns:
+            Number of students loaded
+        """
+        rows = self._query()
+        with self._lock:
+            self._students = {}
+            self._classes = defaultdict(set)
+            self._watermark = None
+            self._store(rows)
+            self._last_full_load = time.time()
+        logger.info(f"Loaded {len(rows)} students into directory")
+        return len(rows)
+
+    def refresh(self) -> int:
+        """
+        Pull students changed since the last load/refresh.
+
+        Returns:
+            Number of students updated
+        """
+        if self._watermark is None or time.time() - self._last_full_load >= FULL_RELOAD_SECONDS:
+            return self.load_all()
+
+        rows = self._query(f"WHERE updated_at > {self.pool.placeholder}", [self._watermark])
+        if rows:
+            with self._lock:
+                self._store(rows)
+            logger.info(f"Refreshed {len(rows)} students in directory")
+        return len(rows)
+
+    def _refresh_loop(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Student directory refresh failed: {e}")
+
+    def start_refresh(self, interval: float = REFRESH_INTERVAL_SECONDS) -> None:
+        """Start the background incremental refresh thread."""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop, args=(interval,), daemon=True, name="student-directory-refresh"
+        )
+        self._refresh_thread.start()
+
+    def stop_refresh(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop_event.set()
+
+    def get(self, student_id) -> Optional[Dict]:
+        """Directory entry ({first_name, last_name, class}) for a student, or None."""
+        with self._lock:
+            return self._students.get(str(student_id))
+
+    def get_name(self, student_id) -> Optional[str]:
+        """Full name of a student, or None if not in the directory."""
+        entry = self.get(student_id)
+        if entry is None:
+            return None
+        return f"{entry['first_name']} {entry['last_name']}".strip() or None
+
+    def class_members(self, class_name: str) -> Set[str]:
+        """Student IDs belonging to a class."""
+        with self._lock:
+            return set(self._classes.get(class_name, ()))
+
+    def session_class(self, session_id: int) -> Optional[str]:
+        """Class name ("grade-section", as stored on students) of a session, or None if unknown."""
+        with self._lock:
+            class_name = self._session_classes.get(session_id)
+        if class_name is not None:
+            return class_name
+
+        pool = self.pool
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT c.grade, c.section FROM sessions s JOIN classes c ON c.id = s.class_id "
+                f"WHERE s.id = {pool.placeholder}",
+                [session_id]
+            )
+            row = cursor.fetchone()
+            cursor.close()
+        if row is None:
+            return None
+
+        class_name = f"{row[0]}-{row[1]}"
+        with self._lock:
+            self._session_classes[session_id] = class_name
+        return class_name
+
+    def session_roster(self, session_id: int) -> Optional[Set[str]]:
+        """Student IDs of the class a session belongs to, or None if the session is unknown."""
+        class_name = self.session_class(session_id)
+        if class_name is None:
+            return None
+        return self.class_members(class_name)
+
+    def _fetch(self, student_ids: list) -> None:
+        """Read-through fetch of IDs missing from the directory."""
+        ids = [int(sid) for sid in student_ids if sid.isdigit()]
+        rows = []
+        if ids:
+            rows = self._query(f"WHERE id IN ({self.pool.placeholders(len(ids))})", ids)
+
+        now = time.time()
+        with self._lock:
+            self._store(rows)
+            for sid in student_ids:
+                if sid not in self._students:
+                    self._missing[sid] = now
+
+    def get_names(self, student_ids: Iterable) -> Dict[str, Dict]:
+        """
+        Resolve student IDs to names, querying the database only for IDs that
+        are neither in the directory nor recently confirmed missing.
+
+        Args:
+            student_ids: Student IDs (int or str)
+
+        Returns:
+            Dictionary mapping student_id -> {first_name, last_name} for known students
+        """
+        ids = {str(s) for s in student_ids}
+        now = time.time()
+
+        with self._lock:
+            unknown = [
+                sid for sid in ids
+                if sid not in self._students and now - self._missing.get(sid, 0) >= self.ttl
+            ]
+            self.hits += len(ids) - len(unknown)
+            self.misses += len(unknown)
+
+        if unknown:
+            try:
+                self._fetch(unknown)
+            except Exception as e:
+                logger.error(f"Failed to fetch student names: {e}")
+
+        with self._lock:
+            return {
+                sid: {
+                    'first_name': self._students[sid]['first_name'],
+                    'last_name': self._students[sid]['last_name']
+                }
+                for sid in ids if sid in self._students
+            }
+
+    def get_stats(self) -> Dict:
+        """Get directory statistics."""
+        with self._lock:
+            return {
+                'students': len(self._students),
+                'classes': len(self._classes),
+                'hits': self.hits,
+                'misses': self.misses,
+                'last_full_load': self._last_full_load or None
+            }
+
+
+# Global directory instance
+student_directory = StudentDirectory()
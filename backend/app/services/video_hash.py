@@ -0,0 +1,32 @@
+"""
+Content hashing for video files.
+Videos are identified by the SHA-256 of their bytes, computed in fixed-size
+chunks so multi-GB recordings never have to be held in memory. Used to skip
+already-analyzed recordings regardless of their file name.
+"""
+
+import hashlib
+from pathlib import Path
+
+HASH_CHUNK_SIZE = 1024 * 1024  # Bytes read per chunk
+
+
+def file_sha256(path: Path, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """
+    Compute the SHA-256 of a file by streaming it.
+
+    Args:
+        path: File to hash
+        chunk_size: Bytes read per chunk
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -6,6 +6,7 @@ import {
   integer,
   pgEnum,
   jsonb,
+  uniqueIndex,
 } from "drizzle-orm/pg-core";
 
 /* ---------- ENUMS ---------- */
@@ -130,7 +131,10 @@ export const attendance = pgTable("attendance", {
   status: attendanceStatusEnum("status").default("ABSENT"),
   createdAt: timestamp("created_at").defaultNow().notNull(),
   updatedAt: timestamp("updated_at").defaultNow().$onUpdate(() => new Date()),
-});
+}, (table) => [
+  // One row per student per session; the backend upserts face marks on this
+  uniqueIndex("attendance_session_student_idx").on(table.sessionId, table.studentId),
+]);
 
 /* ---------- AMBIGUOUS ATTENDANCE ---------- */
 export const ambiguousAttendance = pgTable("ambiguous_attendance", {